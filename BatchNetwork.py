@@ -0,0 +1,336 @@
+import math
+from typing import Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+from CSRGraph import CSRGraph, Graph
+from PacketPool import VectorPacketPool
+from VectorNetwork import VectorNetwork, _policy_for
+from bellman_ford.routing_table import shortest_paths
+from q_routing.DenseQTable import DenseQTable
+from stochastic_q_routing.QueueTrend import QueueTrendArray
+from stochastic_q_routing.boltzmann import sample_batch
+
+
+class BatchNetwork(VectorNetwork):
+    """
+    `VectorNetwork` for many seeds at once: one replica of the network
+    per seed, all advanced by the same NumPy operations.
+
+    Every state array has the replica as its leading axis — queue
+    lengths `(replicas × nodes)`, Q-values `(replicas × nodes ×
+    destinations × max_degree)`, SQRWALT temperatures `(replicas ×
+    nodes)` — and is stored flattened, with node i of replica r at row
+    r * nodes + i (`queue_lengths`, `q` and `temperatures` are the
+    unflattened views).  Packets never leave their replica, so the
+    replicas are independent simulations of the same topology.
+
+    Each replica draws from its own NumPy generator, seeded with its
+    seed, and consumes it exactly as `VectorNetwork(graph, node_cls,
+    seed=seed)` does, so replica r reproduces that engine's run for
+    seeds[r] draw for draw while the per-tick interpreter overhead is
+    paid once for all of them.
+
+    Deliveries are buffered and handed to the per-replica `metrics`
+    sinks by `flush_metrics()`, which must be called before reading
+    them.
+    """
+
+    def __init__(self, graph: Graph, node_cls: Type, seeds: Sequence[int],
+                 alpha: float = 0.5,
+                 queue_capacity: int = 64,
+                 keep_delivered: bool = True,
+                 metrics: Optional[Sequence[object]] = None,
+                 update_interval: int = 0):
+        """
+        Parameters
+        ----------
+        graph          : {node_id: [(neighbor_id, weight), ...], ...} or a
+                         `CSRGraph`, shared by every replica
+        node_cls       : per-node class whose policy should be simulated
+        seeds          : one seed (and replica) per simulation
+        alpha          : Q-learning rate (QNode uses 0.5)
+        queue_capacity : initial ring-buffer slots per node (grows on demand)
+        keep_delivered : keep (replica, created_at, delivered_at) of
+                         delivered packets for `collect_delivered()`
+        metrics        : one streaming sink per replica with
+                         `record_many(src, dst, created_at, delivered_at)`
+                         (e.g. `DeliveryStats`)
+        update_interval: SQRWALT temperature update period in ticks for
+                         `advance` and `run` (0: only on explicit
+                         `tick_update()`)
+        """
+        self.time   = 0
+        self.graph  = graph
+        self.policy = _policy_for(node_cls)
+        self.alpha  = alpha
+        self.update_interval = update_interval
+        self.seeds  = list(seeds)
+        self.rngs   = [np.random.default_rng(seed) for seed in self.seeds]
+        r = self.replicas = len(self.seeds)
+
+        self.csr = CSRGraph.from_dict(graph)
+        self.node_ids = self.csr.node_ids
+        self.index = self.csr.index
+        n = self.num_nodes = self.csr.num_nodes
+        # First row of each flat node's replica
+        self._base = np.repeat(np.arange(r) * n, n)
+
+        # Padded adjacency of the flat (replicas × nodes) graph
+        self.deg = np.tile(self.csr.degree, r)
+        nbr, _, valid = self.csr.padded()
+        self.nbr = (nbr[None] + (np.arange(r) * n)[:, None, None]).reshape(r * n, -1)
+        self.valid = np.tile(valid, (r, 1))
+
+        # Ring-buffer queues of packet ids
+        self.capacity = 1 << max(int(queue_capacity) - 1, 1).bit_length()
+        self._mask = self.capacity - 1
+        self.buf   = np.zeros((r * n, self.capacity), dtype=np.int64)
+        self.head  = np.zeros(r * n, dtype=np.int64)
+        self.qlen  = np.zeros(r * n, dtype=np.int64)
+
+        # Packet columns (src/dst are flat indices)
+        self.packets = VectorPacketPool()
+
+        # Per-replica blocks of prefetched uniforms
+        self._ublock = np.zeros((r, 0))
+        self._ulen   = np.zeros(r, dtype=np.int64)
+        self._upos   = np.zeros(r, dtype=np.int64)
+
+        if metrics is not None and len(metrics) != r:
+            raise ValueError(f"need one metrics sink per replica ({r}), got {len(metrics)}")
+        self.keep_delivered  = keep_delivered
+        self.metrics         = metrics
+        self.delivered_count = np.zeros(r, dtype=np.int64)
+        self._delivered = []
+        self._pending   = []
+
+        # Policy state
+        self.q_store = None
+        if self.policy in ("greedy", "boltzmann", "sqrwalt"):
+            self.q_store = DenseQTable(self.csr, replicas=r)
+        if self.policy == "boltzmann":
+            self.temperature = np.full(r * n, node_cls.temperature)
+        if self.policy == "sqrwalt":
+            self.temperature = np.ones(r * n)
+            self.trend = QueueTrendArray(r * n, window=32)
+        if self.policy == "shortest_path":
+            _, _, self.next_hop = shortest_paths(self.csr)
+
+    # ------------------------------------------------------------------
+    # Per-replica views
+    # ------------------------------------------------------------------
+    @property
+    def queue_lengths(self) -> np.ndarray:
+        return self.qlen.reshape(self.replicas, self.num_nodes)
+
+    @property
+    def q(self) -> Optional[np.ndarray]:
+        if self.q_store is None:
+            return None
+        return self.q_store.q.reshape((self.replicas, self.num_nodes) + self.q_store.q.shape[1:])
+
+    @property
+    def temperatures(self) -> Optional[np.ndarray]:
+        temperature = getattr(self, "temperature", None)
+        return None if temperature is None else temperature.reshape(self.replicas, self.num_nodes)
+
+    # ------------------------------------------------------------------
+    # Storage helpers
+    # ------------------------------------------------------------------
+    def _uniform(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Next `counts[r]` uniforms of every replica r, concatenated in
+        replica order.  Each replica refills its block exactly when (and
+        with as many draws as) `VectorNetwork._uniform` would.
+        """
+        pos = self._upos
+        for r in np.flatnonzero(pos + counts > self._ulen).tolist():
+            k = max(int(counts[r]), 1 << 16)
+            if k > self._ublock.shape[1]:
+                self._ublock = np.pad(self._ublock, ((0, 0), (0, k - self._ublock.shape[1])))
+            self._ublock[r, :k] = self.rngs[r].random(k)
+            self._ulen[r] = k
+            pos[r] = 0
+        replica = np.repeat(np.arange(self.replicas), counts)
+        first = np.cumsum(counts) - counts
+        offset = np.arange(len(replica)) - first[replica]
+        self._upos = pos + counts
+        return self._ublock[replica, pos[replica] + offset]
+
+    # ------------------------------------------------------------------
+    # Packet-injection helpers
+    # ------------------------------------------------------------------
+    def inject_packet(self, src: int, dst: int, replica: int = 0) -> None:
+        base = replica * self.num_nodes
+        self.inject_packets(np.array([base + self.index[src]]),
+                            np.array([base + self.index[dst]]))
+
+    def inject_random_packets(self, load: float) -> None:
+        """`VectorNetwork.inject_random_packets` in every replica."""
+        r, n = self.replicas, self.num_nodes
+        base = int(math.floor(load))
+        width = 1 + 2 * (base + 1)
+        u = self._uniform(np.full(r, width)).reshape(r, width)
+        k = base + (u[:, 0] < load - base)
+        j = np.arange(base + 1)
+        take = j[None, :] < k[:, None]
+        if not take.any():
+            return
+        src = (u[:, 1:base + 2] * n).astype(np.int64)
+        dst = (np.take_along_axis(u, k[:, None] + 1 + j[None, :], axis=1)
+               * (n - 1)).astype(np.int64)
+        dst += dst >= src
+        offset = (np.arange(r) * n)[:, None]
+        self.inject_packets((src + offset)[take], (dst + offset)[take])
+
+    def inject_traffic(self, traffic: Sequence) -> None:
+        """Inject this tick's packets from one traffic source (or trace replay) per replica."""
+        src, dst = [], []
+        for r, source in enumerate(traffic):
+            s, d = source.at(self.time)
+            src.append(np.asarray(s, dtype=np.int64) + r * self.num_nodes)
+            dst.append(np.asarray(d, dtype=np.int64) + r * self.num_nodes)
+        src, dst = np.concatenate(src), np.concatenate(dst)
+        if len(src):
+            self.inject_packets(src, dst)
+
+    # ------------------------------------------------------------------
+    # Routing policies
+    # ------------------------------------------------------------------
+    def _select(self, nodes: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """Neighbour slot chosen by each (flat) node for its packet to (local) `dst`."""
+        if self.policy == "greedy":
+            return self.q_store.best.reshape(-1)[nodes * self.num_nodes + dst]
+        counts = np.bincount(nodes // self.num_nodes, minlength=self.replicas)
+        if self.policy in ("boltzmann", "sqrwalt"):
+            rows = self.q_store.rows[nodes * self.num_nodes + dst]
+            return sample_batch(rows, self.temperature[nodes],
+                                self._uniform(counts), self.deg[nodes])
+        return (self._uniform(counts) * self.deg[nodes]).astype(np.int64)
+
+    # ------------------------------------------------------------------
+    # Simulation step
+    # ------------------------------------------------------------------
+    def tick(self) -> None:
+        """`VectorNetwork.tick` for every replica at once."""
+        active = np.flatnonzero(self.qlen)
+        if len(active) == 0:
+            self.time += 1
+            return
+
+        head = self.head[active]
+        pids = self.buf[active, head]
+        self.head[active] = (head + 1) & self._mask
+        self.qlen[active] -= 1
+        dst = self.packets.dst[pids]
+
+        arrived = dst == active
+        if np.count_nonzero(arrived):
+            done = pids[arrived]
+            created_at = self.packets.created_at[done]
+            if self.metrics is not None:
+                self._pending.append((self.packets.src[done], dst[arrived],
+                                      created_at, self.time))
+            if self.keep_delivered:
+                self._delivered.append((dst[arrived], created_at, self.time))
+            self.delivered_count += np.bincount(dst[arrived] // self.num_nodes,
+                                                minlength=self.replicas)
+            self.packets.free(done)
+            keep = ~arrived
+            active, pids, dst = active[keep], pids[keep], dst[keep]
+
+        if len(active):
+            n = self.num_nodes
+            base = self._base[active]
+            local = dst - base
+            if self.policy == "shortest_path":
+                next_hop = base + self.next_hop[active - base, local]
+            else:
+                slot = self._select(active, local)
+                next_hop = self.nbr[active, slot]
+                if self.q_store is not None:
+                    estimate = self.q_store.min.reshape(-1)[next_hop * n + local]
+                    estimate[next_hop == dst] = 0.0
+                    rows = active * n + local
+                    old_q = self.q_store.rows[rows, slot]
+                    target = self.qlen[active] + 1 + estimate
+                    self.q_store.update_many(rows, slot, old_q + self.alpha * (target - old_q))
+            self._enqueue(next_hop, pids)
+
+        self.time += 1
+
+    def advance(self, n_ticks: int, load: float = -1.0) -> None:
+        """
+        `VectorNetwork.advance` for every replica.  The replicas already
+        share every array operation, so this is the NumPy loop rather
+        than the single-network kernel; `tick_update()` still runs
+        whenever the clock reaches a multiple of `update_interval`.
+        """
+        for _ in range(n_ticks):
+            if load >= 0:
+                self.inject_random_packets(load)
+            self.tick()
+            if self.update_interval > 0 and self.time % self.update_interval == 0:
+                self.tick_update()
+
+    def run(self, until: int, traffic: Optional[Sequence] = None) -> None:
+        """`VectorNetwork.run` with one traffic source per replica."""
+        while self.time < until:
+            if len(self.packets) == 0:
+                arrivals = ([] if traffic is None else
+                            [a for a in (t.next_arrival(self.time) for t in traffic)
+                             if a is not None])
+                arrival = min(arrivals, default=None)
+                stop = until if arrival is None or arrival >= until else arrival
+                self._skip_to(stop)
+                if stop == until:
+                    return
+            if traffic is not None:
+                self.inject_traffic(traffic)
+            self.tick()
+            if self.update_interval > 0 and self.time % self.update_interval == 0:
+                self.tick_update()
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def _drain(self, buffer: list, columns: int) -> Tuple[np.ndarray, ...]:
+        """Concatenate buffered per-tick deliveries (the last column is the tick)."""
+        if not buffer:
+            return tuple(np.zeros(0, dtype=np.int64) for _ in range(columns))
+        parts = [np.concatenate([entry[c] for entry in buffer]) for c in range(columns - 1)]
+        parts.append(np.concatenate([np.full(len(entry[0]), entry[-1], dtype=np.int64)
+                                     for entry in buffer]))
+        buffer.clear()
+        return tuple(parts)
+
+    def flush_metrics(self) -> None:
+        """Hand the deliveries buffered since the last call to each replica's sink."""
+        if self.metrics is None or not self._pending:
+            return
+        src, dst, created, delivered = self._drain(self._pending, 4)
+        n = self.num_nodes
+        replica = dst // n
+        order = np.argsort(replica, kind="stable")
+        bounds = np.searchsorted(replica[order], np.arange(self.replicas + 1))
+        for r, sink in enumerate(self.metrics):
+            part = order[bounds[r]:bounds[r + 1]]
+            if len(part):
+                sink.record_many(src[part] % n, dst[part] % n, created[part], delivered[part])
+
+    def collect_delivered(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return (replica, created_at, delivered_at) for every packet
+        delivered since the previous call, and forget them.
+        """
+        dst, created, delivered = self._drain(self._delivered, 3)
+        return dst // self.num_nodes, created, delivered
+
+    def get_active_packets(self) -> np.ndarray:
+        """Packets in flight per replica."""
+        return self.queue_lengths.sum(axis=1)
+
+    def get_delivered_packets_count(self) -> np.ndarray:
+        """Packets delivered per replica."""
+        return self.delivered_count.copy()
@@ -0,0 +1,237 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+Graph = Dict[int, List[Tuple[int, float]]]
+
+
+class CSRGraph:
+    """
+    Compressed sparse row adjacency — the graph representation shared
+    by the engines, node classes, routing tables and Q stores.
+
+    Node i (a dense index 0..N-1) has the neighbours
+    `indices[indptr[i]:indptr[i + 1]]` with the matching `weights`;
+    `node_ids[i]` is the node's id outside the simulator.  Undirected
+    graphs store every edge in both directions.  Three flat arrays
+    instead of a dict of tuple lists, so graphs with 10⁵ nodes are a few
+    MB and can be handed to array kernels as they are.
+    """
+
+    def __init__(self, indptr, indices, weights=None,
+                 node_ids: Optional[Sequence[int]] = None):
+        self.indptr  = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = (np.ones(len(self.indices)) if weights is None
+                        else np.asarray(weights, dtype=float))
+        self.num_nodes = len(self.indptr) - 1
+        self.node_ids = list(range(self.num_nodes)) if node_ids is None else list(node_ids)
+        self.index: Dict[int, int] = {nid: i for i, nid in enumerate(self.node_ids)}
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_edges(cls, num_nodes: int, u, v, weights=None,
+                   node_ids: Optional[Sequence[int]] = None,
+                   symmetric: bool = True) -> "CSRGraph":
+        """
+        Build from edge arrays (dense indices).  Self-loops and repeated
+        edges are dropped.  Each node's neighbours keep the order in
+        which its edges were listed, as if they were appended to a dict
+        of lists one edge at a time.
+        """
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        w = np.ones(len(u)) if weights is None else np.asarray(weights, dtype=float)
+        if symmetric:
+            # Interleave (u, v), (v, u) so the stable sort below keeps edge order
+            u, v = np.stack([u, v], axis=1).ravel(), np.stack([v, u], axis=1).ravel()
+            w = np.repeat(w, 2)
+
+        keep = u != v
+        u, v, w = u[keep], v[keep], w[keep]
+        _, first = np.unique(u * num_nodes + v, return_index=True)
+        first.sort()
+        u, v, w = u[first], v[first], w[first]
+
+        order = np.argsort(u, kind="stable")
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=num_nodes), out=indptr[1:])
+        return cls(indptr, v[order], w[order], node_ids)
+
+    @classmethod
+    def from_dict(cls, graph: Graph) -> "CSRGraph":
+        """Convert a {node_id: [(neighbor_id, weight), ...]} graph (key order kept)."""
+        if isinstance(graph, CSRGraph):
+            return graph
+        node_ids = list(graph.keys())
+        index = {nid: i for i, nid in enumerate(node_ids)}
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum([len(graph[nid]) for nid in node_ids], out=indptr[1:])
+        indices = [index[v] for nid in node_ids for v, _ in graph[nid]]
+        weights = [w for nid in node_ids for _, w in graph[nid]]
+        return cls(indptr, indices, weights, node_ids)
+
+    def copy(self) -> "CSRGraph":
+        """Independent copy (the topology changes below work in place)."""
+        return CSRGraph(self.indptr.copy(), self.indices.copy(), self.weights.copy(),
+                        self.node_ids)
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self.num_nodes
+
+    @property
+    def degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def neighbors(self, i: int) -> np.ndarray:
+        """Dense indices of node i's neighbours (a view)."""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def neighbor_weights(self, i: int) -> np.ndarray:
+        return self.weights[self.indptr[i]:self.indptr[i + 1]]
+
+    def neighbor_ids(self, i: int) -> List[int]:
+        """Node ids of node i's neighbours, in adjacency order."""
+        ids = self.node_ids
+        return [ids[j] for j in self.neighbors(i).tolist()]
+
+    @property
+    def unit_weight(self) -> bool:
+        return bool(np.all(self.weights == 1))
+
+    def padded(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (nbr, weights, valid) as N × max_degree arrays: slot k of row i is
+        node i's k-th neighbour.  Padding slots hold neighbour 0, weight
+        +inf and valid False.
+        """
+        deg = self.degree
+        width = max(int(deg.max(initial=0)), 1)
+        valid = np.arange(width) < deg[:, None]
+        nbr = np.zeros((self.num_nodes, width), dtype=np.int64)
+        wts = np.full((self.num_nodes, width), np.inf)
+        nbr[valid] = self.indices
+        wts[valid] = self.weights
+        return nbr, wts, valid
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(src, dst) dense index arrays of every stored arc."""
+        return np.repeat(np.arange(self.num_nodes), self.degree), self.indices
+
+    def arc(self, i: int, j: int) -> int:
+        """Position of arc i -> j in `indices` / `weights`, or -1."""
+        lo = int(self.indptr[i])
+        hits = np.flatnonzero(self.neighbors(i) == j)
+        return lo + int(hits[0]) if len(hits) else -1
+
+    # ------------------------------------------------------------------
+    # Topology changes (in place)
+    # ------------------------------------------------------------------
+    def add_arc(self, i: int, j: int, weight: float = 1.0) -> None:
+        """Append j to node i's neighbours (last in adjacency order)."""
+        if i == j or self.arc(i, j) >= 0:
+            raise ValueError(f"arc {i} -> {j} is a self-loop or exists already")
+        a = int(self.indptr[i + 1])
+        self.indices = np.insert(self.indices, a, j)
+        self.weights = np.insert(self.weights, a, weight)
+        self.indptr[i + 1:] += 1
+
+    def remove_arc(self, i: int, j: int) -> float:
+        """Drop arc i -> j (the other neighbours keep their order); returns its weight."""
+        a = self.arc(i, j)
+        if a < 0:
+            raise ValueError(f"no arc {i} -> {j}")
+        weight = float(self.weights[a])
+        self.indices = np.delete(self.indices, a)
+        self.weights = np.delete(self.weights, a)
+        self.indptr[i + 1:] -= 1
+        return weight
+
+    def set_arc_weight(self, i: int, j: int, weight: float) -> float:
+        """Change the weight of arc i -> j; returns the old weight."""
+        a = self.arc(i, j)
+        if a < 0:
+            raise ValueError(f"no arc {i} -> {j}")
+        old = float(self.weights[a])
+        self.weights[a] = weight
+        return old
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+    def to_dict(self) -> Graph:
+        """The {node_id: [(neighbor_id, weight), ...]} form `Network` takes."""
+        ids = self.node_ids
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        weights = self.weights.tolist()
+        return {
+            ids[i]: [(ids[indices[a]], weights[a]) for a in range(indptr[i], indptr[i + 1])]
+            for i in range(self.num_nodes)
+        }
+
+    def to_networkx(self):
+        """networkx.Graph with the original node ids (imports networkx)."""
+        import networkx as nx
+        G = nx.Graph()
+        G.add_nodes_from(self.node_ids)
+        src, dst = self.edges()
+        ids = self.node_ids
+        G.add_weighted_edges_from(
+            (ids[a], ids[b], w)
+            for a, b, w in zip(src.tolist(), dst.tolist(), self.weights.tolist()))
+        return G
+
+    # ------------------------------------------------------------------
+    # Structure
+    # ------------------------------------------------------------------
+    def components(self) -> np.ndarray:
+        """Connected-component label per node (union-find over the arcs)."""
+        parent = list(range(self.num_nodes))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        src, dst = self.edges()
+        for a, b in zip(src.tolist(), dst.tolist()):
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+        return np.array([find(x) for x in range(self.num_nodes)], dtype=np.int64)
+
+    def subgraph(self, keep: np.ndarray) -> "CSRGraph":
+        """Induced subgraph on the nodes where the boolean mask `keep` is set."""
+        new = np.full(self.num_nodes, -1, dtype=np.int64)
+        new[keep] = np.arange(np.count_nonzero(keep))
+        src, dst = self.edges()
+        arc = keep[src] & keep[dst]
+        ids = [nid for nid, k in zip(self.node_ids, keep.tolist()) if k]
+        return CSRGraph.from_edges(len(ids), new[src[arc]], new[dst[arc]],
+                                   self.weights[arc], ids, symmetric=False)
+
+    def reorder(self, order: np.ndarray) -> "CSRGraph":
+        """
+        The same graph with node order[k] as dense node k.  Node ids,
+        weights and each node's neighbour order are kept.
+        """
+        rank = np.empty(self.num_nodes, dtype=np.int64)
+        rank[order] = np.arange(self.num_nodes)
+        src, dst = self.edges()
+        ids = [self.node_ids[i] for i in np.asarray(order).tolist()]
+        return CSRGraph.from_edges(self.num_nodes, rank[src], rank[dst],
+                                   self.weights, ids, symmetric=False)
+
+    def largest_component(self) -> "CSRGraph":
+        labels = self.components()
+        biggest = np.bincount(labels).argmax()
+        if np.all(labels == biggest):
+            return self
+        return self.subgraph(labels == biggest)
@@ -0,0 +1,28 @@
+from VectorNetwork import VectorNetwork
+
+
+class CompiledNetwork(VectorNetwork):
+    """
+    `Network` dynamics for the built-in node classes, run by the
+    `VectorNetwork` kernel in sequential mode.
+
+    Unlike `VectorNetwork`, nodes are processed one after another in
+    index order, so a Q update is visible to the nodes processed after it
+    in the same tick — exactly the `Network` semantics.  Random draws
+    come from the engine's NumPy generator, not `random`, so runs match
+    `Network` statistically rather than draw for draw (and exactly for
+    BellmanFordNode and QNode given the same packets).
+
+    `advance(n_ticks, load)` injects, ticks and (for SQRWALT) updates
+    temperatures every `update_interval` ticks without returning to
+    Python; deliveries are handed to `metrics` when it returns.  Numba
+    compiles the kernel on first use; without it the same kernel runs as
+    plain Python.  Every other tick (`tick`, `run`) goes through the
+    kernel as well.
+    """
+
+    sequential = True
+
+    def tick(self) -> None:
+        """One tick through the kernel; like `VectorNetwork.tick`, no SQRWALT update."""
+        self._run_kernel(1, -1.0, 0)
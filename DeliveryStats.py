@@ -0,0 +1,200 @@
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from DelayHistogram import DelayHistogram
+
+
+class DeliveryStats:
+    """
+    Streaming delivery-delay statistics, pluggable into `Network` as its
+    `metrics` sink.
+
+    Every delivery updates, in O(1) and without keeping the packet:
+        - a window (since the last `interval()` call): count, mean and
+          variance (Welford), plus a log-linear delay histogram
+          (`DelayHistogram`) for percentiles
+        - run totals: count, mean and delay histogram over every
+          recorded delivery
+        - optionally (`per_pair`), a delay histogram per (src, dst)
+          pair, created when the pair's first packet arrives
+        - dropped packets (`record_drop`), per window and in total, for
+          networks with bounded queues
+
+    Histograms have a fixed size and merge by adding counts, so windows
+    from different seeds or processes can be pooled before taking
+    percentiles.  Percentiles are exact below 2**sub_bits ticks and
+    within 2**(1 - sub_bits) relative above.
+    """
+
+    def __init__(self, created_after: Optional[int] = None,
+                 percentiles=(50, 95, 99), per_pair: bool = False,
+                 sub_bits: int = 7, pair_sub_bits: int = 4):
+        """
+        Parameters
+        ----------
+        created_after : ignore packets created at or before this tick
+                        (warm-up discard)
+        percentiles   : percentiles reported by `interval()`
+        per_pair      : also keep a run histogram per (src, dst) pair
+        sub_bits      : precision of the window / run histograms
+        pair_sub_bits : precision of the per-pair histograms (coarser,
+                        there are up to N² of them)
+        """
+        self.created_after = created_after
+        self.percentiles   = tuple(percentiles)
+        self.per_pair      = per_pair
+        self.pair_sub_bits = pair_sub_bits
+        self.total         = 0
+        self.total_mean    = 0.0
+        self.total_drops   = 0
+        self.hist          = DelayHistogram(sub_bits)
+        self.total_hist    = DelayHistogram(sub_bits)
+        self.pairs: Dict[Tuple[int, int], DelayHistogram] = {}
+        # Counts of the last window closed by `interval()`
+        self.last_hist: Optional[np.ndarray] = None
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self.count = 0
+        self.mean  = 0.0
+        self._m2   = 0.0
+        self.drops = 0
+        self.hist.clear()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def record(self, src: int, dst: int, created_at: int, delivered_at: int) -> None:
+        if self.created_after is not None and created_at <= self.created_after:
+            return
+        delay = delivered_at - created_at
+
+        n = self.count + 1
+        diff = delay - self.mean
+        self.mean += diff / n
+        self._m2 += diff * (delay - self.mean)
+        self.count = n
+
+        self.total += 1
+        self.total_mean += (delay - self.total_mean) / self.total
+
+        self.hist.record(delay)
+        if self.per_pair:
+            pair = self.pairs.get((src, dst))
+            if pair is None:
+                pair = self.pairs[src, dst] = DelayHistogram(self.pair_sub_bits)
+            pair.record(delay)
+
+    def record_drop(self, src: int, dst: int, created_at: int, dropped_at: int) -> None:
+        if self.created_after is not None and created_at <= self.created_after:
+            return
+        self.drops += 1
+        self.total_drops += 1
+
+    def record_many(self, src: np.ndarray, dst: np.ndarray,
+                    created_at: np.ndarray, delivered_at) -> None:
+        """Batch form of `record` for the array engine."""
+        if self.created_after is not None:
+            keep = created_at > self.created_after
+            src, dst, created_at = src[keep], dst[keep], created_at[keep]
+            if np.ndim(delivered_at):
+                delivered_at = delivered_at[keep]
+        k = len(created_at)
+        if k == 0:
+            return
+        delays = np.asarray(delivered_at - created_at, dtype=np.int64)
+
+        # Chan et al. parallel merge of (count, mean, M2)
+        mean_b = float(delays.mean())
+        m2_b = float(((delays - mean_b) ** 2).sum())
+        n = self.count + k
+        diff = mean_b - self.mean
+        self.mean += diff * k / n
+        self._m2 += m2_b + diff * diff * self.count * k / n
+        self.count = n
+
+        self.total += k
+        self.total_mean += (mean_b - self.total_mean) * k / self.total
+
+        self.hist.record_many(delays)
+        if self.per_pair:
+            pairs, first, inverse = np.unique(np.stack([src, dst], axis=1), axis=0,
+                                              return_index=True, return_inverse=True)
+            order = np.argsort(inverse.ravel(), kind="stable")
+            bounds = np.searchsorted(inverse.ravel()[order], np.arange(len(pairs) + 1))
+            for j, (s, d) in enumerate(pairs.tolist()):
+                pair = self.pairs.get((s, d))
+                if pair is None:
+                    pair = self.pairs[s, d] = DelayHistogram(self.pair_sub_bits)
+                pair.record_many(delays[order[bounds[j]:bounds[j + 1]]])
+
+    # ------------------------------------------------------------------
+    # Checkpointing
+    # ------------------------------------------------------------------
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """Counters and histograms as arrays (for `checkpoint.save_checkpoint`)."""
+        state = {
+            "counts": np.array([self.total, self.count, self.total_drops, self.drops],
+                               dtype=np.int64),
+            "means":  np.array([self.total_mean, self.mean, self._m2]),
+            "hist":   self.hist.counts.copy(),
+            "total_hist": self.total_hist.counts.copy(),
+        }
+        if self.pairs:
+            state["pair_keys"] = np.array(list(self.pairs), dtype=np.int64)
+            state["pair_hist"] = np.array([h.counts for h in self.pairs.values()])
+        return state
+
+    def set_state(self, state: Dict[str, np.ndarray]) -> None:
+        self.total, self.count, self.total_drops, self.drops = (
+            int(x) for x in state["counts"])
+        self.total_mean, self.mean, self._m2 = (float(x) for x in state["means"])
+        self.hist.counts[:] = state["hist"]
+        self.total_hist.counts[:] = state["total_hist"]
+        self.pairs.clear()
+        if "pair_keys" in state:
+            for (s, d), counts in zip(state["pair_keys"].tolist(), state["pair_hist"]):
+                self.pairs[s, d] = DelayHistogram.from_counts(counts, self.pair_sub_bits)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile of the current window's delays."""
+        return self.hist.percentile(q, self.count)
+
+    def total_percentile(self, q: float) -> float:
+        """Nearest-rank percentile over every recorded delivery."""
+        run = self.total_hist.copy()
+        run.merge(self.hist)
+        return run.percentile(q, self.total)
+
+    def pair_percentiles(self, q: float) -> Dict[Tuple[int, int], float]:
+        """{(src, dst): percentile} over the run, for `per_pair` stats."""
+        return {pair: h.percentile(q) for pair, h in self.pairs.items()}
+
+    def interval(self) -> Dict[str, float]:
+        """
+        Snapshot of the window since the previous call, then start a new
+        window. Keys: count, mean, var, std, p<q> per percentile, drops
+        and loss (drops / (count + drops)).  The window's histogram
+        counts are left in `last_hist`.
+        """
+        var = self._m2 / self.count if self.count else float("nan")
+        stats = {
+            "count": self.count,
+            "mean":  self.mean if self.count else float("nan"),
+            "var":   var,
+            "std":   math.sqrt(var) if self.count else float("nan"),
+        }
+        for q in self.percentiles:
+            stats[f"p{q:g}"] = self.percentile(q)
+        stats["drops"] = self.drops
+        stats["loss"] = (self.drops / (self.count + self.drops)
+                         if self.count + self.drops else float("nan"))
+        self.last_hist = self.hist.counts.copy()
+        self.total_hist.merge(self.hist)
+        self._reset_window()
+        return stats
@@ -1,53 +1,112 @@
 import math
 import random
 from collections import defaultdict
-from typing import Dict, List, Tuple, Type
+from typing import Dict, List, Optional, Tuple, Type
 
-Packet = Dict[str, object] 
-Graph  = Dict[int, List[Tuple[int, float]]]
+import checkpoint
+from CSRGraph import CSRGraph, Graph
+from PacketPool import Packet, PacketPool
+from bellman_ford.routing_table import repair_next_hops
 
 class Network:
     """
     Generic network simulator that delegates routing/learning
     to per‑node objects (BellmanFordNode, QNode, …).
 
+    Packets live in `self.packets` (a `PacketPool`) and are passed
+    around as integer ids.
+
     Each node class must expose:
         - __init__(node_id: int, neighbors: List[int], network: "Network")
-        - receive_packet(packet: Packet) -> None
-        - process() -> Optional[Tuple[int, Packet]]
-          (returns (next_hop, packet) if it forwarded one this tick)
-        - queue  (Iterable or list‑like storing its pending packets)
+        - receive_packet(pid: int) -> None
+        - process() -> Optional[Tuple[int, int]]
+          (returns (next_hop, pid) if it forwarded one this tick, and
+          calls `network.deliver(pid)` for packets addressed to itself)
+        - queue  (Iterable or list‑like storing its pending packet ids)
+
+    Only nodes with a non-empty queue are visited each tick (the busy
+    nodes), so `process()` must do nothing when the queue is empty.  They
+    are still visited in node order, which keeps the results identical
+    to polling every node.
     """
 
-    def __init__(self, graph: Graph, node_cls: Type):
+    def __init__(self, graph: Graph, node_cls: Type,
+                 keep_delivered: bool = True,
+                 metrics: Optional[object] = None,
+                 q_store: Optional[Type] = None,
+                 q_tables: Optional[Type] = None,
+                 queue_policy: Optional[Type] = None):
         """
         Parameters
         ----------
-        graph     : {node_id: [(neighbor_id, weight), ...], ...}
-        node_cls  : class implementing the interface described above
+        graph          : {node_id: [(neighbor_id, weight), ...], ...} or a
+                         `CSRGraph`; converted (or copied) once to
+                         `self.csr`, which nodes, routing tables and Q
+                         stores all read and link events (`add_link`
+                         etc.) change in place
+        node_cls       : class implementing the interface described above
+        keep_delivered : append a `Packet` dict view of every delivered
+                         packet to `delivered_packets` (legacy interface)
+        metrics        : streaming sink with
+                         `record(src, dst, created_at, delivered_at)`
+                         called on every delivery (e.g. `DeliveryStats`)
+        q_store        : shared Q-value storage for Q-learning nodes, built
+                         as `q_store(csr)` (e.g. `DenseQTable`); None
+                         keeps per-node dict tables
+        q_tables       : allocator for those per-node dict tables, built
+                         as `q_tables(csr)` (e.g. `LazyQTables` for rows
+                         created on first use); None allocates every
+                         row up front
+        queue_policy   : bounded queues with a drop policy, built as
+                         `queue_policy(csr)` (e.g. `QueuePolicy.TailDrop`);
+                         None keeps queues unbounded.  Dropped packets
+                         are counted in `dropped` and passed to
+                         `metrics.record_drop` when the sink has it
         """
         self.time               = 0
+        self.packets            = PacketPool()
+        self.keep_delivered     = keep_delivered
+        self.metrics            = metrics
         self.delivered_packets  : List[Packet] = []
+        self.dropped            = 0
         self.graph = graph
+        # A copy: link events must not change the caller's graph
+        self.csr   = graph.copy() if isinstance(graph, CSRGraph) else CSRGraph.from_dict(graph)
+        self.q_store = q_store(self.csr) if q_store is not None else None
+        self.q_tables = q_tables(self.csr) if q_tables is not None else None
+        self.queue_policy = queue_policy(self.csr) if queue_policy is not None else None
         self.nodes: Dict[int, object] = {
-            nid: node_cls(nid, [nbr for nbr, _ in neigh], network=self)
-            for nid, neigh in graph.items()
+            nid: node_cls(nid, self.csr.neighbor_ids(i), network=self)
+            for i, nid in enumerate(self.csr.node_ids)
         }
+        # Dense index -> node id, for index-based traffic draws
+        self._node_ids  = self.csr.node_ids
+        self._all_idx   = range(len(self._node_ids))
+        self._other_idx = range(len(self._node_ids) - 1)
+        self._node_list = list(self.nodes.values())
+        self._index     = self.csr.index
+        # Busy nodes (dense indices with queued packets): a flag per node,
+        # the nodes still busy after the last tick in ascending order, and
+        # the nodes woken up since, in arrival order
+        self._busy  = bytearray(len(self._node_ids))
+        self._order: List[int] = []
+        self._woken: List[int] = []
 
     # ------------------------------------------------------------------
     # Packet‑injection helpers
     # ------------------------------------------------------------------
-    def _new_packet(self, src: int, dst: int) -> Packet:
-        return {
-            "src":         src,
-            "dst":         dst,
-            "created_at":  self.time,
-            "next_hop":    None,
-            "delivered_at": None,
-        }
+    def _new_packet(self, src: int, dst: int) -> int:
+        return self.packets.alloc(src, dst, self.time)
 
     def inject_packet(self, src: int, dst: int) -> None:
-        self.nodes[src].receive_packet(self._new_packet(src, dst))
+        i = self._index[src]
+        if self.queue_policy is None:
+            self.nodes[src].receive_packet(self._new_packet(src, dst))
+        else:
+            self._enqueue(i, self._new_packet(src, dst))
+        if not self._busy[i]:
+            self._busy[i] = 1
+            self._woken.append(i)
 
     def inject_random_packets(self, load: float) -> None:
         """
@@ -58,11 +117,21 @@ class Network:
         if random.random() < (load - n):
             n += 1
 
-        node_ids = list(self.nodes.keys())
+        # O(1) per packet: draw dst among the N-1 other nodes by index and
+        # skip over src.  Consumes `random` exactly like the old
+        # choice(all) / choice(all but src) pair.
+        node_ids = self._node_ids
         for _ in range(n):
-            src = random.choice(node_ids)
-            dst = random.choice([v for v in node_ids if v != src])
-            self.inject_packet(src, dst)
+            i = random.choice(self._all_idx)
+            k = random.choice(self._other_idx)
+            self.inject_packet(node_ids[i], node_ids[k + (k >= i)])
+
+    def inject_traffic(self, traffic) -> None:
+        """Inject this tick's packets from a `traffic.Traffic` source or a `traces.TraceReplay`."""
+        src, dst = traffic.at(self.time)
+        node_ids = self._node_ids
+        for i, k in zip(src.tolist(), dst.tolist()):
+            self.inject_packet(node_ids[i], node_ids[k])
 
     # ------------------------------------------------------------------
     # Simulation step
@@ -70,31 +139,189 @@ class Network:
     def tick(self) -> None:
         """
         One time‑unit of network activity:
-        1. Each node dequeues (at most) one packet and decides a next hop.
+        1. Each busy node dequeues one packet and decides a next hop.
         2. Those packets are delivered to the next hop’s input queue.
         3. Global clock increments.
         """
-        to_deliver: Dict[int, List[Packet]] = defaultdict(list)
+        self._forward(self._process_active())
+        self.time += 1
 
-        # 1. Processing
-        for node in self.nodes.values():
+    def _process_active(self) -> Dict[int, List[int]]:
+        """Step 1: busy nodes process, in node order; returns next_hop -> pids."""
+        to_deliver: Dict[int, List[int]] = defaultdict(list)
+        order = self._order
+        if self._woken:
+            # An ascending run plus the (few) woken nodes: Timsort sorts
+            # the latter and merges them in, rather than sorting it all
+            order += self._woken
+            order.sort()
+            self._woken = []
+        busy = self._busy
+        nodes = self._node_list
+        still_busy = []
+        for i in order:
+            node = nodes[i]
             result = node.process()
+            if node.queue:
+                still_busy.append(i)
+            else:
+                busy[i] = 0
             if result:
-                next_hop, packet = result
-                to_deliver[next_hop].append(packet)
+                next_hop, pid = result
+                to_deliver[next_hop].append(pid)
+        self._order = still_busy
+        return to_deliver
 
-        # 2. Delivery
-        for nid, pkts in to_deliver.items():
-            for p in pkts:
-                self.nodes[nid].receive_packet(p)
+    def _forward(self, to_deliver: Dict[int, List[int]]) -> None:
+        """Step 2: hand forwarded packets to their next hops' queues."""
+        index = self._index
+        busy = self._busy
+        woken = self._woken
+        if self.queue_policy is not None:
+            for nid, pids in to_deliver.items():
+                i = index[nid]
+                for pid in pids:
+                    self._enqueue(i, pid)
+                if not busy[i]:
+                    busy[i] = 1
+                    woken.append(i)
+            return
+        for nid, pids in to_deliver.items():
+            receive = self.nodes[nid].receive_packet
+            for pid in pids:
+                receive(pid)
+            i = index[nid]
+            if not busy[i]:
+                busy[i] = 1
+                woken.append(i)
 
-        self.time += 1
+    def _enqueue(self, i: int, pid: int) -> None:
+        """Admit `pid` to node i's queue through the queue policy."""
+        dropped = self.queue_policy.enqueue(i, self._node_list[i], pid)
+        if dropped is not None:
+            self.drop(dropped)
+
+    def run(self, until: int, traffic=None) -> None:
+        """
+        Tick until `self.time == until`, injecting from `traffic` (a
+        `traffic.Traffic` or `traces.TraceReplay`) before every tick.
+
+        Stretches with no packet in flight are skipped in one step, up to
+        the source's next arrival.  Per-tick side effects outside the
+        network (e.g. `SQRWALT.tick_update`) are not run; callers stop at
+        those boundaries themselves.
+        """
+        while self.time < until:
+            if not self._order and not self._woken:
+                arrival = traffic.next_arrival(self.time) if traffic is not None else None
+                if arrival is None or arrival >= until:
+                    self.time = until
+                    return
+                self.time = arrival
+            if traffic is not None:
+                self.inject_traffic(traffic)
+            self.tick()
+
+    def deliver(self, pid: int) -> None:
+        """Called by a node when packet `pid` reaches its destination."""
+        packets = self.packets
+        packets.delivered_at[pid] = self.time
+        if self.metrics is not None:
+            self.metrics.record(packets.src[pid], packets.dst[pid],
+                                packets.created_at[pid], self.time)
+        if self.keep_delivered:
+            self.delivered_packets.append(packets.view(pid))
+        packets.free(pid)
+
+    def drop(self, pid: int) -> None:
+        """Discard packet `pid` (a full queue had no room for it)."""
+        packets = self.packets
+        self.dropped += 1
+        if self.metrics is not None and hasattr(self.metrics, "record_drop"):
+            self.metrics.record_drop(packets.src[pid], packets.dst[pid],
+                                     packets.created_at[pid], self.time)
+        packets.free(pid)
+
+    # ------------------------------------------------------------------
+    # Topology changes
+    # ------------------------------------------------------------------
+    def add_link(self, u: int, v: int, weight: float = 1.0) -> None:
+        """
+        Bring up an (undirected) link between nodes u and v; each becomes
+        the other's last neighbour.  Nodes with `add_neighbor` (QNode and
+        subclasses) extend their Q rows in place; BellmanFordNode tables
+        are repaired for the affected destinations only.
+        """
+        i, j = self._index[u], self._index[v]
+        self.csr.add_arc(i, j, weight)
+        self.csr.add_arc(j, i, weight)
+        self._link_changed(u, v, "add_neighbor")
+        repair_next_hops(self, [(i, j, math.inf, weight), (j, i, math.inf, weight)])
+
+    def remove_link(self, u: int, v: int) -> None:
+        """
+        Fail the link between u and v.  Packets already queued stay
+        where they are; a BellmanFordNode with no route left to a
+        packet's destination drops it.
+        """
+        i, j = self._index[u], self._index[v]
+        if len(self.nodes[u].neighbors) == 1 or len(self.nodes[v].neighbors) == 1:
+            raise ValueError(f"removing link {u}-{v} would leave a node without neighbours")
+        w_ij = self.csr.remove_arc(i, j)
+        w_ji = self.csr.remove_arc(j, i)
+        self._link_changed(u, v, "remove_neighbor")
+        repair_next_hops(self, [(i, j, w_ij, math.inf), (j, i, w_ji, math.inf)])
+
+    def set_weight(self, u: int, v: int, weight: float) -> None:
+        """
+        Change the cost of the link between u and v.  Only the shortest
+        paths (BellmanFordNode) see weights; Q-learning nodes learn
+        delivery times from queueing instead.
+        """
+        i, j = self._index[u], self._index[v]
+        w_ij = self.csr.set_arc_weight(i, j, weight)
+        w_ji = self.csr.set_arc_weight(j, i, weight)
+        repair_next_hops(self, [(i, j, w_ij, weight), (j, i, w_ji, weight)])
+
+    def _link_changed(self, u: int, v: int, hook: str) -> None:
+        if self.q_tables is not None and hasattr(self.q_tables, "topology_changed"):
+            self.q_tables.topology_changed()
+        self._neighbor_changed(u, v, hook)
+        self._neighbor_changed(v, u, hook)
+
+    def _neighbor_changed(self, a: int, b: int, hook: str) -> None:
+        """Run node a's `add_neighbor` / `remove_neighbor` hook for b (or edit its list)."""
+        node = self.nodes[a]
+        if hasattr(node, hook):
+            getattr(node, hook)(b)
+        elif hook == "add_neighbor":
+            node.neighbors.append(b)
+        else:
+            node.neighbors.remove(b)
+
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+    def save_checkpoint(self, path: str) -> None:
+        """Write the full simulation state to `path` (see `checkpoint`)."""
+        checkpoint.save_checkpoint(self, path)
+
+    def load_checkpoint(self, path: str) -> None:
+        """
+        Restore a `save_checkpoint` file into this network, which must be
+        built from the same graph, node class and options.
+        """
+        checkpoint.load_checkpoint(self, path)
 
     # ------------------------------------------------------------------
     # Metrics
     # ------------------------------------------------------------------
     def get_active_packets(self) -> int:
-        return sum(len(getattr(n, "queue", [])) for n in self.nodes.values())
+        nodes = self._node_list
+        return sum(len(nodes[i].queue) for i in self._order + self._woken)
 
     def get_delivered_packets_count(self) -> int:
-        return len(self.delivered_packets)
\ No newline at end of file
+        return len(self.delivered_packets)
+
+    def get_dropped_packets_count(self) -> int:
+        return self.dropped
\ No newline at end of file
@@ -8,16 +8,15 @@ class Node:
         self.queue = deque()
         self.network = network       
 
-    def receive_packet(self, packet):
-        self.queue.append(packet)
+    def receive_packet(self, pid):
+        self.queue.append(pid)
 
     def process(self):
         if not self.queue:
             return None
-        packet = self.queue.popleft()
-        if packet['dst'] == self.id:
-            packet['delivered_at'] = self.network.time  
-            self.network.delivered_packets.append(packet)
+        pid = self.queue.popleft()
+        if self.network.packets.dst[pid] == self.id:
+            self.network.deliver(pid)
             return None
         next_hop = random.choice(self.neighbors) 
-        return next_hop, packet
\ No newline at end of file
+        return next_hop, pid
\ No newline at end of file
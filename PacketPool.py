@@ -0,0 +1,125 @@
+from array import array
+from typing import Dict
+
+import numpy as np
+
+Packet = Dict[str, object]
+
+
+class PacketPool:
+    """
+    Struct-of-arrays packet store.
+
+    Every packet is an integer id into four parallel int64 columns
+    (`src`, `dst`, `created_at`, `delivered_at`); queues only hold ids.
+    Ids of delivered packets go back on a free-list and are reused, so
+    the columns are sized by the peak number of packets in flight.
+
+    Columns are `array.array`s so that per-packet reads from Python
+    return plain ints (as cheap as the old dict lookups).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.src          = array("q")
+        self.dst          = array("q")
+        self.created_at   = array("q")
+        self.delivered_at = array("q")
+        self._free: list = []
+        self._grow(capacity)
+
+    def _grow(self, extra: int) -> None:
+        old = len(self.src)
+        zeros = bytes(8 * extra)
+        for col in (self.src, self.dst, self.created_at, self.delivered_at):
+            col.frombytes(zeros)
+        # Pop from the end: hand out low ids first
+        self._free.extend(range(old + extra - 1, old - 1, -1))
+
+    def alloc(self, src: int, dst: int, created_at: int) -> int:
+        if not self._free:
+            self._grow(len(self.src))
+        pid = self._free.pop()
+        self.src[pid] = src
+        self.dst[pid] = dst
+        self.created_at[pid] = created_at
+        self.delivered_at[pid] = -1
+        return pid
+
+    def free(self, pid: int) -> None:
+        self._free.append(pid)
+
+    def view(self, pid: int) -> Packet:
+        """The packet as the legacy dict (a snapshot, safe after `free`)."""
+        delivered_at = self.delivered_at[pid]
+        return {
+            "src":          self.src[pid],
+            "dst":          self.dst[pid],
+            "created_at":   self.created_at[pid],
+            "next_hop":     None,
+            "delivered_at": delivered_at if delivered_at >= 0 else None,
+        }
+
+    def __len__(self) -> int:
+        """Number of packets currently allocated (in flight)."""
+        return len(self.src) - len(self._free)
+
+
+class VectorPacketPool:
+    """
+    NumPy flavour of `PacketPool` for the array engine: same columns,
+    but packets are allocated and released in batches.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.src          = np.zeros(0, dtype=np.int64)
+        self.dst          = np.zeros(0, dtype=np.int64)
+        self.created_at   = np.zeros(0, dtype=np.int64)
+        self.delivered_at = np.zeros(0, dtype=np.int64)
+        self._free        = np.zeros(0, dtype=np.int64)
+        self._num_free    = 0
+        self._grow(capacity)
+
+    def _grow(self, extra: int) -> None:
+        old = len(self.src)
+        new = old + max(extra, old)
+        for name in ("src", "dst", "created_at", "delivered_at"):
+            col = np.zeros(new, dtype=np.int64)
+            col[:old] = getattr(self, name)
+            setattr(self, name, col)
+        free = np.empty(new, dtype=np.int64)
+        free[:self._num_free] = self._free[:self._num_free]
+        # Hand out low ids first
+        fresh = np.arange(new - 1, old - 1, -1, dtype=np.int64)
+        free[self._num_free:self._num_free + len(fresh)] = fresh
+        self._free = free
+        self._num_free += len(fresh)
+
+    def alloc(self, src: np.ndarray, dst: np.ndarray, created_at: int) -> np.ndarray:
+        k = len(src)
+        if k > self._num_free:
+            self._grow(k - self._num_free)
+        self._num_free -= k
+        pids = self._free[self._num_free:self._num_free + k][::-1].copy()
+        self.src[pids] = src
+        self.dst[pids] = dst
+        self.created_at[pids] = created_at
+        self.delivered_at[pids] = -1
+        return pids
+
+    def free(self, pids: np.ndarray) -> None:
+        k = len(pids)
+        self._free[self._num_free:self._num_free + k] = pids
+        self._num_free += k
+
+    def view(self, pid: int) -> Packet:
+        delivered_at = int(self.delivered_at[pid])
+        return {
+            "src":          int(self.src[pid]),
+            "dst":          int(self.dst[pid]),
+            "created_at":   int(self.created_at[pid]),
+            "next_hop":     None,
+            "delivered_at": delivered_at if delivered_at >= 0 else None,
+        }
+
+    def __len__(self) -> int:
+        return len(self.src) - self._num_free
@@ -0,0 +1,574 @@
+import math
+import multiprocessing
+import os
+import random
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+from CSRGraph import CSRGraph, Graph
+from PacketPool import Packet, PacketPool
+from bellman_ford.BellmanFordNode import BellmanFordNode
+from bellman_ford.routing_table import shortest_paths
+
+
+# ----------------------------------------
+# Partitioning
+# ----------------------------------------
+def band_partition(csr: CSRGraph, num_bands: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split the nodes into `num_bands` runs of consecutive nodes ("bands")
+    such that every edge stays inside a band or joins adjacent bands.
+
+    Returns (order, bounds): band b holds the dense indices
+    order[bounds[b]:bounds[b + 1]].  When equal slices of the node order
+    already qualify (row-major grids do) the order is kept; otherwise the
+    nodes are ordered by BFS level from a peripheral node of their
+    component and every band is a run of whole levels, balanced by node
+    count.  Raises ValueError if the graph has fewer levels than bands.
+    """
+    n = csr.num_nodes
+    if not 1 <= num_bands <= n:
+        raise ValueError(f"cannot split {n} nodes into {num_bands} bands")
+    src, dst = csr.edges()
+    band = np.arange(n) * num_bands // n
+    if np.all(np.abs(band[src] - band[dst]) <= 1):
+        return np.arange(n), np.searchsorted(band, np.arange(num_bands + 1))
+
+    level = _bfs_levels(csr)
+    ends = np.cumsum(np.bincount(level))
+    num_levels = len(ends)
+    if num_levels < num_bands:
+        raise ValueError(f"the graph has {num_levels} BFS levels, too few for {num_bands} bands")
+    # cuts[b]: number of levels in the bands before b; each band gets at
+    # least one level and roughly n / num_bands nodes
+    cuts = [0]
+    for b in range(1, num_bands):
+        target = b * n / num_bands
+        k = int(np.searchsorted(ends, target)) + 1
+        if k > 1 and target - ends[k - 2] < ends[k - 1] - target:
+            k -= 1
+        cuts.append(min(max(k, cuts[-1] + 1), num_levels - (num_bands - b)))
+    bounds = np.array([0] + [int(ends[k - 1]) for k in cuts[1:]] + [n])
+    return np.argsort(level, kind="stable"), bounds
+
+
+def _bfs_levels(csr: CSRGraph) -> np.ndarray:
+    """
+    BFS level of every node over the undirected graph, numbered on from
+    one component to the next.  Each component is searched from the node
+    farthest from its first node, so it spreads over many levels.
+    """
+    src, dst = csr.edges()
+    sym = CSRGraph.from_edges(csr.num_nodes, src, dst)
+    indptr, indices = sym.indptr.tolist(), sym.indices.tolist()
+    level = np.full(csr.num_nodes, -1, dtype=np.int64)
+    base = 0
+    for start in range(csr.num_nodes):
+        if level[start] >= 0:
+            continue
+        order, _ = _bfs(indptr, indices, start)
+        order, depth = _bfs(indptr, indices, order[-1])
+        level[order] = base + np.array([depth[v] for v in order])
+        base += depth[order[-1]] + 1
+    return level
+
+
+def _bfs(indptr: List[int], indices: List[int], root: int):
+    """(visit order, {node: depth}) of a BFS from `root`."""
+    depth = {root: 0}
+    order = [root]
+    frontier = order
+    while frontier:
+        found = []
+        for u in frontier:
+            d = depth[u] + 1
+            for v in indices[indptr[u]:indptr[u + 1]]:
+                if v not in depth:
+                    depth[v] = d
+                    found.append(v)
+        order.extend(found)
+        frontier = found
+    return order, depth
+
+
+# ----------------------------------------
+# Engine
+# ----------------------------------------
+class PartitionedNetwork:
+    """
+    `Network` split across worker processes, each simulating its own
+    part of the graph.
+
+    The nodes are cut into 2 × `workers` bands (`band_partition`), so
+    every edge stays inside a band or joins adjacent bands; worker w owns
+    bands 2w and 2w + 1.  `Network` processes a tick in node order, so
+    band b sees the Q updates bands < b made earlier in the tick and the
+    state bands > b had before it.  The workers run as a pipeline one
+    tick apart to keep that order: worker w processes its first band for
+    tick t once worker w - 1 has finished tick t, and its second band
+    once worker w + 1 has processed its first band for tick t - 1.
+    After each band a worker sends the neighbouring worker one batched
+    message: the packets it forwarded across the cut, and the Q updates
+    of its nodes next to the cut.  The receiver applies the updates to
+    read-only copies ("ghosts") of those nodes, which is where its own
+    nodes read neighbour estimates.
+
+    Processing band by band is node order for `csr`, which keeps the
+    node ids of `graph` but lists them band by band (unchanged when
+    `graph` already is banded, e.g. a row-major grid).  Runs reproduce
+    `Network(net.csr, node_cls)` exactly for deterministic routing
+    (BellmanFordNode, QNode): packets are drawn from `random` in this
+    process, as `Network` draws them, and deliveries reach `metrics` in
+    the same order.  Random next-hop choices (Node, StochasticQNode,
+    SQRWALT) use a `random` stream per worker, so those runs match
+    statistically rather than draw for draw.
+
+    Each worker ticks only its own nodes, so graphs with many BFS levels
+    (grids, geometric graphs) scale with the number of workers; small
+    world graphs have few levels, which caps the number of bands.  Q
+    tables are per-node dicts, eager or from `LazyQTables` without a row
+    limit (an LRU table's order also depends on its neighbours' reads).
+    `close()` (or leaving a `with` block) stops the workers.
+    """
+
+    def __init__(self, graph: Graph, node_cls: Type,
+                 workers: Optional[int] = None,
+                 seed: Optional[int] = None,
+                 keep_delivered: bool = True,
+                 metrics: Optional[object] = None,
+                 q_tables: Optional[Type] = None,
+                 update_interval: int = 0):
+        """
+        Parameters
+        ----------
+        graph           : {node_id: [(neighbor_id, weight), ...], ...} or a
+                          `CSRGraph`
+        node_cls        : per-node class, as for `Network`
+        workers         : worker processes (None: one per CPU, fewer if
+                          the graph has too few BFS levels)
+        seed            : seeds the workers' `random` streams
+        keep_delivered  : append a `Packet` dict view of every delivered
+                          packet to `delivered_packets`
+        metrics         : streaming sink with
+                          `record(src, dst, created_at, delivered_at)`
+                          (e.g. `DeliveryStats`)
+        q_tables        : per-node Q table allocator, as for `Network`
+        update_interval : SQRWALT temperature update period in ticks
+                          (0: never)
+        """
+        base = CSRGraph.from_dict(graph)
+        if q_tables is not None and getattr(q_tables(base), "max_rows", None) is not None:
+            raise ValueError("LRU Q tables (max_rows) are not supported by PartitionedNetwork")
+        if workers is None:
+            workers = min(os.cpu_count() or 1, max(base.num_nodes // 2, 1))
+            while True:
+                try:
+                    order, bounds = band_partition(base, 2 * workers)
+                    break
+                except ValueError:
+                    if workers == 1:
+                        raise
+                    workers -= 1
+        else:
+            order, bounds = band_partition(base, 2 * workers)
+
+        self.time            = 0
+        self.graph           = graph
+        self.csr             = base if np.all(order == np.arange(len(order))) else base.reorder(order)
+        self.workers         = workers
+        self.keep_delivered  = keep_delivered
+        self.metrics         = metrics
+        self.update_interval = update_interval
+        self.delivered_packets: List[Packet] = []
+        self.dropped         = 0
+        self.active_packets  = 0
+
+        self._node_ids  = self.csr.node_ids
+        self._all_idx   = range(len(self._node_ids))
+        self._other_idx = range(len(self._node_ids) - 1)
+        # Dense index -> owning worker
+        self._owner = (np.repeat(np.arange(2 * workers), np.diff(bounds)) // 2).tolist()
+        # Per worker: (tick, src, dst) of the packets to inject
+        self._inject: List[list] = [[] for _ in range(workers)]
+
+        ctx = multiprocessing.get_context("spawn")
+        links = [ctx.Pipe() for _ in range(workers - 1)]
+        self._conns = []
+        self._procs = []
+        for w in range(workers):
+            conn, child = ctx.Pipe()
+            lower = links[w - 1][1] if w > 0 else None
+            upper = links[w][0] if w < workers - 1 else None
+            proc = ctx.Process(target=_worker_main, daemon=True,
+                               args=(child, lower, upper, w, self.csr, node_cls,
+                                     bounds, q_tables, seed))
+            proc.start()
+            self._conns.append(conn)
+            self._procs.append(proc)
+
+    # ------------------------------------------------------------------
+    # Packet‑injection helpers
+    # ------------------------------------------------------------------
+    def inject_packet(self, src: int, dst: int) -> None:
+        """Queue a packet at `src`; it joins the queue before the next tick."""
+        self._inject[self._owner[self.csr.index[src]]].append((self.time, src, dst))
+
+    def inject_random_packets(self, load: float) -> None:
+        """This tick's packets, drawn exactly like `Network.inject_random_packets`."""
+        self._draw(self.time, load)
+
+    def _draw(self, tick: int, load: float) -> None:
+        n = int(math.floor(load))
+        if random.random() < (load - n):
+            n += 1
+        node_ids = self._node_ids
+        owner = self._owner
+        inject = self._inject
+        for _ in range(n):
+            i = random.choice(self._all_idx)
+            k = random.choice(self._other_idx)
+            inject[owner[i]].append((tick, node_ids[i], node_ids[k + (k >= i)]))
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+    def advance(self, n_ticks: int, load: float = -1.0) -> None:
+        """
+        Run `n_ticks` ticks, injecting `load` packets per tick with the
+        `inject_random_packets` model first (load < 0: no injection).
+        """
+        if n_ticks <= 0:
+            return
+        if load >= 0:
+            for tick in range(self.time, self.time + n_ticks):
+                self._draw(tick, load)
+        self._run(n_ticks)
+
+    def tick(self) -> None:
+        self._run(1)
+
+    def run(self, until: int, traffic=None) -> None:
+        """
+        Tick until `self.time == until`, injecting from `traffic` (a
+        `traffic.Traffic` or `traces.TraceReplay`) before every tick.  As
+        in `advance`, SQRWALT temperatures are updated every
+        `update_interval` ticks.
+        """
+        if traffic is not None:
+            node_ids = self._node_ids
+            owner = self._owner
+            for tick in range(self.time, until):
+                src, dst = traffic.at(tick)
+                for i, k in zip(src.tolist(), dst.tolist()):
+                    self._inject[owner[i]].append((tick, node_ids[i], node_ids[k]))
+        self._run(until - self.time)
+
+    def _run(self, n_ticks: int) -> None:
+        if n_ticks <= 0:
+            return
+        for conn, inject in zip(self._conns, self._inject):
+            conn.send(("advance", self.time, n_ticks, self.update_interval, inject))
+        self._inject = [[] for _ in range(self.workers)]
+        replies = [conn.recv() for conn in self._conns]
+        self.time += n_ticks
+        self.active_packets = sum(active for _, active in replies)
+
+        # (tick, node index) is unique and orders the events as
+        # `Network` would have produced them
+        metrics = self.metrics
+        record_drop = getattr(metrics, "record_drop", None)
+        for tick, _, dropped, src, dst, created in sorted(e for events, _ in replies for e in events):
+            if dropped:
+                self.dropped += 1
+                if record_drop is not None:
+                    record_drop(src, dst, created, tick)
+                continue
+            if metrics is not None:
+                metrics.record(src, dst, created, tick)
+            if self.keep_delivered:
+                self.delivered_packets.append({
+                    "src": src, "dst": dst, "created_at": created,
+                    "next_hop": None, "delivered_at": tick,
+                })
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        for conn in self._conns:
+            try:
+                conn.send(("close",))
+            except OSError:
+                pass    # the worker is gone already
+        for proc in self._procs:
+            proc.join()
+        self._conns, self._procs = [], []
+
+    def __enter__(self) -> "PartitionedNetwork":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except AttributeError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def get_active_packets(self) -> int:
+        return self.active_packets
+
+    def get_delivered_packets_count(self) -> int:
+        return len(self.delivered_packets)
+
+    def get_dropped_packets_count(self) -> int:
+        return self.dropped
+
+
+# ----------------------------------------
+# Workers
+# ----------------------------------------
+def _worker_main(conn, lower, upper, w: int, csr: CSRGraph, node_cls: Type,
+                 bounds: np.ndarray, q_tables: Optional[Type], seed: Optional[int]) -> None:
+    random.seed(None if seed is None else f"{seed}/{w}")
+    part = _Partition(w, lower, upper, csr, node_cls, bounds, q_tables)
+    while True:
+        message = conn.recv()
+        if message[0] == "close":
+            return
+        _, t0, n_ticks, update_interval, inject = message
+        conn.send(part.advance(t0, n_ticks, update_interval, inject))
+
+
+class _Partition:
+    """
+    Worker w's share of a `PartitionedNetwork`: the nodes of band 2w
+    (half 0) and band 2w + 1 (half 1), and ghosts of their neighbours on
+    other workers.  Stands in for `Network` as the nodes' `network`.
+
+    `lower` / `upper` are the connections to workers w - 1 / w + 1 (None
+    at the ends).  Messages are (forwarded, updates): forwarded packets
+    as (next_hop, src, dst, created_at), Q updates as
+    (node, dst, neighbor, value).
+    """
+    q_store      = None
+    queue_policy = None
+
+    def __init__(self, w: int, lower, upper, csr: CSRGraph, node_cls: Type,
+                 bounds: np.ndarray, q_tables: Optional[Type]):
+        self.time     = 0
+        self.csr      = csr
+        self.packets  = PacketPool()
+        self.q_tables = q_tables(csr) if q_tables is not None else None
+        self.lower    = lower
+        self.upper    = upper
+
+        ids = csr.node_ids
+        own = range(int(bounds[2 * w]), int(bounds[2 * w + 2]))
+        self._halves = (range(int(bounds[2 * w]), int(bounds[2 * w + 1])),
+                        range(int(bounds[2 * w + 1]), int(bounds[2 * w + 2])))
+        # Band relative to this worker: 0 / 1 are ours, -1 / 2 the neighbours'
+        half = (np.repeat(np.arange(len(bounds) - 1), np.diff(bounds)) - 2 * w).tolist()
+
+        if issubclass(node_cls, BellmanFordNode):
+            # `next_hops_for` finds these; only our own rows are built
+            _, _, next_hop = shortest_paths(csr)
+            self._next_hops = {
+                ids[i]: {dst: ids[hop] for dst, hop in zip(ids, next_hop[i].tolist()) if hop >= 0}
+                for i in own
+            }
+        self.nodes: Dict[int, object] = {}
+        self._node: Dict[int, object] = {}
+        for i in own:
+            node = node_cls(ids[i], csr.neighbor_ids(i), network=self)
+            self.nodes[ids[i]] = node
+            self._node[i] = node
+
+        # Nodes next to the cut publish their Q updates; the neighbours
+        # across it are mirrored by ghosts (only estimates are read)
+        learns = hasattr(node_cls, "get_estimate")
+        self._publish = (set(), set())
+        self._half_of: Dict[int, int] = {}
+        for i in own:
+            self._half_of[ids[i]] = half[i]
+            for j in csr.neighbors(i).tolist():
+                if 0 <= half[j] <= 1:
+                    continue
+                self._half_of[ids[j]] = half[j]
+                if learns:
+                    self._publish[half[i]].add(i)
+                    if ids[j] not in self.nodes:
+                        self.nodes[ids[j]] = node_cls(ids[j], csr.neighbor_ids(j), network=self)
+
+        self._updates = hasattr(node_cls, "tick_update")
+        # Busy nodes of each half, as in `Network`: a flag per node, the
+        # nodes still busy after the last tick in ascending order, and the
+        # nodes woken up since
+        self._busy  = bytearray(csr.num_nodes)
+        self._order = [[], []]
+        self._woken = [[], []]
+        self._events: list = []
+        self._current = -1
+        self._ticked = False
+        # Packets forwarded last tick: _fwd[y][x] = {next_hop: [pid, ...]}
+        # from half y into half x, and the lower worker's into half 0
+        self._fwd = [[{}, {}], [{}, {}]]
+        self._from_lower: list = []
+        self._to_second: Dict[int, List[int]] = {}
+        self._sent_lower = 0
+
+    # ------------------------------------------------------------------
+    # Ticking
+    # ------------------------------------------------------------------
+    def advance(self, t0: int, n_ticks: int, update_interval: int, inject: list):
+        """Run ticks t0 .. t0 + n_ticks - 1; returns (events, packets in flight)."""
+        by_tick = defaultdict(list)
+        for tick, src, dst in inject:
+            by_tick[tick].append((src, dst))
+        for t in range(t0, t0 + n_ticks):
+            self.time = t
+            self._first_half(t, update_interval, by_tick.get(t, ()))
+            self._second_half(t, update_interval, by_tick.get(t, ()))
+            self._ticked = True
+        events, self._events = self._events, []
+        return events, self._in_flight()
+
+    def _first_half(self, t: int, update_interval: int, inject) -> None:
+        # Last tick's packets into half 0, in sender order
+        self._merge(0, self._from_lower, self._fwd[0][0], self._fwd[1][0])
+        self._from_lower = []
+        if self.lower is not None:
+            # Worker w - 1 has finished tick t
+            self._from_lower, updates = self.lower.recv()
+            self._apply(updates)
+        self._start(0, t, update_interval, inject)
+        local, forwarded, updates = self._process(0)
+        self._fwd[0][0], self._to_second = local
+        if self.lower is not None:
+            self.lower.send((forwarded, updates))
+            self._sent_lower = len(forwarded)
+
+    def _second_half(self, t: int, update_interval: int, inject) -> None:
+        from_upper = []
+        if self.upper is not None and self._ticked:
+            # Worker w + 1's first half of tick t - 1
+            from_upper, updates = self.upper.recv()
+            self._apply(updates)
+        self._merge(1, self._fwd[0][1], self._fwd[1][1], from_upper)
+        self._fwd[0][1] = self._to_second
+        self._start(1, t, update_interval, inject)
+        local, forwarded, updates = self._process(1)
+        self._fwd[1] = list(local)
+        if self.upper is not None:
+            self.upper.send((forwarded, updates))
+
+    def _merge(self, x: int, *sources) -> None:
+        """Queue forwarded packets at half x's nodes, source by source."""
+        nodes = self.nodes
+        index = self.csr.index
+        busy, woken = self._busy, self._woken[x]
+        for source in sources:
+            if isinstance(source, dict):
+                for nid, pids in source.items():
+                    receive = nodes[nid].receive_packet
+                    for pid in pids:
+                        receive(pid)
+                    i = index[nid]
+                    if not busy[i]:
+                        busy[i] = 1
+                        woken.append(i)
+            else:
+                alloc = self.packets.alloc
+                for nid, src, dst, created in source:
+                    nodes[nid].receive_packet(alloc(src, dst, created))
+                    i = index[nid]
+                    if not busy[i]:
+                        busy[i] = 1
+                        woken.append(i)
+
+    def _start(self, x: int, t: int, update_interval: int, inject) -> None:
+        """What `Network` does between ticks: SQRWALT updates, then injection."""
+        if self._updates and update_interval and t > 0 and t % update_interval == 0:
+            for i in self._halves[x]:
+                self._node[i].tick_update()
+        index = self.csr.index
+        half_of = self._half_of
+        busy, woken = self._busy, self._woken[x]
+        for src, dst in inject:
+            if half_of[src] == x:
+                self.nodes[src].receive_packet(self.packets.alloc(src, dst, t))
+                i = index[src]
+                if not busy[i]:
+                    busy[i] = 1
+                    woken.append(i)
+
+    def _process(self, x: int):
+        """Half x's busy nodes process, in node order (`Network._process_active`)."""
+        local = (defaultdict(list), defaultdict(list))
+        forwarded, updates = [], []
+        packets = self.packets
+        half_of = self._half_of
+        publish = self._publish[x]
+        nodes = self._node
+        order = self._order[x]
+        if self._woken[x]:
+            order += self._woken[x]
+            order.sort()
+            self._woken[x] = []
+        busy = self._busy
+        still_busy = self._order[x] = []
+        for i in order:
+            node = nodes[i]
+            self._current = i
+            result = node.process()
+            if node.queue:
+                still_busy.append(i)
+            else:
+                busy[i] = 0
+            if not result:
+                continue
+            next_hop, pid = result
+            dst = packets.dst[pid]
+            if i in publish:
+                updates.append((node.id, dst, next_hop, dict.__getitem__(node.q_table, dst)[next_hop]))
+            h = half_of[next_hop]
+            if h == 0 or h == 1:
+                local[h][next_hop].append(pid)
+            else:
+                forwarded.append((next_hop, packets.src[pid], dst, packets.created_at[pid]))
+                packets.free(pid)
+        return local, forwarded, updates
+
+    def _apply(self, updates) -> None:
+        nodes = self.nodes
+        for nid, dst, neighbor, value in updates:
+            nodes[nid].q_table[dst][neighbor] = value
+
+    def _in_flight(self) -> int:
+        """
+        Packets queued here or forwarded to us and not queued yet, plus
+        the last batch sent to worker w - 1, which it takes in next tick.
+        """
+        queued = sum(len(node.queue) for node in self._node.values())
+        pending = sum(len(pids) for by_half in self._fwd for fwd in by_half
+                      for pids in fwd.values())
+        return queued + pending + len(self._from_lower) + self._sent_lower
+
+    # ------------------------------------------------------------------
+    # Called by the nodes
+    # ------------------------------------------------------------------
+    def deliver(self, pid: int) -> None:
+        packets = self.packets
+        self._events.append((self.time, self._current, False, packets.src[pid],
+                             packets.dst[pid], packets.created_at[pid]))
+        packets.free(pid)
+
+    def drop(self, pid: int) -> None:
+        packets = self.packets
+        self._events.append((self.time, self._current, True, packets.src[pid],
+                             packets.dst[pid], packets.created_at[pid]))
+        packets.free(pid)
@@ -0,0 +1,122 @@
+import abc
+import random
+from typing import Dict, Optional
+
+import numpy as np
+
+from CSRGraph import CSRGraph
+
+
+class QueuePolicy(abc.ABC):
+    """
+    Bounded node queues, pluggable into `Network` as `queue_policy`
+    (built as `queue_policy(csr)`; bind options with
+    `functools.partial(RED, capacity=64)`).
+
+    Every packet arriving at node i (injected or forwarded) goes through
+    `enqueue(i, node, pid)`, which queues it with `node.receive_packet`
+    and returns the id of the packet it dropped to make room (possibly
+    `pid` itself), or None.  The network frees dropped packets and
+    counts them.  Subclasses decide which packet to drop.
+
+    capacity     : maximum queue length per node
+    backpressure : extra cost a QNode adds to its Q update target when
+                   the chosen next hop's queue is full, so learning
+                   steers away from full neighbours (None: off)
+    """
+
+    def __init__(self, csr: CSRGraph, capacity: int = 64,
+                 backpressure: Optional[float] = None):
+        if capacity < 1:
+            raise ValueError(f"queue capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.backpressure = backpressure
+        self.drops = np.zeros(csr.num_nodes, dtype=np.int64)
+
+    def full(self, queue) -> bool:
+        return len(queue) >= self.capacity
+
+    @abc.abstractmethod
+    def enqueue(self, i: int, node, pid: int) -> Optional[int]:
+        ...
+
+    # ------------------------------------------------------------------
+    # Checkpointing
+    # ------------------------------------------------------------------
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {"drops": self.drops.copy()}
+
+    def set_state(self, state: Dict[str, np.ndarray]) -> None:
+        self.drops[:] = state["drops"]
+
+
+class TailDrop(QueuePolicy):
+    """Drop the arriving packet when the queue is full."""
+
+    def enqueue(self, i: int, node, pid: int) -> Optional[int]:
+        if len(node.queue) >= self.capacity:
+            self.drops[i] += 1
+            return pid
+        node.receive_packet(pid)
+        return None
+
+
+class DropOldest(QueuePolicy):
+    """Drop the packet at the head of a full queue to admit the new one."""
+
+    def enqueue(self, i: int, node, pid: int) -> Optional[int]:
+        dropped = None
+        if len(node.queue) >= self.capacity:
+            dropped = node.queue.popleft()
+            self.drops[i] += 1
+        node.receive_packet(pid)
+        return dropped
+
+
+class RED(QueuePolicy):
+    """
+    Random early detection: each arrival updates an exponentially
+    weighted average of the queue length (weight `weight`).  Below
+    `min_th` (default capacity / 4) packets are admitted, from `max_th`
+    (default capacity * 3 / 4) on they are dropped, and in between
+    dropped with a probability rising linearly to `max_p`.  A full queue
+    always drops.  Draws come from a private generator seeded with
+    `seed`, so the traffic's `random` stream is unaffected.
+    """
+
+    def __init__(self, csr: CSRGraph, capacity: int = 64,
+                 backpressure: Optional[float] = None,
+                 min_th: Optional[float] = None, max_th: Optional[float] = None,
+                 max_p: float = 0.1, weight: float = 0.002, seed: Optional[int] = None):
+        super().__init__(csr, capacity, backpressure)
+        self.min_th = capacity / 4 if min_th is None else min_th
+        self.max_th = capacity * 3 / 4 if max_th is None else max_th
+        if not 0 <= self.min_th < self.max_th <= capacity:
+            raise ValueError("RED needs 0 <= min_th < max_th <= capacity")
+        self.max_p = max_p
+        self.weight = weight
+        self.avg = [0.0] * csr.num_nodes
+        self.rng = random.Random(seed)
+
+    def enqueue(self, i: int, node, pid: int) -> Optional[int]:
+        q = len(node.queue)
+        avg = self.avg[i] = self.avg[i] + self.weight * (q - self.avg[i])
+        if q >= self.capacity or avg >= self.max_th or (
+                avg > self.min_th and self.rng.random()
+                < self.max_p * (avg - self.min_th) / (self.max_th - self.min_th)):
+            self.drops[i] += 1
+            return pid
+        node.receive_packet(pid)
+        return None
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        version, internal, gauss = self.rng.getstate()
+        state = super().get_state()
+        state["avg"] = np.array(self.avg)
+        state["rng"] = np.array(internal, dtype=np.int64)
+        return state
+
+    def set_state(self, state: Dict[str, np.ndarray]) -> None:
+        super().set_state(state)
+        self.avg[:] = state["avg"].tolist()
+        self.rng.setstate((3, tuple(state["rng"].tolist()), None))
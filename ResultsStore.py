@@ -0,0 +1,248 @@
+import json
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from DelayHistogram import DelayHistogram
+
+
+def _normal(value):
+    """Tag value as stored (JSON round trip: tuples become lists)."""
+    return json.loads(json.dumps(value))
+
+
+def _matches(tags: Dict[str, object], filters: Dict[str, object]) -> bool:
+    for key, want in filters.items():
+        have = tags.get(key)
+        if callable(want):
+            if not want(have):
+                return False
+        elif isinstance(want, (set, frozenset)):
+            if have not in {_normal(w) for w in want}:
+                return False
+        elif have != _normal(want):
+            return False
+    return True
+
+
+class ResultsStore:
+    """
+    Append-only columnar store of per-interval experiment results.
+
+    A store is a directory of chunks.  Every appended run is split into
+    chunks of at most `chunk_rows` rows; each chunk holds one array per
+    column (time, count, mean, p95, loss, ...; a column may hold a row
+    of values per interval, e.g. histogram counts) and has a `.json`
+    sidecar with the run's tags (algorithm, topology hash, load
+    schedule, seed, ...), its row count and time range.  Chunks are
+    never rewritten and their names are unique, so appends are
+    incremental and safe from several processes at once.
+
+    compress=True  writes `.npz` chunks (zlib, one member per column;
+                   only the requested columns are decompressed)
+    compress=False writes one structured `.npy` per chunk, which reads
+                   memory-map (only the touched rows are paged in)
+
+    Queries read the sidecars first and open only the chunks of matching
+    runs whose time range overlaps the requested one.  Filters are
+    `tag=value` (equality), `tag={a, b}` (membership) or
+    `tag=predicate`; `run` filters on the run id (e.g.
+    `run=store.latest_runs(...)`).
+    """
+
+    def __init__(self, path: str, compress: bool = True, chunk_rows: int = 4096):
+        self.path = path
+        self.compress = compress
+        self.chunk_rows = chunk_rows
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def append(self, columns: Dict[str, Sequence], **tags) -> str:
+        """Store one run's columns (equal length) under `tags`; returns its run id."""
+        columns = {name: np.asarray(values) for name, values in columns.items()}
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"columns differ in length: {sorted(lengths)}")
+        rows = lengths.pop() if lengths else 0
+        run = f"{time.time_ns():x}-{uuid.uuid4().hex[:8]}"
+        tags = _normal(tags)
+        os.makedirs(self.path, exist_ok=True)
+
+        for k, start in enumerate(range(0, max(rows, 1), self.chunk_rows)):
+            chunk = {name: values[start:start + self.chunk_rows]
+                     for name, values in columns.items()}
+            name = f"{run}-{k:04d}"
+            n = len(next(iter(chunk.values()))) if chunk else 0
+            meta = {
+                "run": run, "chunk": k, "rows": n, "tags": tags,
+                "columns": list(chunk),
+                "format": "npz" if self.compress else "npy",
+            }
+            if n and "time" in chunk:
+                meta["time"] = [int(chunk["time"].min()), int(chunk["time"].max())]
+
+            base = os.path.join(self.path, name)
+            tmp = f"{base}.{os.getpid()}.tmp"
+            if self.compress:
+                np.savez_compressed(tmp + ".npz", **chunk)
+                os.replace(tmp + ".npz", base + ".npz")
+            else:
+                records = np.empty(n, dtype=[(c, v.dtype, v.shape[1:])
+                                             for c, v in chunk.items()])
+                for c, v in chunk.items():
+                    records[c] = v
+                np.save(tmp + ".npy", records)
+                os.replace(tmp + ".npy", base + ".npy")
+            # The sidecar goes last: a chunk without one is not visible yet
+            with open(tmp + ".json", "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp + ".json", base + ".json")
+        return run
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def _chunks(self, **filters) -> List[dict]:
+        chunks = []
+        if not os.path.isdir(self.path):
+            return chunks
+        for name in sorted(os.listdir(self.path)):
+            if not name.endswith(".json") or ".tmp" in name:
+                continue
+            with open(os.path.join(self.path, name)) as f:
+                meta = json.load(f)
+            if _matches(dict(meta["tags"], run=meta["run"]), filters):
+                meta["file"] = os.path.join(self.path, f"{name[:-5]}.{meta['format']}")
+                chunks.append(meta)
+        return chunks
+
+    def runs(self, **filters) -> List[Dict[str, object]]:
+        """Tags, run id and row count of every matching run, oldest first."""
+        runs: Dict[str, Dict[str, object]] = {}
+        for meta in self._chunks(**filters):
+            run = runs.setdefault(meta["run"], dict(meta["tags"], run=meta["run"], rows=0))
+            run["rows"] += meta["rows"]
+        return list(runs.values())
+
+    def latest_runs(self, by: Sequence[str] = ("seed",), **filters) -> Set[str]:
+        """
+        Ids of the newest matching run per distinct combination of the
+        `by` tags, so a rerun replaces an older run of the same seed
+        instead of being averaged with it.
+        """
+        latest: Dict[str, str] = {}
+        for run in self.runs(**filters):
+            latest[json.dumps([run.get(key) for key in by])] = run["run"]
+        return set(latest.values())
+
+    def load(self, columns: Optional[Sequence[str]] = None,
+             time: Optional[Tuple[float, float]] = None, **filters) -> Dict[str, np.ndarray]:
+        """
+        Rows of every matching run, concatenated.
+
+        columns : data columns to read (default: all); the result always
+                  has a "run" column and one column per scalar tag
+                  (other tags as JSON strings), so tag names may be
+                  listed too
+        time    : (lo, hi) keeps rows with lo <= time <= hi
+        """
+        parts: Dict[str, List[np.ndarray]] = {}
+        total = 0
+        for meta in self._chunks(**filters):
+            if time is not None and "time" in meta and (
+                    meta["time"][1] < time[0] or meta["time"][0] > time[1]):
+                continue
+            wanted = (meta["columns"] if columns is None
+                      else [c for c in columns if c in meta["columns"]])
+            needed = wanted + ["time"] if time is not None and "time" not in wanted else wanted
+            if meta["format"] == "npz":
+                with np.load(meta["file"], allow_pickle=False) as data:
+                    cols = {c: data[c] for c in needed}
+            else:
+                records = np.load(meta["file"], mmap_mode="r")
+                cols = {c: records[c] for c in needed}
+
+            rows = meta["rows"]
+            keep = slice(None)
+            if time is not None:
+                keep = (cols["time"] >= time[0]) & (cols["time"] <= time[1])
+                rows = int(np.count_nonzero(keep))
+            total += rows
+            for c in wanted:
+                parts.setdefault(c, []).append(np.array(cols[c][keep]))
+
+            tags = dict(meta["tags"], run=meta["run"])
+            for key, value in tags.items():
+                if not isinstance(value, (str, int, float, bool)):
+                    value = json.dumps(value)
+                parts.setdefault(key, []).append(np.full(rows, value))
+
+        # Columns (or tags) missing from some runs are left out
+        return {key: np.concatenate(values) for key, values in parts.items()
+                if sum(map(len, values)) == total}
+
+    # ------------------------------------------------------------------
+    # Aggregation
+    # ------------------------------------------------------------------
+    def group_by(self, by: Sequence[str], values: Sequence[str],
+                 time: Optional[Tuple[float, float]] = None,
+                 **filters) -> Dict[str, np.ndarray]:
+        """
+        Mean, (population) std and count of each `values` column per
+        distinct combination of the `by` columns (data columns or tags),
+        e.g. by=("algorithm", "time") averages over seeds.  Groups come
+        back sorted by key; result columns are the keys plus
+        "<value>_mean", "<value>_std" and "n".
+        """
+        data = self.load(list(by) + list(values), time=time, **filters)
+        if not data:
+            return {**{k: np.array([]) for k in by}, "n": np.array([], dtype=np.int64),
+                    **{f"{v}_{s}": np.array([]) for v in values for s in ("mean", "std")}}
+
+        uniques, codes = [], []
+        for key in by:
+            u, inverse = np.unique(data[key], return_inverse=True)
+            uniques.append(u)
+            codes.append(inverse.ravel())
+        dims = tuple(len(u) for u in uniques)
+        groups, group_of = np.unique(np.ravel_multi_index(codes, dims), return_inverse=True)
+        group_of = group_of.ravel()
+        n = np.bincount(group_of)
+
+        result = {key: u[idx] for key, u, idx in zip(by, uniques, np.unravel_index(groups, dims))}
+        result["n"] = n
+        for v in values:
+            x = data[v].astype(float)
+            mean = np.bincount(group_of, weights=x) / n
+            var = np.bincount(group_of, weights=(x - mean[group_of]) ** 2) / n
+            result[f"{v}_mean"] = mean
+            result[f"{v}_std"] = np.sqrt(var)
+        return result
+
+    def curve(self, value: str = "mean", **filters) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(time, avg, std) of `value` across the matching runs, per time point."""
+        g = self.group_by(("time",), (value,), **filters)
+        return g["time"], g[f"{value}_mean"], g[f"{value}_std"]
+
+    def percentile_curve(self, qs: Sequence[float] = (50, 95, 99),
+                         **filters) -> Dict[str, np.ndarray]:
+        """
+        Delay percentiles per time point with the matching runs' "hist"
+        columns merged first, i.e. over every packet of every seed.
+        Returns {"time", "p<q>" per q}.
+        """
+        data = self.load(["time", "hist"], **filters)
+        if "hist" not in data:
+            return {"time": np.array([]), **{f"p{q:g}": np.array([]) for q in qs}}
+        times, inverse = np.unique(data["time"], return_inverse=True)
+        pooled = np.zeros((len(times), data["hist"].shape[1]), dtype=np.int64)
+        np.add.at(pooled, inverse.ravel(), data["hist"])
+        result = {"time": times}
+        for q in qs:
+            result[f"p{q:g}"] = np.array([DelayHistogram.from_counts(c).percentile(q)
+                                          for c in pooled])
+        return result
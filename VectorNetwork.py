@@ -0,0 +1,660 @@
+import math
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+from CSRGraph import CSRGraph, Graph
+from Node import Node
+from PacketPool import VectorPacketPool
+from bellman_ford.BellmanFordNode import BellmanFordNode
+from bellman_ford.routing_table import shortest_paths
+from q_routing.DenseQTable import DenseQTable
+from q_routing.QNode import QNode
+from stochastic_q_routing.QueueTrend import QueueTrendArray
+from stochastic_q_routing.SQRWALT import SQRWALT
+from stochastic_q_routing.StochasticQNode import StochasticQNode
+from stochastic_q_routing.boltzmann import sample_batch
+
+
+_max = np.maximum.reduce
+
+_POLICIES = {"random": 0, "shortest_path": 1, "greedy": 2, "boltzmann": 3, "sqrwalt": 4}
+
+# meta[] slots shared with the kernel
+_NFREE, _UPOS, _NOUT, _STAGE, _NEED, _TREND_N, _TREND_POS = range(7)
+
+
+def _policy_for(node_cls: Type) -> str:
+    """Map a per-node class onto the array policy that reproduces it."""
+    # Most specific classes first: SQRWALT and StochasticQNode are QNodes.
+    if issubclass(node_cls, SQRWALT):
+        return "sqrwalt"
+    if issubclass(node_cls, StochasticQNode):
+        return "boltzmann"
+    if issubclass(node_cls, QNode):
+        return "greedy"
+    if issubclass(node_cls, BellmanFordNode):
+        return "shortest_path"
+    if issubclass(node_cls, Node):
+        return "random"
+    raise TypeError(f"VectorNetwork has no array policy for {node_cls.__name__}")
+
+
+# ----------------------------------------
+# Kernel
+# ----------------------------------------
+def _run_ticks(n_ticks, load, time, policy, alpha, sequential, update_interval,
+               nbr, deg, max_in, next_hop, q, q_min, q_best, temperature,
+               trend_ring, trend_sum_q, trend_sum_tq,
+               buf, head, qlen, p_src, p_dst, p_created, p_delivered, free,
+               u, meta, out_src, out_dst, out_created, out_time):
+    """
+    `VectorNetwork.tick` (after `inject_random_packets(load)`; load < 0:
+    no injection) for up to `n_ticks` ticks; returns the number of ticks
+    done.  Same uniforms, same arithmetic and the same snapshot
+    semantics: every node reads its neighbours' estimates as they were
+    at the start of the tick.  With `sequential`, a Q update is written
+    as soon as it is made instead, so the nodes after it in index order
+    see it in the same tick, as in `Network`.  For SQRWALT, the queue
+    trend (`QueueTrendArray`, position and length in meta[_TREND_POS],
+    meta[_TREND_N]) and the temperatures are updated every
+    `update_interval` ticks, as `VectorNetwork.tick_update` does.
+
+    Stops at a tick boundary when the packet pool, a ring buffer or the
+    delivery output might run out within the next tick, and mid-tick
+    (meta[_STAGE] says where) when the uniform block `u` cannot serve
+    the next draw; meta[_NEED] is then the size of that draw, and the
+    caller starts a fresh block exactly as `VectorNetwork._uniform` does.
+    `max_in` is the largest number of neighbours that can forward to
+    one node.
+    """
+    n = qlen.shape[0]
+    width = nbr.shape[1]
+    mask = buf.shape[1] - 1
+    base = int(math.floor(load)) if load >= 0 else 0
+    learns = policy >= 2
+    fwd_node = np.empty(n, dtype=np.int64)
+    fwd_dst = np.empty(n, dtype=np.int64)
+    fwd_slot = np.empty(n, dtype=np.int64)
+    fwd_hop = np.empty(n, dtype=np.int64)
+    fwd_pid = np.empty(n, dtype=np.int64)
+    fwd_q = np.empty(n)
+    cum = np.empty(width)
+    done = 0
+
+    while done < n_ticks:
+        if meta[_STAGE] == 0:
+            if meta[_NFREE] < base + 1 or meta[_NOUT] + n > out_src.shape[0]:
+                break
+            if qlen.max() + base + 1 + max_in > mask + 1:
+                break
+
+            # 1. Injection (inject_random_packets)
+            if load >= 0:
+                k = 1 + 2 * (base + 1)
+                pos = meta[_UPOS]
+                if pos + k > u.shape[0]:
+                    meta[_NEED] = k
+                    break
+                m = base
+                if u[pos] < load - base:
+                    m += 1
+                for j in range(m):
+                    s = int(u[pos + 1 + j] * n)
+                    d = int(u[pos + 1 + m + j] * (n - 1))
+                    if d >= s:
+                        d += 1
+                    meta[_NFREE] -= 1
+                    pid = free[meta[_NFREE]]
+                    p_src[pid] = s
+                    p_dst[pid] = d
+                    p_created[pid] = time
+                    p_delivered[pid] = -1
+                    buf[s, (head[s] + qlen[s]) & mask] = pid
+                    qlen[s] += 1
+                meta[_UPOS] = pos + k
+            meta[_STAGE] = 1
+
+        # One uniform per forwarded packet for the random policies
+        if policy == 0 or policy >= 3:
+            k = 0
+            for i in range(n):
+                if qlen[i] > 0 and p_dst[buf[i, head[i]]] != i:
+                    k += 1
+            if k > 0 and meta[_UPOS] + k > u.shape[0]:
+                meta[_NEED] = k
+                break
+
+        # 2. Pop every head; deliver, or pick a next hop and the new Q-value
+        pos = meta[_UPOS]
+        nf = 0
+        for i in range(n):
+            if qlen[i] == 0:
+                continue
+            pid = buf[i, head[i]]
+            head[i] = (head[i] + 1) & mask
+            qlen[i] -= 1
+            d = p_dst[pid]
+            if d == i:
+                o = meta[_NOUT]
+                out_src[o] = p_src[pid]
+                out_dst[o] = i
+                out_created[o] = p_created[pid]
+                out_time[o] = time
+                meta[_NOUT] = o + 1
+                free[meta[_NFREE]] = pid
+                meta[_NFREE] += 1
+                continue
+
+            slot = 0
+            if policy == 1:
+                hop = next_hop[i, d]
+            else:
+                if policy == 0:
+                    slot = int(u[pos] * deg[i])
+                    pos += 1
+                elif policy == 2:
+                    slot = q_best[i, d]
+                else:
+                    # boltzmann.sample_batch for one row
+                    low = q[i, d, 0]
+                    for k in range(1, width):
+                        if q[i, d, k] < low:
+                            low = q[i, d, k]
+                    total = 0.0
+                    for k in range(width):
+                        total += math.exp((low - q[i, d, k]) / temperature[i])
+                        cum[k] = total
+                    threshold = u[pos] * total
+                    pos += 1
+                    for k in range(width):
+                        if cum[k] <= threshold:
+                            slot += 1
+                    if slot > deg[i] - 1:
+                        slot = deg[i] - 1
+                hop = nbr[i, slot]
+
+            fwd_node[nf] = i
+            fwd_dst[nf] = d
+            fwd_slot[nf] = slot
+            fwd_hop[nf] = hop
+            fwd_pid[nf] = pid
+            if learns:
+                estimate = 0.0 if hop == d else q_min[hop, d]
+                old = q[i, d, slot]
+                target = float(qlen[i] + 1) + estimate
+                fwd_q[nf] = old + alpha * (target - old)
+                if sequential:
+                    q[i, d, slot] = fwd_q[nf]
+                    best = 0
+                    for k in range(1, width):
+                        if q[i, d, k] < q[i, d, best]:
+                            best = k
+                    q_best[i, d] = best
+                    q_min[i, d] = q[i, d, best]
+            nf += 1
+        meta[_UPOS] = pos
+
+        # 3. Q updates (DenseQTable.update_many), then scatter
+        if learns and not sequential:
+            for j in range(nf):
+                i, d = fwd_node[j], fwd_dst[j]
+                q[i, d, fwd_slot[j]] = fwd_q[j]
+                best = 0
+                for k in range(1, width):
+                    if q[i, d, k] < q[i, d, best]:
+                        best = k
+                q_best[i, d] = best
+                q_min[i, d] = q[i, d, best]
+        for j in range(nf):
+            v = fwd_hop[j]
+            buf[v, (head[v] + qlen[v]) & mask] = fwd_pid[j]
+            qlen[v] += 1
+
+        time += 1
+        done += 1
+        meta[_STAGE] = 0
+
+        # 4. SQRWALT temperatures (QueueTrendArray.push, then tick_update)
+        if policy == 4 and update_interval > 0 and time % update_interval == 0:
+            m = meta[_TREND_N]
+            slot = meta[_TREND_POS]
+            window = trend_ring.shape[1]
+            for i in range(n):
+                if m == window:
+                    oldest = trend_ring[i, slot]
+                    trend_sum_tq[i] += (m - 1) * qlen[i] - (trend_sum_q[i] - oldest)
+                    trend_sum_q[i] += qlen[i] - oldest
+                else:
+                    trend_sum_tq[i] += m * qlen[i]
+                    trend_sum_q[i] += qlen[i]
+                trend_ring[i, slot] = qlen[i]
+            if m < window:
+                m += 1
+            meta[_TREND_N] = m
+            meta[_TREND_POS] = (slot + 1) % window
+            for i in range(n):
+                avg = trend_sum_q[i] / m
+                slope = 0.0
+                if m >= 2:
+                    slope = (trend_sum_tq[i] - (m - 1) / 2 * trend_sum_q[i]) / (m * (m * m - 1) / 12)
+                multiplier = 5.0
+                if avg < 0.1:
+                    multiplier = 0.1
+                elif avg > 10:
+                    multiplier = 20.0
+                temperature[i] = max(1e-10, multiplier * abs(slope))
+
+    return done
+
+
+_kernel = None
+
+
+def kernel():
+    """`_run_ticks` compiled with Numba, or None if Numba is missing."""
+    global _kernel
+    if _kernel is None:
+        try:  # Numba is optional (and slow to import), so only load it here
+            import numba
+        except ImportError:
+            return None
+        _kernel = numba.njit(cache=True)(_run_ticks)
+    return _kernel
+
+
+# ----------------------------------------
+# Engine
+# ----------------------------------------
+class VectorNetwork:
+    """
+    Array-backed drop-in for `Network`.
+
+    All node queues live in one preallocated ring buffer of packet ids
+    (`nodes × capacity`) and all packets in a `VectorPacketPool`, so a whole
+    tick — dequeue every head, pick next hops, apply the Q updates and
+    scatter the packets to their next hops — is a fixed number of NumPy
+    operations instead of one Python call per node.
+
+    The per-node classes are only used to select the routing policy:
+        BellmanFordNode  -> static shortest-path next hops
+        QNode            -> greedy argmin over Q
+        StochasticQNode  -> Boltzmann sampling at a fixed temperature
+        SQRWALT          -> Boltzmann sampling at per-node temperatures
+                            driven by `tick_update()`
+        Node             -> uniform random neighbour
+
+    Within a tick every node reads its neighbours' estimates as they
+    were at the start of the tick (`Network` lets a node see updates
+    made earlier in the same tick by lower-numbered neighbours).  The
+    per-packet dynamics and the delay statistics are otherwise the same.
+
+    `advance(n_ticks, load)` runs the same ticks (injection and SQRWALT
+    updates every `update_interval` ticks included) in one compiled call
+    per batch of ticks, drawing the same uniforms as the NumPy path; on
+    small graphs, where a tick is a handful of packets, that is where
+    the speed is.
+    """
+
+    # Kernel mode: False keeps the start-of-tick snapshot (see above),
+    # True applies Q updates in node order as `Network` does
+    sequential = False
+
+    def __init__(self, graph: Graph, node_cls: Type,
+                 seed: Optional[int] = None,
+                 alpha: float = 0.5,
+                 queue_capacity: int = 64,
+                 keep_delivered: bool = True,
+                 metrics: Optional[object] = None,
+                 update_interval: int = 0):
+        """
+        Parameters
+        ----------
+        graph          : {node_id: [(neighbor_id, weight), ...], ...} or a
+                         `CSRGraph`
+        node_cls       : per-node class whose policy should be simulated
+        seed           : seed for the engine's NumPy generator
+        alpha          : Q-learning rate (QNode uses 0.5)
+        queue_capacity : initial ring-buffer slots per node (grows on demand)
+        keep_delivered : keep (created_at, delivered_at) of delivered
+                         packets for `collect_delivered()`
+        metrics        : streaming sink with `record_many(src, dst,
+                         created_at, delivered_at)` (e.g. `DeliveryStats`)
+        update_interval: SQRWALT temperature update period in ticks for
+                         `advance` and `run` (0: only on explicit
+                         `tick_update()`)
+        """
+        self.time   = 0
+        self.graph  = graph
+        self.policy = _policy_for(node_cls)
+        self.alpha  = alpha
+        self.rng    = np.random.default_rng(seed)
+        self.update_interval = update_interval
+
+        self.csr = CSRGraph.from_dict(graph)
+        self.node_ids: List[int] = self.csr.node_ids
+        self.index: Dict[int, int] = self.csr.index
+        n = self.csr.num_nodes
+        self.num_nodes = n
+
+        # Padded adjacency: neighbours of node i are nbr[i, :deg[i]]
+        self.deg = self.csr.degree
+        self.nbr, _, self.valid = self.csr.padded()
+        self._max_in = int(np.bincount(self.csr.indices, minlength=n).max(initial=0))
+
+        # Ring-buffer queues of packet ids
+        self.capacity = 1 << max(int(queue_capacity) - 1, 1).bit_length()
+        self._mask = self.capacity - 1
+        self.buf   = np.zeros((n, self.capacity), dtype=np.int64)
+        self.head  = np.zeros(n, dtype=np.int64)
+        self.qlen  = np.zeros(n, dtype=np.int64)
+
+        # Packet columns (indexed by packet id; src/dst are dense indices)
+        self.packets = VectorPacketPool()
+
+        self._ublock = np.zeros(0)
+        self._upos   = 0
+
+        self.keep_delivered  = keep_delivered
+        self.metrics         = metrics
+        self.delivered_count = 0
+        self._delivered: List[Tuple[np.ndarray, object]] = []
+
+        # Policy state
+        self.q_store = None
+        if self.policy in ("greedy", "boltzmann", "sqrwalt"):
+            # q[i, d, k]: estimated delivery time from i to d via nbr[i, k]
+            self.q_store = DenseQTable(self.csr)
+        if self.policy == "boltzmann":
+            self.temperature = np.full(n, node_cls.temperature)
+        if self.policy == "sqrwalt":
+            self.temperature = np.ones(n)
+            self.trend = QueueTrendArray(n, window=32)
+        if self.policy == "shortest_path":
+            _, _, self.next_hop = shortest_paths(self.csr)
+
+        self._meta = np.zeros(7, dtype=np.int64)
+        out = max(1 << 16, 4 * n)
+        self._out = [np.zeros(out, dtype=np.int64) for _ in range(4)]
+
+    # ------------------------------------------------------------------
+    # Storage helpers
+    # ------------------------------------------------------------------
+    def _grow_queues(self, needed: int) -> None:
+        cap = self.capacity
+        while cap < needed:
+            cap *= 2
+        # Unroll every ring so that the head sits at slot 0
+        idx = (self.head[:, None] + np.arange(self.capacity)) & self._mask
+        buf = np.zeros((len(self.buf), cap), dtype=np.int64)
+        buf[:, :self.capacity] = np.take_along_axis(self.buf, idx, axis=1)
+        self.buf, self.capacity, self._mask = buf, cap, cap - 1
+        self.head[:] = 0
+
+    def _enqueue(self, targets: np.ndarray, pids: np.ndarray) -> None:
+        """Append `pids[j]` to the queue of node `targets[j]`, preserving order."""
+        counts = np.bincount(targets, minlength=len(self.qlen))
+        fill = self.qlen + counts
+        most = int(_max(fill))
+        if most > self.capacity:
+            self._grow_queues(most)
+        if most <= 1 or int(_max(counts)) <= 1:
+            slot = (self.head[targets] + self.qlen[targets]) & self._mask
+            self.buf[targets, slot] = pids
+        else:
+            # Rank of each packet among those bound for the same node
+            order = np.argsort(targets, kind="stable")
+            t = targets[order]
+            first = np.cumsum(counts) - counts
+            rank = np.arange(len(t)) - first[t]
+            slot = (self.head[t] + self.qlen[t] + rank) & self._mask
+            self.buf[t, slot] = pids[order]
+        self.qlen = fill
+
+    def _uniform(self, k: int) -> np.ndarray:
+        """Next `k` uniforms from a prefetched block (one generator call per block)."""
+        pos = self._upos
+        if pos + k > len(self._ublock):
+            self._ublock = self.rng.random(max(k, 1 << 16))
+            pos = 0
+        self._upos = pos + k
+        return self._ublock[pos:pos + k]
+
+    # ------------------------------------------------------------------
+    # Packet-injection helpers
+    # ------------------------------------------------------------------
+    def inject_packets(self, src: np.ndarray, dst: np.ndarray) -> None:
+        """Inject packets given as arrays of dense node indices."""
+        self._enqueue(src, self.packets.alloc(src, dst, self.time))
+
+    def inject_packet(self, src: int, dst: int) -> None:
+        self.inject_packets(np.array([self.index[src]]), np.array([self.index[dst]]))
+
+    def inject_random_packets(self, load: float) -> None:
+        """Same traffic model as `Network.inject_random_packets`."""
+        n = int(math.floor(load))
+        u = self._uniform(1 + 2 * (n + 1))
+        if u[0] < (load - n):
+            n += 1
+        if n == 0:
+            return
+        src = (u[1:n + 1] * self.num_nodes).astype(np.int64)
+        dst = (u[n + 1:2 * n + 1] * (self.num_nodes - 1)).astype(np.int64)
+        dst += dst >= src
+        self.inject_packets(src, dst)
+
+    def inject_traffic(self, traffic) -> None:
+        """Inject this tick's packets from a `traffic.Traffic` source or a `traces.TraceReplay`."""
+        src, dst = traffic.at(self.time)
+        if len(src):
+            self.inject_packets(src, dst)
+
+    # ------------------------------------------------------------------
+    # Routing policies
+    # ------------------------------------------------------------------
+    def _select(self, nodes: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """Return the neighbour slot chosen by each node for its packet."""
+        if self.policy == "greedy":
+            return self.q_store.best.reshape(-1)[nodes * self.num_nodes + dst]
+        if self.policy in ("boltzmann", "sqrwalt"):
+            rows = self.q_store.rows[nodes * self.num_nodes + dst]
+            return sample_batch(rows, self.temperature[nodes],
+                                self._uniform(len(nodes)), self.deg[nodes])
+        if self.policy == "random":
+            return (self._uniform(len(nodes)) * self.deg[nodes]).astype(np.int64)
+        return None
+
+    # ------------------------------------------------------------------
+    # Simulation step
+    # ------------------------------------------------------------------
+    def tick(self) -> None:
+        """
+        One time‑unit of network activity, for all nodes at once:
+        1. Every non-empty queue pops its head packet.
+        2. Packets at their destination are delivered; the rest pick a
+           next hop and the sending node updates its Q-value.
+        3. Forwarded packets are appended to their next hop's queue.
+        4. Global clock increments.
+        """
+        active = np.flatnonzero(self.qlen)
+        if len(active) == 0:
+            self.time += 1
+            return
+
+        head = self.head[active]
+        pids = self.buf[active, head]
+        self.head[active] = (head + 1) & self._mask
+        self.qlen[active] -= 1
+        dst = self.packets.dst[pids]
+
+        arrived = dst == active
+        if np.count_nonzero(arrived):
+            done = pids[arrived]
+            created_at = self.packets.created_at[done]
+            if self.metrics is not None:
+                self.metrics.record_many(self.packets.src[done], active[arrived],
+                                         created_at, self.time)
+            if self.keep_delivered:
+                self._delivered.append((created_at, self.time))
+            self.delivered_count += len(done)
+            self.packets.free(done)
+            keep = ~arrived
+            active, pids, dst = active[keep], pids[keep], dst[keep]
+
+        if len(active):
+            if self.policy == "shortest_path":
+                next_hop = self.next_hop[active, dst]
+            else:
+                slot = self._select(active, dst)
+                next_hop = self.nbr[active, slot]
+                if self.q_store is not None:
+                    n = self.num_nodes
+                    estimate = self.q_store.min.reshape(-1)[next_hop * n + dst]
+                    estimate[next_hop == dst] = 0.0
+                    rows = active * n + dst
+                    old_q = self.q_store.rows[rows, slot]
+                    target = self.qlen[active] + 1 + estimate
+                    self.q_store.update_many(rows, slot, old_q + self.alpha * (target - old_q))
+            self._enqueue(next_hop, pids)
+
+        self.time += 1
+
+    def run(self, until: int, traffic=None) -> None:
+        """
+        Same as `Network.run`: tick to `until`, skipping idle stretches.
+        SQRWALT temperatures are updated every `update_interval` ticks
+        (skipped ones included), as in `advance`.
+        """
+        while self.time < until:
+            if len(self.packets) == 0:
+                arrival = traffic.next_arrival(self.time) if traffic is not None else None
+                stop = until if arrival is None or arrival >= until else arrival
+                self._skip_to(stop)
+                if stop == until:
+                    return
+            if traffic is not None:
+                self.inject_traffic(traffic)
+            self.tick()
+            if self.update_interval > 0 and self.time % self.update_interval == 0:
+                self.tick_update()
+
+    def _skip_to(self, time: int) -> None:
+        """Jump the idle clock to `time`, running the updates `advance` would have."""
+        if self.update_interval > 0:
+            for _ in range(time // self.update_interval - self.time // self.update_interval):
+                self.tick_update()
+        self.time = time
+
+    def advance(self, n_ticks: int, load: float = -1.0) -> None:
+        """
+        Run `n_ticks` ticks, injecting `load` packets per tick with the
+        `inject_random_packets` model first (load < 0: no injection) and
+        calling `tick_update()` whenever the clock reaches a multiple of
+        `update_interval`.  Compiled when Numba is available; either way
+        the run is the same as the equivalent `inject_random_packets` /
+        `tick` loop.
+        """
+        if kernel() is None and not self.sequential:
+            for _ in range(n_ticks):
+                if load >= 0:
+                    self.inject_random_packets(load)
+                self.tick()
+                if self.update_interval > 0 and self.time % self.update_interval == 0:
+                    self.tick_update()
+            return
+        self._run_kernel(n_ticks, load, self.update_interval)
+
+    def _run_kernel(self, n_ticks: int, load: float, update_interval: int) -> None:
+        """`advance` through `_run_ticks` (as plain Python if Numba is missing)."""
+        run = kernel() or _run_ticks
+        # Unused policy state is passed as 1-element placeholders
+        q_store = self.q_store
+        q, q_min, q_best = ((q_store.q, q_store.min, q_store.best) if q_store is not None
+                            else (np.zeros((1, 1, 1)), np.zeros((1, 1)),
+                                  np.zeros((1, 1), dtype=np.int64)))
+        next_hop = getattr(self, "next_hop", np.zeros((1, 1), dtype=np.int64))
+        trend = getattr(self, "trend", None)
+        ring, sum_q, sum_tq = ((trend._ring, trend.sum_q, trend.sum_tq) if trend is not None
+                               else (np.zeros((1, 1), dtype=np.int64),
+                                     np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)))
+        meta = self._meta
+        end = self.time + n_ticks
+        while self.time < end:
+            self._make_room(load)
+            meta[_NFREE], meta[_UPOS], meta[_NEED] = self.packets._num_free, self._upos, 0
+            if trend is not None:
+                meta[_TREND_N], meta[_TREND_POS] = trend.n, trend._pos
+            temperature = getattr(self, "temperature", np.ones(1))
+            packets = self.packets
+            done = run(end - self.time, float(load), self.time,
+                       _POLICIES[self.policy], self.alpha, self.sequential, update_interval,
+                       self.nbr, self.deg, self._max_in, next_hop,
+                       q, q_min, q_best, temperature, ring, sum_q, sum_tq,
+                       self.buf, self.head, self.qlen,
+                       packets.src, packets.dst, packets.created_at, packets.delivered_at,
+                       packets._free,
+                       self._ublock, meta, *self._out)
+            packets._num_free = int(meta[_NFREE])
+            self._upos = int(meta[_UPOS])
+            if trend is not None:
+                trend.n, trend._pos = int(meta[_TREND_N]), int(meta[_TREND_POS])
+            if meta[_NEED]:
+                # The draw did not fit in the block: start a new one, as `_uniform` does
+                self._ublock = self.rng.random(max(int(meta[_NEED]), 1 << 16))
+                self._upos = 0
+            self.time += done
+            self._flush()
+
+    def _make_room(self, load: float) -> None:
+        """Grow the packet pool and the rings enough for the kernel to finish a tick."""
+        base = int(math.floor(load)) if load >= 0 else 0
+        if self.packets._num_free < base + 1:
+            self.packets._grow(base + 1)
+        need = int(_max(self.qlen)) + base + 1 + self._max_in
+        if need > self.capacity:
+            self._grow_queues(need)
+
+    def _flush(self) -> None:
+        """Hand the kernel's deliveries to `metrics` / `collect_delivered`."""
+        k = int(self._meta[_NOUT])
+        if k == 0:
+            return
+        src, dst, created, delivered = (col[:k].copy() for col in self._out)
+        self._meta[_NOUT] = 0
+        if self.metrics is not None:
+            self.metrics.record_many(src, dst, created, delivered)
+        if self.keep_delivered:
+            self._delivered.append((created, delivered))
+        self.delivered_count += k
+
+    def tick_update(self) -> None:
+        """Network-wide equivalent of calling `SQRWALT.tick_update` on every node."""
+        if self.policy != "sqrwalt":
+            return
+        self.trend.push(self.qlen)
+        avg, slope = self.trend.mean(), self.trend.slope()
+        multiplier = np.where(avg < 0.1, 0.1, np.where(avg > 10, 20, 5))
+        self.temperature = np.maximum(1e-10, multiplier * np.abs(slope))
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def collect_delivered(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (created_at, delivered_at) for every packet delivered since
+        the previous call, and forget them.
+        """
+        if not self._delivered:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        created = np.concatenate([c for c, _ in self._delivered])
+        delivered = np.concatenate([np.full(len(c), t, dtype=np.int64)
+                                    for c, t in self._delivered])
+        self._delivered.clear()
+        return created, delivered
+
+    def get_active_packets(self) -> int:
+        return int(self.qlen.sum())
+
+    def get_delivered_packets_count(self) -> int:
+        return self.delivered_count
@@ -1,5 +1,5 @@
 from collections import deque
-from bellman_ford.routing_table import routing_tables
+from bellman_ford.routing_table import next_hops_for
 
 class BellmanFordNode:
     def __init__(self, node_id, neighbors, network):
@@ -7,21 +7,26 @@ class BellmanFordNode:
         self.neighbors = neighbors  
         self.queue = deque()
         self.network = network
+        # Shortest-path next hops for this network's graph (built once per network)
+        self.next_hops = next_hops_for(network)[node_id]
 
-    def receive_packet(self, packet):
-        self.queue.append(packet)
+    def receive_packet(self, pid):
+        self.queue.append(pid)
 
     def process(self):
         if not self.queue:
             return None
-        packet = self.queue.popleft()
+        pid = self.queue.popleft()
+        dst = self.network.packets.dst[pid]
 
-        if packet['dst'] == self.id:
-            packet['delivered_at'] = self.network.time
-            self.network.delivered_packets.append(packet)
+        if dst == self.id:
+            self.network.deliver(pid)
             return None
 
-        route = routing_tables.get(self.id, {}).get(packet['dst'])
-
-        next_hop = route["next_hop"]
-        return next_hop, packet
+        try:
+            next_hop = self.next_hops[dst]
+        except KeyError:
+            # No route since a link failed (Network.remove_link)
+            self.network.drop(pid)
+            return None
+        return next_hop, pid
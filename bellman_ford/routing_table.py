@@ -1,6 +1,20 @@
-from layout import generate_irregular_grid
+import hashlib
+import heapq
+import os
+from collections import deque
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from CSRGraph import CSRGraph
+
+CACHE_DIR = os.environ.get(
+    "SQR_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "stochastic_q_routing"),
+)
+
+_memo: Dict[str, Tuple[List[int], np.ndarray, np.ndarray]] = {}
 
-graph, G = generate_irregular_grid()
 
 def get_shortest_path(graph, source):
     """
@@ -8,6 +22,9 @@ def get_shortest_path(graph, source):
     Returns:
         distances: node -> total cost from source
         predecessors: node -> previous hop on shortest path
+
+    Kept as the reference implementation; routing tables are built by
+    `shortest_paths` below.
     """
     distances = {node: float('inf') for node in graph}
     predecessors = {node: None for node in graph}
@@ -22,27 +39,289 @@ def get_shortest_path(graph, source):
 
     return distances, predecessors
 
+
+def graph_hash(graph) -> str:
+    """Stable digest of a graph's node order, edges and weights."""
+    csr = CSRGraph.from_dict(graph)
+    h = hashlib.sha1()
+    h.update(repr(csr.node_ids).encode())
+    for arr in (csr.indptr, csr.indices, csr.weights):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+# ----------------------------------------
+# All-pairs distances
+# ----------------------------------------
+def _bfs_all_pairs(adj: List[List[int]]) -> np.ndarray:
+    n = len(adj)
+    dist = np.full((n, n), np.inf)
+    for s in range(n):
+        row = [-1] * n
+        row[s] = 0
+        frontier = deque([s])
+        while frontier:
+            u = frontier.popleft()
+            for v in adj[u]:
+                if row[v] < 0:
+                    row[v] = row[u] + 1
+                    frontier.append(v)
+        row = np.array(row, dtype=float)
+        row[row < 0] = np.inf
+        dist[s] = row
+    return dist
+
+
+def _dijkstra(adj: List[List[Tuple[int, float]]], s: int, row: np.ndarray) -> None:
+    """Distances from s into `row` (all +inf on entry)."""
+    row[s] = 0.0
+    heap = [(0.0, s)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > row[u]:
+            continue
+        for v, w in adj[u]:
+            nd = d + w
+            if nd < row[v]:
+                row[v] = nd
+                heapq.heappush(heap, (nd, v))
+
+
+def _dijkstra_all_pairs(adj: List[List[Tuple[int, float]]]) -> np.ndarray:
+    n = len(adj)
+    dist = np.full((n, n), np.inf)
+    for s in range(n):
+        _dijkstra(adj, s, dist[s])
+    return dist
+
+
+def shortest_paths(graph) -> Tuple[List[int], np.ndarray, np.ndarray]:
+    """
+    All-pairs shortest paths as dense matrices.
+
+    Returns (node_ids, dist, next_hop) where rows/columns follow
+    `node_ids` (the graph's key order), dist[i, j] is the cost from i to
+    j and next_hop[i, j] is the index of i's first hop towards j (-1 on
+    the diagonal and for unreachable pairs).  Ties go to the neighbour
+    listed first.
+
+    `graph` is a `CSRGraph` or a dict graph (converted once).
+    Unit-weight graphs use BFS and weighted graphs Dijkstra (SciPy's
+    csgraph when available).  Results are memoised in-process and cached
+    on disk under CACHE_DIR, keyed by `graph_hash`.
+    """
+    csr = CSRGraph.from_dict(graph)
+    key = graph_hash(csr)
+    if key in _memo:
+        return _memo[key]
+
+    node_ids = csr.node_ids
+    path = os.path.join(CACHE_DIR, f"routing-{key}.npz")
+    try:
+        with np.load(path) as cached:
+            result = (cached["node_ids"].tolist(), cached["dist"], cached["next_hop"])
+    except (OSError, KeyError, ValueError):
+        result = (node_ids,) + _compute(csr)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp, node_ids=np.array(node_ids), dist=result[1], next_hop=result[2])
+            os.replace(tmp, path)
+        except OSError:
+            pass  # read-only home etc.: the cache is only an optimisation
+
+    _memo[key] = result
+    return result
+
+
+def _compute(csr: CSRGraph) -> Tuple[np.ndarray, np.ndarray]:
+    n = csr.num_nodes
+    unit = csr.unit_weight
+
+    try:  # SciPy is optional (and slow to import), so only load it here
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import shortest_path as scipy_shortest_path
+    except ImportError:
+        scipy_shortest_path = None
+
+    if scipy_shortest_path is not None:
+        matrix = csr_matrix((csr.weights, csr.indices, csr.indptr), shape=(n, n))
+        dist = scipy_shortest_path(matrix, method="D", unweighted=unit)
+    elif unit:
+        dist = _bfs_all_pairs([csr.neighbors(i).tolist() for i in range(n)])
+    else:
+        dist = _dijkstra_all_pairs([list(zip(csr.neighbors(i).tolist(),
+                                             csr.neighbor_weights(i).tolist()))
+                                    for i in range(n)])
+
+    next_hop = np.full((n, n), -1, dtype=np.int64)
+    _fill_next_hops(csr, dist, next_hop, np.arange(n), np.arange(n))
+    return dist, next_hop
+
+
+def _fill_next_hops(csr: CSRGraph, dist: np.ndarray, next_hop: np.ndarray,
+                    rows: np.ndarray, cols: np.ndarray) -> None:
+    """
+    next_hop[rows × cols]: the neighbour k of i minimising w(i, k) +
+    dist(k, j) (first listed on ties), -1 on the diagonal and for
+    unreachable pairs.
+    """
+    nbr, wts, _ = csr.padded()
+    sub = dist if len(cols) == csr.num_nodes else dist[:, cols]
+    block = max(1, 2 ** 22 // (len(cols) * nbr.shape[1] or 1))
+    for start in range(0, len(rows), block):
+        i = rows[start:start + block]
+        cand = wts[i][:, :, None] + sub[nbr[i]]
+        best = cand.argmin(axis=1)
+        hop = np.take_along_axis(nbr[i], best, axis=1)
+        hop[~np.isfinite(dist[np.ix_(i, cols)])] = -1
+        hop[i[:, None] == cols[None, :]] = -1
+        next_hop[np.ix_(i, cols)] = hop
+
+
+def _distances_to(csr: CSRGraph, cols: np.ndarray) -> np.ndarray:
+    """dist[:, cols] of the current graph: one search per destination over reversed arcs."""
+    n = csr.num_nodes
+    src, dst = csr.edges()
+    try:  # SciPy is optional (and slow to import), so only load it here
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import shortest_path as scipy_shortest_path
+    except ImportError:
+        order = np.argsort(dst, kind="stable")
+        reverse = [[] for _ in range(n)]
+        for a in order.tolist():
+            reverse[dst[a]].append((int(src[a]), float(csr.weights[a])))
+        dist = np.full((len(cols), n), np.inf)
+        for row, j in zip(dist, cols.tolist()):
+            _dijkstra(reverse, j, row)
+        return dist.T
+    matrix = csr_matrix((csr.weights, (dst, src)), shape=(n, n))
+    return scipy_shortest_path(matrix, method="D", unweighted=csr.unit_weight,
+                               indices=cols).T
+
+
+# ----------------------------------------
+# Topology changes
+# ----------------------------------------
+def repair_shortest_paths(csr: CSRGraph, dist: np.ndarray, next_hop: np.ndarray,
+                          changes: Sequence[Tuple[int, int, float, float]]
+                          ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Patch `dist` / `next_hop` (the `shortest_paths` matrices of the graph
+    before the change; updated in place) after arcs changed weight.
+
+    changes : (i, j, old_weight, new_weight) per arc i -> j, with +inf
+              for a missing arc; `csr` must already hold the new arcs
+
+    Only the affected destinations are repaired.  When every change is
+    a decrease (a link added or made cheaper), dist(x, j) =
+    min(dist(x, j), dist(x, i) + w + dist(j', j)) over the changed arcs,
+    one array operation per arc.  Otherwise the destinations some
+    shortest path to which used an arc that got dearer are searched
+    again, one Dijkstra/BFS each.  Next hops are then recomputed for
+    the columns whose distances changed and for the rows of the arcs'
+    tails, whose neighbour lists changed.  The result equals a full
+    recompute (bit for bit on integer weights).
+
+    Returns (rows, cols) of the next_hop entries that changed.
+    """
+    n = csr.num_nodes
+    cols = np.zeros(n, dtype=bool)
+    if all(new < old for _, _, old, new in changes):
+        for i, j, _, w in changes:
+            cand = dist[:, i, None] + w + dist[None, j, :]
+            better = cand < dist
+            cols |= better.any(axis=0)
+            np.copyto(dist, cand, where=better)
+    else:
+        for i, j, old, new in changes:
+            if new < old:
+                cols |= (dist[:, i, None] + new + dist[None, j, :] < dist).any(axis=0)
+            elif np.isfinite(old):
+                # Destinations with a shortest path through i -> j (ties included)
+                through = dist[:, i, None] + old + dist[None, j, :]
+                cols |= (np.isfinite(through)
+                         & (through <= dist + 1e-9 * np.abs(dist))).any(axis=0)
+        cols = np.flatnonzero(cols)
+        if len(cols):
+            dist[:, cols] = _distances_to(csr, cols)
+        cols = np.isin(np.arange(n), cols)
+
+    before = next_hop.copy()
+    tails = np.unique([i for i, _, _, _ in changes])
+    if cols.any():
+        _fill_next_hops(csr, dist, next_hop, np.arange(n), np.flatnonzero(cols))
+    _fill_next_hops(csr, dist, next_hop, tails, np.arange(n))
+    return np.nonzero(next_hop != before)
+
+
+# ----------------------------------------
+# Routing tables
+# ----------------------------------------
 def compute_all_routing_tables(graph):
+    """
+    {node: {dst: {"cost": ..., "next_hop": ...}}} for every ordered pair,
+    built from `shortest_paths` (next_hop is None when unreachable).
+    """
+    node_ids, dist, next_hop = shortest_paths(graph)
     all_tables = {}
-    for node in graph:
-        dist, pred = get_shortest_path(graph, node)
+    for i, node in enumerate(node_ids):
         table = {}
-        for dst in graph:
+        for j, dst in enumerate(node_ids):
             if dst == node:
                 continue
-            next_hop = dst
-            while pred[next_hop] and pred[next_hop] != node:
-                next_hop = pred[next_hop]
-            if pred[next_hop] is None and next_hop != node:
-                next_hop = None
+            hop = next_hop[i, j]
             table[dst] = {
-                "cost": dist[dst],
-                "next_hop": next_hop,
+                "cost": dist[i, j].item(),
+                "next_hop": node_ids[hop] if hop >= 0 else None,
             }
         all_tables[node] = table
     return all_tables
 
 
+def next_hops_for(network) -> Dict[int, Dict[int, int]]:
+    """
+    {node: {dst: next_hop}} for the network's own graph, computed once
+    per network and shared by all of its BellmanFordNodes.
+    """
+    tables = getattr(network, "_next_hops", None)
+    if tables is None:
+        node_ids, dist, next_hop = shortest_paths(network.csr)
+        tables = {
+            node: {dst: node_ids[hop]
+                   for dst, hop in zip(node_ids, row.tolist()) if hop >= 0}
+            for node, row in zip(node_ids, next_hop)
+        }
+        network._next_hops = tables
+        # Private copies, patched by `repair_next_hops` on link changes
+        network._routes = (dist.copy(), next_hop.copy())
+    return tables
+
+
+def repair_next_hops(network, changes: Sequence[Tuple[int, int, float, float]]) -> int:
+    """
+    Patch the network's shared next-hop tables (`next_hops_for`) in place
+    after a link change (see `repair_shortest_paths`; `network.csr`
+    already changed).  Destinations that became unreachable are removed.
+    Returns the number of (node, dst) entries that changed; a network
+    without BellmanFordNodes has no tables and is left alone.
+    """
+    tables = getattr(network, "_next_hops", None)
+    if tables is None:
+        return 0
+    dist, next_hop = network._routes
+    rows, cols = repair_shortest_paths(network.csr, dist, next_hop, changes)
+    node_ids = network.csr.node_ids
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        table, dst = tables[node_ids[i]], node_ids[j]
+        hop = next_hop[i, j]
+        if hop >= 0:
+            table[dst] = node_ids[hop]
+        else:
+            table.pop(dst, None)
+    return len(rows)
+
+
 def print_routing_tables(tables):
     for src in sorted(tables):
         print(f"Routing table for node {src}:")
@@ -52,5 +331,3 @@ def print_routing_tables(tables):
             next_hop = info["next_hop"]
             print(f"  to {dst:2}: cost={cost:2}, next hop={next_hop}")
         print("-" * 40)
-
-routing_tables = compute_all_routing_tables(graph)
@@ -2,12 +2,14 @@ import matplotlib.pyplot as plt
 from BellmanFordNode import BellmanFordNode
 from layout import generate_irregular_grid
 from Network import Network
+from DeliveryStats import DeliveryStats
 
 # ------------------------------------------------------------------
 # Set‑up
 # ------------------------------------------------------------------
 graph, _ = generate_irregular_grid()
-net = Network(graph, BellmanFordNode)
+net = Network(graph, BellmanFordNode, keep_delivered=False,
+              metrics=DeliveryStats())
 
 phases = [
     (1_000_000, 2.5), 
@@ -16,7 +18,6 @@ phases = [
 record_interval = 50_000  
 
 time_points, avg_delivery_times = [], []
-cumulative_delivered = []
 
 # ------------------------------------------------------------------
 # Simulation loop
@@ -30,24 +31,15 @@ for phase_idx, (phase_steps, load) in enumerate(phases, start=1):
         net.inject_random_packets(load)
         net.tick()
 
-        cumulative_delivered.extend(net.delivered_packets)
-        net.delivered_packets.clear()
-
         if net.time % record_interval == 0:
-            total_delivered = len(cumulative_delivered)
+            total_delivered = net.metrics.total
             active_packets  = sum(len(node.queue) for node in net.nodes.values())
 
             # Only consider packets delivered in the most recent interval
-            delivered_in_interval = [
-                p for p in cumulative_delivered
-                if net.time - record_interval < p["delivered_at"] <= net.time
-            ]
+            stats = net.metrics.interval()
 
-            if delivered_in_interval:
-                avg_time = (
-                    sum(p["delivered_at"] - p["created_at"]
-                        for p in delivered_in_interval) / len(delivered_in_interval)
-                )
+            if stats["count"]:
+                avg_time = stats["mean"]
                 time_points.append(net.time)
                 avg_delivery_times.append(avg_time)
 
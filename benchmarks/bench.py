@@ -0,0 +1,231 @@
+"""
+Simulator throughput benchmarks.
+
+Times `Network.tick` for every (algorithm, topology, load) case and
+writes one JSON file:
+
+    python benchmarks/bench.py --out bench.json
+    python benchmarks/bench.py --out new.json --baseline bench.json
+
+Per case: ticks/sec, packets routed (hops) and delivered per second,
+time to build the network, cold time to build the shortest-path
+routing tables, and the peak RSS of the process that ran the case
+(each case runs in a fresh process, so peaks don't carry over).
+
+With --baseline, cases whose ticks/sec dropped, or whose peak RSS
+grew, by more than --tolerance are listed and the exit status is 1.
+Timings are machine dependent: compare against a baseline recorded on
+the same machine.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+import topology
+from bellman_ford import routing_table
+from bellman_ford.BellmanFordNode import BellmanFordNode
+from dense_layout import generate_dense_irregular_grid
+from DeliveryStats import DeliveryStats
+from layout import generate_irregular_grid
+from Network import Network
+from q_routing.LazyQTable import LazyQTables
+from q_routing.QNode import QNode
+from stochastic_q_routing.SQRWALT import SQRWALT
+from stochastic_q_routing.StochasticQNode import StochasticQNode
+
+# ----------------------------------------
+# Cases
+# ----------------------------------------
+ALGORITHMS = {
+    "bellman_ford": BellmanFordNode,
+    "q_routing":    QNode,
+    "stochastic_q": StochasticQNode,
+    "sqrwalt":      SQRWALT,
+}
+update_interval = 10  # SQRWALT temperature updates, as in sqrwalt-test.py
+
+# name: (graph factory, Network options, (low, medium, saturating) loads)
+TOPOLOGIES = {
+    "sparse": (lambda: generate_irregular_grid()[0], {}, (0.5, 2.0, 4.0)),
+    "dense":  (lambda: generate_dense_irregular_grid()[0], {}, (1.0, 3.5, 6.75)),
+    "grid20": (partial(topology.grid, 20), {}, (5.0, 15.0, 40.0)),
+    # Eager Q tables would be N² rows here
+    "ba1000": (partial(topology.barabasi_albert, 1000, 2, seed=0),
+               {"q_tables": LazyQTables}, (1.0, 4.0, 15.0)),
+}
+LOAD_NAMES = ("low", "medium", "saturating")
+QUICK_TOPOLOGIES = ("sparse", "dense")
+
+
+def run_case(algorithm: str, topology_name: str, load_name: str,
+             ticks: int, warmup: int, seed: int = 0) -> dict:
+    factory, options, loads = TOPOLOGIES[topology_name]
+    load = loads[LOAD_NAMES.index(load_name)]
+    node_cls = ALGORITHMS[algorithm]
+    graph = factory()
+
+    # Cold routing-table build (no in-process memo, empty disk cache)
+    with tempfile.TemporaryDirectory() as cache:
+        routing_table.CACHE_DIR = cache
+        routing_table._memo.clear()
+        start = time.perf_counter()
+        routing_table.shortest_paths(graph)
+        routing_sec = time.perf_counter() - start
+
+        random.seed(seed)
+        np.random.seed(seed)
+        metrics = DeliveryStats()
+        start = time.perf_counter()
+        net = Network(graph, node_cls, keep_delivered=False, metrics=metrics, **options)
+        build_sec = time.perf_counter() - start
+
+    # Count forwarded packets with one cheap wrapper call per tick
+    hops = [0]
+    forward = net._forward
+
+    def counted(to_deliver):
+        hops[0] += sum(map(len, to_deliver.values()))
+        forward(to_deliver)
+    net._forward = counted
+
+    def step(n):
+        for _ in range(n):
+            net.inject_random_packets(load)
+            net.tick()
+            if node_cls is SQRWALT and net.time % update_interval == 0:
+                for node in net._node_list:
+                    node.tick_update()
+
+    step(warmup)
+    hops[0] = 0
+    delivered = metrics.total
+    start = time.perf_counter()
+    step(ticks)
+    wall = time.perf_counter() - start
+    delivered = metrics.total - delivered
+
+    return {
+        "algorithm":                algorithm,
+        "topology":                 topology_name,
+        "num_nodes":                net.csr.num_nodes,
+        "load_name":                load_name,
+        "load":                     load,
+        "ticks":                    ticks,
+        "wall":                     wall,
+        "ticks_per_sec":            ticks / wall,
+        "hops_per_sec":             hops[0] / wall,
+        "delivered_per_sec":        delivered / wall,
+        "in_flight":                len(net.packets),
+        "build_sec":                build_sec,
+        "routing_table_sec":        routing_sec,
+        # KiB on Linux, bytes on macOS
+        "peak_rss_mb":              resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                                    / (1024 ** 2 if sys.platform == "darwin" else 1024),
+    }
+
+
+def case_key(case: dict) -> str:
+    return f"{case['algorithm']}/{case['topology']}/{case['load_name']}"
+
+
+# ----------------------------------------
+# Baseline comparison
+# ----------------------------------------
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Lines describing every case that regressed beyond `tolerance`."""
+    old = {case_key(c): c for c in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        ref = old.get(case_key(case))
+        if ref is None:
+            continue
+        speed = case["ticks_per_sec"] / ref["ticks_per_sec"]
+        rss = case["peak_rss_mb"] / ref["peak_rss_mb"]
+        if speed < 1 - tolerance:
+            regressions.append(f"{case_key(case)}: ticks/sec {ref['ticks_per_sec']:.0f} "
+                               f"-> {case['ticks_per_sec']:.0f} ({speed - 1:+.0%})")
+        if rss > 1 + tolerance:
+            regressions.append(f"{case_key(case)}: peak RSS {ref['peak_rss_mb']:.0f} MB "
+                               f"-> {case['peak_rss_mb']:.0f} MB ({rss - 1:+.0%})")
+    return regressions
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--out", default="bench.json", help="JSON results file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed relative slowdown / RSS growth (default 0.15)")
+    parser.add_argument("--ticks", type=int, default=5_000, help="timed ticks per case")
+    parser.add_argument("--warmup", type=int, default=2_000, help="untimed ticks first")
+    parser.add_argument("--quick", action="store_true",
+                        help="only the 36-node layouts")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS),
+                        choices=list(ALGORITHMS))
+    parser.add_argument("--topologies", nargs="+", default=None, choices=list(TOPOLOGIES))
+    args = parser.parse_args()
+
+    topologies = args.topologies or (QUICK_TOPOLOGIES if args.quick else list(TOPOLOGIES))
+    cells = [(a, t, l, args.ticks, args.warmup)
+             for t in topologies for a in args.algorithms for l in LOAD_NAMES]
+
+    # One case at a time (timings), each in a fresh process (peak RSS)
+    cases = []
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        for cell in cells:
+            case = pool.submit(run_case, *cell).result()
+            print(f"{case_key(case):36s} {case['ticks_per_sec']:9.0f} ticks/s "
+                  f"{case['hops_per_sec']:11.0f} hops/s {case['peak_rss_mb']:7.0f} MB")
+            cases.append(case)
+
+    results = {
+        "meta": {
+            "revision": _git_revision(),
+            "python":   platform.python_version(),
+            "numpy":    np.__version__,
+            "machine":  platform.machine(),
+            "platform": platform.platform(),
+            "ticks":    args.ticks,
+            "warmup":   args.warmup,
+        },
+        "cases": cases,
+    }
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"Wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
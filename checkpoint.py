@@ -0,0 +1,299 @@
+"""
+Network checkpoints.
+
+`save_checkpoint(net, path)` writes the whole simulation state to one
+compressed `.npz` of plain arrays (no pickle): clock, adjacency (link
+events change it), `random` and NumPy RNG states, node queues and
+queue-policy state, the packet pool, Q-values (per-node dict tables in
+row order, or the dense `q_store` array), cached Boltzmann weights,
+SQRWALT temperatures and queue-length windows, the metrics sink's
+state and the delivered-packet log.
+
+`load_checkpoint(net, path)` restores it into a `Network` built from
+the same graph and node class, in place, so nodes keep their references
+to the network, its pool and its Q store.  Links added or removed
+before the save are replayed through the nodes' `add_neighbor` /
+`remove_neighbor` hooks first.  Continuing from a checkpoint
+reproduces the uninterrupted run exactly; loading one checkpoint into
+several fresh networks branches a warmed-up run.
+"""
+import random
+from array import array
+from typing import Dict
+
+import numpy as np
+
+from CSRGraph import CSRGraph
+from bellman_ford.routing_table import graph_hash, repair_next_hops
+
+FORMAT_VERSION = 1
+
+
+def _int_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.int64)
+
+
+# ----------------------------------------
+# Saving
+# ----------------------------------------
+def save_checkpoint(net, path: str) -> None:
+    nodes = net._node_list
+    index = net._index
+    node_cls = type(nodes[0]) if nodes else type(None)
+    state: Dict[str, np.ndarray] = {
+        "version":  np.array(FORMAT_VERSION),
+        "graph":    np.array(graph_hash(net.csr)),
+        "node_cls": np.array(node_cls.__name__),
+        "time":     np.array(net.time),
+        "dropped":  np.array(net.dropped),
+    }
+
+    # Adjacency, as link events left it
+    for col in ("indptr", "indices", "weights"):
+        state[f"csr/{col}"] = getattr(net.csr, col)
+
+    # RNG states
+    version, internal, gauss = random.getstate()
+    state["random/version"] = np.array(version)
+    state["random/state"]   = _int_array(internal)
+    state["random/gauss"]   = np.array(np.nan if gauss is None else gauss)
+    name, keys, pos, has_gauss, cached = np.random.get_state()
+    state["np_random/keys"] = keys
+    state["np_random/rest"] = np.array([pos, has_gauss], dtype=np.int64)
+    state["np_random/cached"] = np.array(cached)
+
+    # Queues: lengths + concatenated packet ids in queue order
+    state["queue/len"] = _int_array([len(node.queue) for node in nodes])
+    state["queue/pids"] = _int_array([pid for node in nodes for pid in node.queue])
+
+    # Packet pool
+    pool = net.packets
+    for col in ("src", "dst", "created_at", "delivered_at"):
+        state[f"pool/{col}"] = np.frombuffer(getattr(pool, col), dtype=np.int64).copy()
+    state["pool/free"] = _int_array(pool._free)
+
+    # Q-values
+    if net.q_store is not None:
+        state["q/dense"] = net.q_store.q
+    elif hasattr(nodes[0], "q_table"):
+        # Per node, its rows (in LRU order for bounded tables):
+        # destination index + values
+        rows_per_node, dsts, values = [], [], []
+        for node in nodes:
+            table = node.q_table
+            rows_per_node.append(len(table))
+            for dst in getattr(table, "_order", dict.keys(table)):
+                dsts.append(index[dst])
+                values.extend(dict.__getitem__(table, dst).values())
+        state["q/rows"] = _int_array(rows_per_node)
+        state["q/dst"] = _int_array(dsts)
+        state["q/values"] = np.asarray(values, dtype=float)
+
+    # Cached Boltzmann weights (StochasticQNode).  Cache hits skip the Q
+    # table, so they decide which LRU rows get touched: keep them as is
+    if all(hasattr(node, "_weights") for node in nodes):
+        state["weights/len"] = _int_array([len(node._weights) for node in nodes])
+        state["weights/dst"] = _int_array(
+            [index[dst] for node in nodes for dst in node._weights])
+        state["weights/temp"] = np.array(
+            [t for node in nodes for t, _ in node._weights.values()], dtype=float)
+        state["weights/values"] = np.array(
+            [w for node in nodes for _, cum in node._weights.values() for w in cum],
+            dtype=float)
+
+    # Temperatures and SQRWALT queue-length windows
+    if all("temperature" in vars(node) for node in nodes):
+        state["temperature"] = np.array([node.temperature for node in nodes], dtype=float)
+    if all(hasattr(node, "trend") for node in nodes):
+        state["trend/len"] = _int_array([len(node.trend.history) for node in nodes])
+        state["trend/history"] = _int_array([q for node in nodes for q in node.trend.history])
+
+    # Queue policy (drop counters, RED state)
+    if net.queue_policy is not None:
+        for key, value in net.queue_policy.get_state().items():
+            state[f"queue_policy/{key}"] = value
+
+    # Metrics and delivered log
+    if net.metrics is not None and hasattr(net.metrics, "get_state"):
+        for key, value in net.metrics.get_state().items():
+            state[f"metrics/{key}"] = value
+    state["delivered"] = _int_array(
+        [[p["src"], p["dst"], p["created_at"], p["delivered_at"]]
+         for p in net.delivered_packets]).reshape(-1, 4)
+
+    np.savez_compressed(path, **state)
+
+
+# ----------------------------------------
+# Loading
+# ----------------------------------------
+def _restore_topology(net, saved: CSRGraph) -> None:
+    """
+    Change `net.csr` (in place) to the saved adjacency, running the node
+    hooks as `Network.add_link` / `remove_link` do.  A node keeps its
+    neighbours' order and gets new ones last, so per node the longest
+    prefix of the saved list it already has in order stays and the rest
+    is removed and added again: slots, and so Q rows, line up with the
+    saved ones.
+    """
+    csr = net.csr
+    if all(np.array_equal(getattr(csr, col), getattr(saved, col))
+           for col in ("indptr", "indices", "weights")):
+        return
+    old = dict(zip(zip(*(a.tolist() for a in csr.edges())), csr.weights.tolist()))
+    new = dict(zip(zip(*(a.tolist() for a in saved.edges())), saved.weights.tolist()))
+    # Arcs for the route repair: changed weights, plus every arc of a node
+    # whose neighbour order changed (its next hops break ties by it)
+    arcs = {arc for arc in old.keys() | new.keys() if old.get(arc) != new.get(arc)}
+    for i in range(csr.num_nodes):
+        if not np.array_equal(csr.neighbors(i), saved.neighbors(i)):
+            arcs.update((i, j) for j in saved.neighbors(i).tolist())
+
+    if net.q_tables is not None and hasattr(net.q_tables, "topology_changed"):
+        net.q_tables.topology_changed()
+    for i, node in enumerate(net._node_list):
+        current = list(node.neighbors)
+        target = saved.neighbor_ids(i)
+        if current == target:
+            continue
+        pos = {nid: k for k, nid in enumerate(current)}
+        keep, last = 0, -1
+        for nid in target:
+            if pos.get(nid, -1) <= last:
+                break
+            last = pos[nid]
+            keep += 1
+        kept = set(target[:keep])
+        for nid in current:
+            if nid not in kept:
+                net._neighbor_changed(node.id, nid, "remove_neighbor")
+        for nid in target[keep:]:
+            net._neighbor_changed(node.id, nid, "add_neighbor")
+
+    csr.indptr[:] = saved.indptr
+    csr.indices = saved.indices.copy()
+    csr.weights = saved.weights.copy()
+    inf = float("inf")
+    repair_next_hops(net, [(i, j, old.get((i, j), inf), new.get((i, j), inf))
+                           for i, j in sorted(arcs)])
+
+
+def load_checkpoint(net, path: str) -> None:
+    with np.load(path, allow_pickle=False) as data:
+        state = {key: data[key] for key in data.files}
+
+    if int(state["version"]) != FORMAT_VERSION:
+        raise ValueError(f"{path}: checkpoint format {int(state['version'])}, "
+                         f"expected {FORMAT_VERSION}")
+    nodes = net._node_list
+    node_ids = net._node_ids
+    saved = net.csr
+    if "csr/indptr" in state:
+        saved = CSRGraph(state["csr/indptr"], state["csr/indices"], state["csr/weights"],
+                         node_ids)
+    if str(state["graph"]) != graph_hash(saved):
+        raise ValueError(f"{path}: checkpoint was saved for a different graph")
+    if nodes and str(state["node_cls"]) != type(nodes[0]).__name__:
+        raise ValueError(f"{path}: checkpoint holds {state['node_cls']} nodes, "
+                         f"not {type(nodes[0]).__name__}")
+    if saved is not net.csr:
+        _restore_topology(net, saved)
+
+    net.time = int(state["time"])
+    net.dropped = int(state["dropped"])
+
+    gauss = float(state["random/gauss"])
+    random.setstate((int(state["random/version"]),
+                     tuple(state["random/state"].tolist()),
+                     None if np.isnan(gauss) else gauss))
+    pos, has_gauss = state["np_random/rest"].tolist()
+    np.random.set_state(("MT19937", state["np_random/keys"], pos, has_gauss,
+                         float(state["np_random/cached"])))
+
+    # Packet pool, in place
+    pool = net.packets
+    for col in ("src", "dst", "created_at", "delivered_at"):
+        getattr(pool, col)[:] = array("q", state[f"pool/{col}"].tobytes())
+    pool._free[:] = state["pool/free"].tolist()
+
+    # Queues and the busy nodes
+    pids = state["queue/pids"].tolist()
+    start = 0
+    net._busy = bytearray(len(nodes))
+    net._order = []
+    net._woken = []
+    for i, (node, n) in enumerate(zip(nodes, state["queue/len"].tolist())):
+        node.queue.clear()
+        node.queue.extend(pids[start:start + n])
+        start += n
+        if n:
+            net._busy[i] = 1
+            net._order.append(i)
+
+    # Q-values
+    if "q/dense" in state:
+        net.q_store.restore(state["q/dense"])
+    elif "q/rows" in state:
+        dsts = state["q/dst"].tolist()
+        values = state["q/values"].tolist()
+        r = v = 0
+        for node, n_rows in zip(nodes, state["q/rows"].tolist()):
+            table = node.q_table
+            lazy = hasattr(table, "on_evict")
+            if lazy:
+                # Rebuild in saved (LRU) order
+                dict.clear(table)
+                getattr(table, "_order", {}).clear()
+            deg = len(node.neighbors)
+            for dst_idx in dsts[r:r + n_rows]:
+                dst = node_ids[dst_idx]
+                row = dict(zip(node.neighbors, values[v:v + deg]))
+                if lazy:
+                    dict.__setitem__(table, dst, row)
+                    if hasattr(table, "_order"):
+                        table._order[dst] = None
+                else:
+                    table[dst].update(row)
+                v += deg
+            r += n_rows
+
+    if "weights/len" in state:
+        dsts = state["weights/dst"].tolist()
+        temps = state["weights/temp"].tolist()
+        values = state["weights/values"].tolist()
+        r = v = 0
+        for node, n in zip(nodes, state["weights/len"].tolist()):
+            deg = len(node.neighbors)
+            node._weights.clear()
+            for dst_idx, t in zip(dsts[r:r + n], temps[r:r + n]):
+                node._weights[node_ids[dst_idx]] = (t, values[v:v + deg])
+                v += deg
+            r += n
+
+    if "temperature" in state:
+        for node, t in zip(nodes, state["temperature"].tolist()):
+            node.temperature = t
+    if "trend/len" in state:
+        history = state["trend/history"].tolist()
+        start = 0
+        for node, n in zip(nodes, state["trend/len"].tolist()):
+            trend = node.trend
+            trend.history.clear()
+            trend.sum_q = trend.sum_tq = 0
+            for q in history[start:start + n]:
+                trend.push(q)
+            start += n
+
+    metrics = {key[len("metrics/"):]: value for key, value in state.items()
+               if key.startswith("metrics/")}
+    if metrics and net.metrics is not None:
+        net.metrics.set_state(metrics)
+    policy = {key[len("queue_policy/"):]: value for key, value in state.items()
+              if key.startswith("queue_policy/")}
+    if policy and net.queue_policy is not None:
+        net.queue_policy.set_state(policy)
+
+    net.delivered_packets.clear()
+    net.delivered_packets.extend(
+        {"src": s, "dst": d, "created_at": c, "next_hop": None, "delivered_at": t}
+        for s, d, c, t in state["delivered"].tolist())
@@ -2,10 +2,10 @@ import networkx as nx
 from collections import defaultdict
 import matplotlib.pyplot as plt
 
-def generate_dense_irregular_grid():
+def generate_dense_irregular_grid(N=6):
+    # N x N grid; for large meshes without the networkx copy use topology.grid
     graph = defaultdict(list)
     G = nx.Graph()
-    N = 6  # 6x6 grid
 
     def connect(u, v):
         weight = 1
@@ -24,8 +24,7 @@ def generate_dense_irregular_grid():
 
     return graph, G
 
-def visualize_grid(graph):
-    N = 6
+def visualize_grid(graph, N=6):
     NODES = N * N
     
     G = nx.Graph()
@@ -46,7 +45,7 @@ def visualize_grid(graph):
         font_size=10,
         font_weight="bold"
     )
-    plt.title("6x6 Dense Grid Network")
+    plt.title(f"{N}x{N} Dense Grid Network")
     plt.axis("off")
     plt.show()
 
@@ -0,0 +1,461 @@
+"""
+Parallel experiment runner.
+
+Every (node class, load schedule, seed) cell is an independent
+simulation, so sweeps are fanned out over a `ProcessPoolExecutor`.
+Each cell reseeds `random` (and NumPy) from its own seed exactly as the
+serial scripts do, so a parallel sweep reproduces a serial one bit for
+bit regardless of how cells are scheduled onto workers.
+
+`engine` may be `Network`, `VectorNetwork`, `CompiledNetwork`,
+`BatchNetwork` or `PartitionedNetwork` (bind its worker count with
+`functools.partial(PartitionedNetwork, workers=4)`); all but `Network`
+run each record interval in a single `advance` call.
+
+`run_steady_state` / `run_load_sweep` can shorten the warm-up of
+Q-learning cells: `warm_start` starts them from shortest-path Q-values
+("shortest_path") or from a snapshot saved by an earlier sweep through
+`save_q` (a path template with {load} and {seed}), and `converge` (a
+`ConvergenceDetector` factory) ends the warm-up as soon as Q-values
+settle instead of after a fixed `discard_steps`.
+
+With `engine=BatchNetwork`, `run_seeds` and `run_load_sweep` run all
+seeds of a cell as replicas of one batched simulation (one process per
+load schedule / load level instead of one per seed); every replica
+reproduces the `VectorNetwork` run for its seed.
+
+A phase of the schedule may start with link events — failing, adding
+or re-weighting links mid-run (see `Phases`) — to measure how quickly
+each algorithm adapts; BellmanFordNode tables are repaired at once.
+
+Passing `trace` (a path template such as "traces/test-phases-{seed}.npy",
+see traces.py) replays a pre-generated workload instead of drawing
+packets from `random`, so different node classes see identical traffic.
+
+Layout factories return either a (graph, positions) pair like
+`layout.generate_irregular_grid` or a bare graph like the `topology`
+generators.  Node classes and layout factories must be picklable, i.e.
+defined at module level (use `functools.partial` to bind layout
+parameters).
+"""
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+from BatchNetwork import BatchNetwork
+from DelayHistogram import DelayHistogram
+from DeliveryStats import DeliveryStats
+from Network import Network
+from PartitionedNetwork import PartitionedNetwork
+from profiling import Profiler
+from ResultsStore import ResultsStore
+from bellman_ford.routing_table import graph_hash
+from q_routing.QNode import QNode
+from q_routing import warm_start as q_warm
+from traces import TraceReplay
+
+# [(steps, load), ...]; a phase may carry link events applied when it
+# starts, (steps, load, [("remove_link", u, v), ("add_link", u, v, weight),
+# ("set_weight", u, v, weight), ...]) (`Network` engine only)
+Phases = Sequence[tuple]
+
+LINK_EVENTS = ("remove_link", "add_link", "set_weight")
+
+
+def _build(node_cls: Type, layout_factory: Callable, seed: int,
+           engine: Type, metrics: DeliveryStats,
+           queue_policy: Optional[Callable] = None):
+    random.seed(seed)
+    np.random.seed(seed)
+    graph = _layout_graph(layout_factory)
+    if engine is Network:
+        return Network(graph, node_cls, keep_delivered=False, metrics=metrics,
+                       queue_policy=queue_policy)
+    if queue_policy is not None:
+        raise ValueError("bounded queues are only available for the Network engine")
+    return engine(graph, node_cls, seed=seed, keep_delivered=False, metrics=metrics)
+
+
+def _layout_graph(layout_factory: Callable):
+    """The graph a layout factory builds (dict of lists or `CSRGraph`)."""
+    layout = layout_factory()
+    return layout[0] if isinstance(layout, tuple) else layout
+
+
+def _build_batch(node_cls: Type, layout_factory: Callable, seeds: Sequence[int],
+                 metrics: List[DeliveryStats]) -> BatchNetwork:
+    # The replicas share the topology built for the first seed
+    random.seed(seeds[0])
+    np.random.seed(seeds[0])
+    graph = _layout_graph(layout_factory)
+    return BatchNetwork(graph, node_cls, seeds, keep_delivered=False, metrics=metrics)
+
+
+def _close(net) -> None:
+    """Stop the worker processes of a `PartitionedNetwork`."""
+    if hasattr(net, "close"):
+        net.close()
+
+
+def _tick_update(net) -> None:
+    """SQRWALT temperature update for either engine (a no-op for other classes)."""
+    if hasattr(net, "tick_update"):
+        net.tick_update()
+        return
+    for node in net.nodes.values():
+        if hasattr(node, "tick_update"):
+            node.tick_update()
+
+
+def _apply_events(net, events: Sequence[tuple]) -> None:
+    """Run a phase's link events (`Network.remove_link` etc.)."""
+    for name, *args in events:
+        if name not in LINK_EVENTS:
+            raise ValueError(f"unknown link event {name!r} (expected one of {LINK_EVENTS})")
+        getattr(net, name)(*args)
+
+
+def _record(metrics: DeliveryStats, time: int, run: Tuple[list, ...],
+            records: Optional[Dict[str, list]]) -> None:
+    """Close the metrics window and keep it (in `run`, and `records` for the store)."""
+    stats = metrics.interval()
+    if stats["count"]:
+        for column, value in zip(run, (time, stats["mean"], stats["loss"], metrics.last_hist)):
+            column.append(value)
+        if records is not None:
+            row = dict(time=time, **stats, hist=metrics.last_hist)
+            for key, value in row.items():
+                records.setdefault(key, []).append(value)
+
+
+def _append_run(store: str, records: Dict[str, list], node_cls: Type, topology: str,
+                layout_factory: Callable, **tags) -> None:
+    ResultsStore(store).append(
+        records, algorithm=node_cls.__name__, topology=topology,
+        layout=getattr(layout_factory, "__name__", repr(layout_factory)), **tags)
+
+
+# ----------------------------------------
+# Single cells
+# ----------------------------------------
+def run_phases(node_cls: Type, layout_factory: Callable, phases: Phases,
+               seed: int, record_interval: int,
+               update_interval: Optional[int] = None,
+               engine: Type = Network,
+               trace: Optional[str] = None,
+               profile: Optional[str] = None,
+               queue_policy: Optional[Callable] = None,
+               store: Optional[str] = None
+               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Run one seed through a load schedule.
+
+    With `trace`, injections are replayed from trace.format(seed=seed)
+    and the loads in `phases` only delimit the phases.  With `profile`
+    (`Network` engine only), a `Profiler` summary with one entry per
+    record interval is written to profile.format(seed=seed).
+    `queue_policy` bounds the node queues (see QueuePolicy.py).  With
+    `store` (a `ResultsStore` directory), every recorded interval's
+    statistics (including p50/p95/p99 and the delay histogram counts)
+    are appended to it, tagged with the algorithm, topology hash,
+    schedule and seed.
+
+    Returns (time_points, avg_delay, loss, hist) for every record
+    interval in which at least one packet was delivered; loss is the
+    fraction of packets dropped in the interval (0 with unbounded
+    queues) and hist[k] the interval's `DelayHistogram` counts.
+    """
+    if engine is not Network and any(len(phase) > 2 and phase[2] for phase in phases):
+        raise ValueError("link events are only available for the Network engine")
+    net = _build(node_cls, layout_factory, seed, engine, DeliveryStats(), queue_policy)
+    replay = TraceReplay(trace.format(seed=seed)) if trace else None
+    if profile and engine is not Network:
+        raise ValueError("profiling is only available for the Network engine")
+    profiler = Profiler().attach(net) if profile else None
+    # Tagged with the topology the run started from (link events change it)
+    topology = graph_hash(net.csr) if store else None
+    run = ([], [], [], [])   # time points, delays, losses, hists
+    records: Optional[Dict[str, list]] = {} if store else None
+
+    if hasattr(net, "advance"):
+        # Engines with `advance` run the SQRWALT updates themselves
+        net.update_interval = update_interval or 0
+
+    for phase_steps, load, *events in phases:
+        if events:
+            _apply_events(net, events[0])
+        phase_end = net.time + phase_steps
+        while net.time < phase_end:
+            if replay is None and hasattr(net, "advance"):
+                # One (compiled) call per record interval, SQRWALT updates included
+                stop = min(phase_end, (net.time // record_interval + 1) * record_interval)
+                net.advance(stop - net.time, load)
+            elif replay is None:
+                net.inject_random_packets(load)
+                net.tick()
+            else:
+                # Run to the next phase / record / update boundary, skipping idle time
+                stop = min(phase_end, (net.time // record_interval + 1) * record_interval)
+                if update_interval:
+                    stop = min(stop, (net.time // update_interval + 1) * update_interval)
+                net.run(stop, replay)
+
+            if update_interval and net.time % update_interval == 0 and not hasattr(net, "advance"):
+                _tick_update(net)
+
+            if net.time % record_interval == 0:
+                _record(net.metrics, net.time, run, records)
+                if profiler is not None:
+                    profiler.interval()
+
+    _close(net)
+    if profiler is not None:
+        profiler.detach()
+        profiler.write_json(profile.format(seed=seed), {
+            "node_cls": node_cls.__name__, "seed": seed,
+            "num_nodes": net.csr.num_nodes, "phases": [list(p) for p in phases],
+        })
+    if store:
+        _append_run(store, records, node_cls, topology, layout_factory,
+                    phases=phases, seed=seed,
+                    engine=getattr(engine, "__name__", repr(engine)),
+                    record_interval=record_interval, update_interval=update_interval,
+                    trace=trace, queue_policy=repr(queue_policy) if queue_policy else None)
+    return tuple(np.array(column) for column in run)
+
+
+def run_phases_batch(node_cls: Type, layout_factory: Callable, phases: Phases,
+                     seeds: Sequence[int], record_interval: int,
+                     update_interval: Optional[int] = None,
+                     trace: Optional[str] = None,
+                     store: Optional[str] = None
+                     ) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    `run_phases` for every seed at once, as the replicas of one
+    `BatchNetwork`.  Returns one (time_points, avg_delay, loss, hist)
+    tuple per seed; with `store`, one run per seed is appended.
+    """
+    if any(len(phase) > 2 and phase[2] for phase in phases):
+        raise ValueError("link events are only available for the Network engine")
+    sinks = [DeliveryStats() for _ in seeds]
+    net = _build_batch(node_cls, layout_factory, seeds, sinks)
+    replays = [TraceReplay(trace.format(seed=seed)) for seed in seeds] if trace else None
+    runs = [([], [], [], []) for _ in seeds]
+    records = [{} if store else None for _ in seeds]
+    # `advance` and `run` run the SQRWALT updates themselves
+    net.update_interval = update_interval or 0
+
+    for phase_steps, load, *_ in phases:
+        phase_end = net.time + phase_steps
+        while net.time < phase_end:
+            stop = min(phase_end, (net.time // record_interval + 1) * record_interval)
+            if replays is None:
+                net.advance(stop - net.time, load)
+            else:
+                net.run(stop, replays)
+
+            if net.time % record_interval == 0:
+                net.flush_metrics()
+                for sink, run, rows in zip(sinks, runs, records):
+                    _record(sink, net.time, run, rows)
+
+    if store:
+        for seed, rows in zip(seeds, records):
+            _append_run(store, rows, node_cls, graph_hash(net.csr), layout_factory,
+                        phases=phases, seed=seed, engine=BatchNetwork.__name__,
+                        record_interval=record_interval, update_interval=update_interval,
+                        trace=trace, queue_policy=None)
+    return [tuple(np.array(column) for column in run) for run in runs]
+
+
+def _advance(net, until: int, load: float) -> None:
+    """Inject and tick up to `until`, in one `advance` call where the engine has it."""
+    if hasattr(net, "advance"):
+        net.advance(until - net.time, load)
+        return
+    while net.time < until:
+        net.inject_random_packets(load)
+        net.tick()
+
+
+def run_steady_state(node_cls: Type, layout_factory: Callable, load: float,
+                     seed: int, num_steps: int, discard_steps: int,
+                     engine: Type = Network,
+                     warm_start: Optional[str] = None,
+                     converge: Optional[Callable[[], q_warm.ConvergenceDetector]] = None,
+                     save_q: Optional[str] = None) -> float:
+    """
+    Mean delay of packets created after `discard_steps` at a constant load.
+
+    For Q-learning classes:
+    warm_start : "shortest_path", or a Q snapshot path template
+                 (formatted with load and seed) to start from
+    converge   : `ConvergenceDetector` factory; the warm-up then ends at
+                 the first check that finds Q converged (at the latest
+                 after `discard_steps`) and the measured stretch keeps its
+                 length of num_steps - discard_steps
+    save_q     : path template to save the final Q snapshot to
+    """
+    metrics = DeliveryStats(created_after=discard_steps)
+    net = _build(node_cls, layout_factory, seed, engine, metrics)
+    learns = issubclass(node_cls, QNode)
+    if learns and isinstance(net, PartitionedNetwork) and (warm_start or converge or save_q):
+        _close(net)
+        raise ValueError("warm starts and Q snapshots need the Q state in one process; "
+                         "use another engine")
+
+    if learns and warm_start == "shortest_path":
+        q_warm.warm_start(net, q_warm.shortest_path_q(net.csr))
+    elif learns and warm_start:
+        path = warm_start.format(load=load, seed=seed)
+        q_warm.warm_start(net, q_warm.load_q_snapshot(path, net.csr))
+
+    if learns and converge is not None:
+        detector = converge()
+        while net.time < discard_steps:
+            _advance(net, min(discard_steps, net.time + detector.interval), load)
+            if detector.check(net):
+                break
+        metrics.created_after = net.time
+        num_steps = net.time + num_steps - discard_steps
+
+    _advance(net, num_steps, load)
+    if learns and save_q:
+        path = save_q.format(load=load, seed=seed)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        q_warm.save_q_snapshot(net, path)
+    _close(net)
+    return metrics.total_mean if metrics.total else np.nan
+
+
+def run_steady_state_batch(node_cls: Type, layout_factory: Callable, load: float,
+                           seeds: Sequence[int], num_steps: int, discard_steps: int,
+                           warm_start: Optional[str] = None,
+                           converge: Optional[Callable[[], q_warm.ConvergenceDetector]] = None
+                           ) -> np.ndarray:
+    """
+    `run_steady_state` for every seed at once, as the replicas of one
+    `BatchNetwork`; returns the mean delay per seed.  A `converge`
+    detector watches all replicas' Q-values together, so their warm-ups
+    end at the same tick.
+    """
+    sinks = [DeliveryStats(created_after=discard_steps) for _ in seeds]
+    net = _build_batch(node_cls, layout_factory, seeds, sinks)
+    learns = issubclass(node_cls, QNode)
+
+    if learns and warm_start == "shortest_path":
+        net.q_store.restore(q_warm.shortest_path_q(net.csr))
+    elif learns and warm_start:
+        net.q_store.restore(np.concatenate([
+            q_warm.load_q_snapshot(warm_start.format(load=load, seed=seed), net.csr)
+            for seed in seeds]))
+
+    if learns and converge is not None:
+        detector = converge()
+        while net.time < discard_steps:
+            _advance(net, min(discard_steps, net.time + detector.interval), load)
+            if detector.check(net):
+                break
+        for sink in sinks:
+            sink.created_after = net.time
+        num_steps = net.time + num_steps - discard_steps
+
+    _advance(net, num_steps, load)
+    net.flush_metrics()
+    return np.array([sink.total_mean if sink.total else np.nan for sink in sinks])
+
+
+# ----------------------------------------
+# Sweeps
+# ----------------------------------------
+def _map(fn: Callable, cells: List[Dict[str, Any]], max_workers: Optional[int]) -> list:
+    """Run `fn(**cell)` for every cell, in parallel unless max_workers == 1."""
+    if max_workers == 1:
+        return [fn(**cell) for cell in cells]
+    max_workers = max_workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(fn, **cell) for cell in cells]
+        return [f.result() for f in futures]
+
+
+def run_seeds(node_cls: Type, layout_factory: Callable, phases: Phases,
+              seeds: Sequence[int], record_interval: int,
+              update_interval: Optional[int] = None,
+              engine: Type = Network,
+              max_workers: Optional[int] = None,
+              trace: Optional[str] = None,
+              profile: Optional[str] = None,
+              queue_policy: Optional[Callable] = None,
+              store: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    `run_phases` for every seed, aggregated the way the scripts save
+    them: {"time", "avg", "std"} with avg/std taken across seeds,
+    "p50", "p95", "p99" of the delays pooled over all seeds (merged
+    histograms), plus the mean "loss" across seeds when queues are
+    bounded.
+    """
+    if engine is BatchNetwork:
+        if profile or queue_policy is not None:
+            raise ValueError("BatchNetwork supports neither profiling nor bounded queues")
+        runs = run_phases_batch(node_cls, layout_factory, phases, seeds, record_interval,
+                                update_interval=update_interval, trace=trace, store=store)
+    else:
+        cell = dict(node_cls=node_cls, layout_factory=layout_factory, phases=phases,
+                    record_interval=record_interval, update_interval=update_interval,
+                    engine=engine, trace=trace, profile=profile,
+                    queue_policy=queue_policy, store=store)
+        runs = _map(run_phases, [dict(cell, seed=seed) for seed in seeds], max_workers)
+
+    delays = np.array([run[1] for run in runs])
+    results = {
+        "time": runs[0][0],
+        "avg":  np.mean(delays, axis=0),
+        "std":  np.std(delays, axis=0),
+    }
+    pooled = [DelayHistogram.from_counts(counts)
+              for counts in np.sum([run[3] for run in runs], axis=0)]
+    for q in (50, 95, 99):
+        results[f"p{q}"] = np.array([h.percentile(q) for h in pooled])
+    if queue_policy is not None:
+        results["loss"] = np.mean([run[2] for run in runs], axis=0)
+    return results
+
+
+def run_load_sweep(node_classes: Sequence[Type], layout_factory: Callable,
+                   load_levels: Sequence[float], seeds: Sequence[int],
+                   num_steps: int, discard_steps: int,
+                   engine: Type = Network,
+                   max_workers: Optional[int] = None,
+                   warm_start: Optional[str] = None,
+                   converge: Optional[Callable[[], q_warm.ConvergenceDetector]] = None,
+                   save_q: Optional[str] = None) -> Dict[Type, np.ndarray]:
+    """
+    `run_steady_state` over every (class, load, seed) cell.
+
+    Returns {node_cls: mean delay per load level, averaged over seeds}.
+    With `engine=BatchNetwork` each (class, load) cell runs all seeds in
+    one `run_steady_state_batch` call (`save_q` is not available then).
+    """
+    if engine is BatchNetwork:
+        if save_q:
+            raise ValueError("save_q needs one network per seed; use another engine")
+        cell = dict(layout_factory=layout_factory, seeds=seeds, num_steps=num_steps,
+                    discard_steps=discard_steps, warm_start=warm_start, converge=converge)
+        cells = [dict(cell, node_cls=cls, load=load)
+                 for cls in node_classes
+                 for load in load_levels]
+        results = np.array(_map(run_steady_state_batch, cells, max_workers))
+    else:
+        cell = dict(layout_factory=layout_factory, num_steps=num_steps,
+                    discard_steps=discard_steps, engine=engine, warm_start=warm_start,
+                    converge=converge, save_q=save_q)
+        cells = [dict(cell, node_cls=cls, load=load, seed=seed)
+                 for cls in node_classes
+                 for load in load_levels
+                 for seed in seeds]
+        results = np.array(_map(run_steady_state, cells, max_workers))
+    results = results.reshape(len(node_classes), len(load_levels), len(seeds))
+    return {cls: results[i].mean(axis=1) for i, cls in enumerate(node_classes)}
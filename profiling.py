@@ -0,0 +1,211 @@
+"""
+Opt-in instrumentation for `Network`.
+
+    profiler = Profiler()
+    profiler.attach(net)          # start measuring
+    ...                           # inject / tick / run as usual
+    profiler.interval()           # window stats, e.g. at record intervals
+    profiler.write_json("profile.json")
+    profiler.detach()
+
+Nothing in `Network` or the node classes checks for a profiler: while
+attached, the profiler shadows the methods it measures with timed
+wrappers stored on the instances, and `detach()` deletes them again.
+An unprofiled run executes exactly the same code as before.
+
+Measured stages (wall-clock seconds and call counts):
+
+    inject      inject_random_packets / inject_traffic
+    process     step 1 of a tick: every busy node's process(), which
+                includes select, q_update and deliver below
+    select      select_next_hop (Q-learning nodes)
+    q_update    update_q (Q-learning nodes)
+    deliver     Network.deliver for packets reaching their destination,
+                including metrics
+    metrics     the metrics sink's record()
+    forward     step 2 of a tick: forwarded packets into next-hop queues
+    tick_update SQRWALT temperature updates
+
+plus ticks/sec and hops/sec, and per node its forward count and mean /
+maximum queue length over the ticks it was busy.  `summary()` is plain
+JSON data, so runs of different versions can be compared.
+"""
+import json
+import platform
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+STAGES = ("inject", "process", "select", "q_update", "deliver", "metrics",
+          "forward", "tick_update")
+
+
+class Profiler:
+
+    def __init__(self):
+        self.net = None
+        self.stages: Dict[str, List[float]] = {s: [0.0, 0] for s in STAGES}
+        self.ticks = 0
+        self.hops = 0
+        self.wall = 0.0
+        self.intervals: List[Dict[str, object]] = []
+        # Called with every `interval()` result
+        self.on_interval: List[Callable[[Dict[str, object]], None]] = []
+        self._patched: List[tuple] = []
+
+    # ------------------------------------------------------------------
+    # Attaching
+    # ------------------------------------------------------------------
+    def _timed(self, stage: str, fn: Callable) -> Callable:
+        acc = self.stages[stage]
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            result = fn(*args)
+            acc[0] += clock() - start
+            acc[1] += 1
+            return result
+        return timed
+
+    def _patch(self, obj, name: str, wrapper: Callable) -> None:
+        setattr(obj, name, wrapper)
+        self._patched.append((obj, name))
+
+    def attach(self, net) -> "Profiler":
+        if self.net is not None:
+            raise RuntimeError("Profiler is already attached to a network")
+        self.net = net
+        nodes = net._node_list
+        n = len(nodes)
+        self.forwards = np.zeros(n, dtype=np.int64)
+        self.queue_sum = np.zeros(n, dtype=np.int64)
+        self.queue_max = np.zeros(n, dtype=np.int64)
+        self.busy_ticks = np.zeros(n, dtype=np.int64)
+
+        for name, stage in (("inject_random_packets", "inject"),
+                            ("inject_traffic", "inject"),
+                            ("deliver", "deliver"),
+                            ("_forward", "forward")):
+            self._patch(net, name, self._timed(stage, getattr(net, name)))
+        self._patch(net, "_process_active", self._timed("process", self._sampled(net)))
+        if net.metrics is not None:
+            self._patch(net.metrics, "record", self._timed("metrics", net.metrics.record))
+
+        for i, node in enumerate(nodes):
+            self._patch(node, "process", self._counted(i, node.process))
+            for name, stage in (("select_next_hop", "select"), ("update_q", "q_update"),
+                                ("tick_update", "tick_update")):
+                if hasattr(node, name):
+                    self._patch(node, name, self._timed(stage, getattr(node, name)))
+
+        self._start_time = net.time
+        self._start_wall = time.perf_counter()
+        self._mark()
+        return self
+
+    def detach(self) -> None:
+        """Remove every wrapper; the totals stay readable."""
+        if self.net is None:
+            return
+        self._update_totals()
+        for obj, name in reversed(self._patched):
+            delattr(obj, name)
+        self._patched.clear()
+        self.net = None
+
+    def _sampled(self, net) -> Callable:
+        """`_process_active` that first samples the busy nodes' queue lengths."""
+        process_active = net._process_active
+        nodes = net._node_list
+        queue_sum, queue_max, busy = self.queue_sum, self.queue_max, self.busy_ticks
+
+        def sampled():
+            for i in net._order + net._woken:
+                q = len(nodes[i].queue)
+                queue_sum[i] += q
+                busy[i] += 1
+                if q > queue_max[i]:
+                    queue_max[i] = q
+            return process_active()
+        return sampled
+
+    def _counted(self, i: int, process: Callable) -> Callable:
+        forwards = self.forwards
+
+        def counted():
+            result = process()
+            if result:
+                forwards[i] += 1
+            return result
+        return counted
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def _update_totals(self) -> None:
+        self.ticks = self.net.time - self._start_time
+        self.hops = int(self.forwards.sum())
+        self.wall = time.perf_counter() - self._start_wall
+
+    def _mark(self) -> None:
+        self._last = (self.net.time, int(self.forwards.sum()), time.perf_counter(),
+                      {s: acc[0] for s, acc in self.stages.items()})
+
+    def interval(self) -> Dict[str, object]:
+        """Tick rate and stage times since the previous call (or `attach`)."""
+        net = self.net
+        last_time, last_hops, last_wall, last_stages = self._last
+        wall = time.perf_counter() - last_wall
+        ticks = net.time - last_time
+        hops = int(self.forwards.sum()) - last_hops
+        stats = {
+            "time":          net.time,
+            "ticks":         ticks,
+            "hops":          hops,
+            "wall":          wall,
+            "ticks_per_sec": ticks / wall if wall > 0 else float("nan"),
+            "hops_per_sec":  hops / wall if wall > 0 else float("nan"),
+            "in_flight":     len(net.packets),
+            "stages":        {s: acc[0] - last_stages[s] for s, acc in self.stages.items()},
+        }
+        self._mark()
+        self.intervals.append(stats)
+        for callback in self.on_interval:
+            callback(stats)
+        return stats
+
+    def summary(self) -> Dict[str, object]:
+        """Run totals, per-stage and per-node counters and all intervals (JSON data)."""
+        if self.net is not None:
+            self._update_totals()
+        wall = self.wall
+        busy = np.maximum(self.busy_ticks, 1)
+        return {
+            "python":        platform.python_version(),
+            "numpy":         np.__version__,
+            "ticks":         self.ticks,
+            "hops":          self.hops,
+            "wall":          wall,
+            "ticks_per_sec": self.ticks / wall if wall > 0 else float("nan"),
+            "hops_per_sec":  self.hops / wall if wall > 0 else float("nan"),
+            "stages": {
+                s: {"seconds": acc[0], "calls": acc[1],
+                    "share": acc[0] / wall if wall > 0 else float("nan")}
+                for s, acc in self.stages.items()
+            },
+            "nodes": {
+                "forwards":   self.forwards.tolist(),
+                "mean_queue": (self.queue_sum / busy).tolist(),
+                "max_queue":  self.queue_max.tolist(),
+            },
+            "intervals": self.intervals,
+        }
+
+    def write_json(self, path: str, extra: Optional[Dict[str, object]] = None) -> None:
+        """Write `summary()` (updated with `extra`, e.g. the run's configuration)."""
+        summary = self.summary()
+        summary.update(extra or {})
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=1)
@@ -0,0 +1,139 @@
+import numpy as np
+
+from CSRGraph import CSRGraph
+
+
+class DenseQTable:
+    """
+    Network-wide Q storage in one `(nodes × destinations × max_degree)`
+    float array.
+
+    q[i, d, k] is node i's estimated delivery time to destination d when
+    forwarding via its k-th neighbour (the CSR adjacency order); padding
+    slots of low-degree nodes hold +inf.  Indices are dense node indices
+    (`index[node_id]`).
+
+    For every (i, d) the row minimum and its first arg-min slot are kept
+    up to date on each update, so a neighbour's estimate is O(1) and
+    greedy selection needs no scan.  The whole Q state is `q` — a
+    snapshot is one array copy.
+
+    With `replicas` > 1 the table holds that many independent copies of
+    the network's Q state stacked along the first axis (`BatchNetwork`):
+    row r * nodes + i is node i of replica r, destinations stay 0..N-1.
+    """
+
+    def __init__(self, graph, replicas: int = 1):
+        csr = CSRGraph.from_dict(graph)
+        self.node_ids = csr.node_ids
+        self.index = csr.index
+        n = csr.num_nodes
+
+        self.deg = csr.degree
+        self.nbr, _, self.valid = csr.padded()
+        max_deg = self.nbr.shape[1]
+        # slots[i]: {neighbor_id: k} for node i
+        self.slots = [{v: k for k, v in enumerate(csr.neighbor_ids(i))} for i in range(n)]
+
+        self.q = np.ascontiguousarray(np.broadcast_to(
+            np.where(self.valid[:, None, :], 0.0, np.inf), (replicas, n, n, max_deg)
+        )).reshape(replicas * n, n, max_deg)
+        self.min  = np.zeros((replicas * n, n))
+        self.best = np.zeros((replicas * n, n), dtype=np.int64)
+        self._refresh()
+        self._views()
+
+    def _views(self) -> None:
+        # Flat (i * n + d) row views for the array engines
+        self.rows = self.q.reshape(-1, self.q.shape[2])
+        # memoryviews index with tuples and return plain Python numbers,
+        # which is noticeably cheaper than NumPy scalars on the per-hop path
+        self.qv    = memoryview(self.q)
+        self.minv  = memoryview(self.min)
+        self.bestv = memoryview(self.best)
+
+    # ------------------------------------------------------------------
+    # Per-node access (QNode)
+    # ------------------------------------------------------------------
+    def update(self, i: int, d: int, k: int, value: float) -> None:
+        """Set q[i, d, k] and keep the row's cached min / arg-min current."""
+        self.qv[i, d, k] = value
+        best = self.bestv[i, d]
+        low = self.minv[i, d]
+        if value < low or (value == low and k < best):
+            self.minv[i, d] = value
+            self.bestv[i, d] = k
+        elif k == best:
+            # The minimum went up; rescan this row only
+            row = self.q[i, d]
+            best = int(row.argmin())
+            self.bestv[i, d] = best
+            self.minv[i, d] = float(row[best])
+
+    def row(self, i: int, d: int) -> np.ndarray:
+        """Q-values of node i towards d, one per neighbour (a view)."""
+        return self.q[i, d, :self.deg[i % len(self.deg)]]
+
+    # ------------------------------------------------------------------
+    # Batch access (VectorNetwork)
+    # ------------------------------------------------------------------
+    def update_many(self, rows: np.ndarray, slots: np.ndarray, values: np.ndarray) -> None:
+        """Set rows[j][slots[j]] = values[j] for distinct flat rows and refresh their minima."""
+        self.rows[rows, slots] = values
+        q = self.rows[rows]
+        best = q.argmin(axis=1)
+        self.best.reshape(-1)[rows] = best
+        self.min.reshape(-1)[rows] = q[np.arange(len(rows)), best]
+
+    # ------------------------------------------------------------------
+    # Topology changes
+    # ------------------------------------------------------------------
+    def add_neighbor(self, i: int, neighbor_id: int, values: np.ndarray) -> None:
+        """Give node i a last slot for `neighbor_id`, with Q-values `values` (one per destination)."""
+        k = int(self.deg[i])
+        if k == self.q.shape[2]:
+            # Widen every row by one +inf padding slot
+            self.q = np.concatenate([self.q, np.full(self.q.shape[:2] + (1,), np.inf)], axis=2)
+            self.nbr = np.concatenate([self.nbr, np.zeros((len(self.nbr), 1), dtype=np.int64)], axis=1)
+            self.valid = np.concatenate([self.valid, np.zeros((len(self.valid), 1), dtype=bool)], axis=1)
+            self._views()
+        self.nbr[i, k] = self.index[neighbor_id]
+        self.valid[i, k] = True
+        self.deg[i] = k + 1
+        self.slots[i][neighbor_id] = k
+        self.q[i, :, k] = values
+        self._refresh_node(i)
+
+    def remove_neighbor(self, i: int, neighbor_id: int) -> None:
+        """Drop node i's slot for `neighbor_id`; later slots move down one."""
+        k = self.slots[i].pop(neighbor_id)
+        deg = int(self.deg[i])
+        self.q[i, :, k:deg - 1] = self.q[i, :, k + 1:deg]
+        self.q[i, :, deg - 1] = np.inf
+        self.nbr[i, k:deg - 1] = self.nbr[i, k + 1:deg]
+        self.valid[i, deg - 1] = False
+        self.deg[i] = deg - 1
+        for nid, slot in self.slots[i].items():
+            if slot > k:
+                self.slots[i][nid] = slot - 1
+        self._refresh_node(i)
+
+    def _refresh_node(self, i: int) -> None:
+        best = self.q[i].argmin(axis=1)
+        self.best[i] = best
+        self.min[i] = self.q[i, np.arange(self.q.shape[1]), best]
+
+    def snapshot(self) -> np.ndarray:
+        return self.q.copy()
+
+    def restore(self, q: np.ndarray) -> None:
+        """
+        Load a snapshot taken from a table with the same layout (a
+        single replica's snapshot is loaded into every replica).
+        """
+        self.q.reshape((-1,) + q.shape)[...] = q
+        self._refresh()
+
+    def _refresh(self) -> None:
+        self.best[...] = self.q.argmin(axis=2)
+        self.min[...] = np.take_along_axis(self.q, self.best[..., None], axis=2)[..., 0]
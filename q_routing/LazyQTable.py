@@ -0,0 +1,167 @@
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from CSRGraph import CSRGraph
+
+
+class LazyQTable(dict):
+    """
+    A QNode's dst -> {neighbor: Q} table whose rows are created on first
+    access, filled from the allocator's prior.
+    """
+
+    def __init__(self, tables: "LazyQTables", node_id: int, neighbors: List[int]):
+        super().__init__()
+        self.tables = tables
+        self.node_id = node_id
+        self.neighbors = neighbors
+        self.on_evict = None
+
+    def __missing__(self, dst):
+        row = self.tables.prior_row(dst, self.neighbors, self.node_id)
+        self[dst] = row
+        return row
+
+
+class LRUQTable(LazyQTable):
+    """
+    `LazyQTable` holding at most `max_rows` rows; touching a row marks
+    it recently used and the least recently used row is dropped (and
+    `on_evict(dst)` called) to make room.  A dropped row starts again
+    from the prior when next used.
+    """
+
+    def __init__(self, tables: "LazyQTables", node_id: int, neighbors: List[int],
+                 max_rows: int):
+        super().__init__(tables, node_id, neighbors)
+        self.max_rows = max_rows
+        self._order: "OrderedDict[int, None]" = OrderedDict()
+
+    def __getitem__(self, dst):
+        row = super().__getitem__(dst)
+        self._order.move_to_end(dst)
+        return row
+
+    def __missing__(self, dst):
+        if len(self) >= self.max_rows:
+            cold, _ = self._order.popitem(last=False)
+            del self[cold]
+            if self.on_evict is not None:
+                self.on_evict(cold)
+        self._order[dst] = None
+        return super().__missing__(dst)
+
+
+class LazyQTables:
+    """
+    Allocator for lazily built per-node Q tables, plugged into `Network`
+    as `q_tables` (built as `q_tables(csr)`; bind options with
+    `functools.partial(LazyQTables, prior="hops", max_rows=256)`).
+
+    Memory is proportional to the destinations each node actually routes
+    towards instead of N² · degree over the network, and there is no
+    O(N²) start-up.
+
+    prior    : "zero" — every new row is 0.0 (what the eager tables hold)
+               "hops" — Q(dst, nbr) = 1 + hop distance from nbr to dst,
+               the delivery time over empty queues; costs one BFS per
+               destination, with the last `cache_size` results kept
+    max_rows : per-node row limit with LRU eviction (None: unbounded)
+
+    Setting `initial` to a Q snapshot (see `q_routing.warm_start`)
+    replaces the prior: new rows are read from it.
+    """
+
+    def __init__(self, csr: CSRGraph, prior: str = "zero",
+                 max_rows: Optional[int] = None, cache_size: int = 1024):
+        if prior not in ("zero", "hops"):
+            raise ValueError(f"unknown Q prior {prior!r} (expected 'zero' or 'hops')")
+        self.csr = csr
+        self.prior = prior
+        self.max_rows = max_rows
+        self.cache_size = cache_size
+        # dst -> hop distance of every node to dst, shared by all nodes
+        self._hops: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        # Reversed arcs, so one BFS from dst gives distances *to* dst
+        # (built on first use)
+        self._reverse = None
+        self.initial: Optional[np.ndarray] = None
+
+    def table(self, node_id: int, neighbors: List[int]) -> LazyQTable:
+        if self.max_rows is None:
+            return LazyQTable(self, node_id, neighbors)
+        return LRUQTable(self, node_id, neighbors, self.max_rows)
+
+    def prior_row(self, dst: int, neighbors: List[int],
+                  node_id: Optional[int] = None) -> Dict[int, float]:
+        index = self.csr.index
+        if self.initial is not None:
+            return dict(zip(neighbors,
+                            self.initial[index[node_id], index[dst], :len(neighbors)].tolist()))
+        if self.prior == "zero":
+            return dict.fromkeys(neighbors, 0.0)
+        hops = self.hops_to(dst)
+        return {nbr: 1.0 + float(hops[index[nbr]]) for nbr in neighbors}
+
+    def topology_changed(self) -> None:
+        """
+        Forget what depends on the adjacency (called after `csr` gained or
+        lost an arc): cached hop distances, and an `initial` snapshot,
+        whose slots no longer line up with the neighbour lists.
+        """
+        self._hops.clear()
+        self._reverse = None
+        self.initial = None
+
+    def hops_to(self, dst: int) -> np.ndarray:
+        """Hop distance from every node to `dst` (inf if unreachable), cached."""
+        hops = self._hops.get(dst)
+        if hops is not None:
+            self._hops.move_to_end(dst)
+            return hops
+
+        if self._reverse is None:
+            self._reverse = self._reverse_graph()
+        if isinstance(self._reverse, tuple):
+            hops = self._bfs(*self._reverse, self.csr.index[dst])
+        else:
+            hops = self._scipy_bfs(self._reverse, indices=self.csr.index[dst],
+                                   unweighted=True).astype(np.float32)
+
+        self._hops[dst] = hops
+        if len(self._hops) > self.cache_size:
+            self._hops.popitem(last=False)
+        return hops
+
+    def _reverse_graph(self):
+        """Transposed adjacency: a SciPy matrix if available, else CSR lists."""
+        src, dst = self.csr.edges()
+        try:  # SciPy is optional (and slow to import), so only load it here
+            from scipy.sparse import csr_matrix
+            from scipy.sparse.csgraph import shortest_path
+        except ImportError:
+            order = np.argsort(dst, kind="stable")
+            indptr = np.zeros(self.csr.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(dst, minlength=self.csr.num_nodes), out=indptr[1:])
+            return indptr.tolist(), src[order].tolist()
+        self._scipy_bfs = shortest_path
+        n = self.csr.num_nodes
+        return csr_matrix((np.ones(len(src)), (dst, src)), shape=(n, n))
+
+    @staticmethod
+    def _bfs(indptr: List[int], indices: List[int], s: int) -> np.ndarray:
+        row = [-1] * (len(indptr) - 1)
+        row[s] = 0
+        frontier = deque([s])
+        while frontier:
+            u = frontier.popleft()
+            for a in range(indptr[u], indptr[u + 1]):
+                v = indices[a]
+                if row[v] < 0:
+                    row[v] = row[u] + 1
+                    frontier.append(v)
+        hops = np.array(row, dtype=np.float32)
+        hops[hops < 0] = np.inf
+        return hops
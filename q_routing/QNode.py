@@ -7,45 +7,120 @@ class QNode:
         self.queue = deque()
         self.network = network
         self.alpha = 0.5
-        self.q_table = {
-            dst: {neighbor: 0.0 for neighbor in self.neighbors}
-            for dst in self.network.graph
-            if dst != self.id
-        }
+        # Bounded queues with backpressure: extra Q cost of a full next hop
+        policy = getattr(network, "queue_policy", None)
+        self.backpressure = policy.backpressure if policy is not None else None
 
-    def receive_packet(self, packet):
-        self.queue.append(packet)
+        # Optional network-wide DenseQTable (Network(..., q_store=DenseQTable));
+        # otherwise every node keeps its own dst -> neighbor -> Q dict,
+        # built up front or row by row (Network(..., q_tables=LazyQTables)).
+        self.q_store = getattr(network, "q_store", None)
+        q_tables = getattr(network, "q_tables", None)
+        if self.q_store is None and q_tables is not None:
+            self.q_table = q_tables.table(node_id, neighbors)
+        elif self.q_store is None:
+            self.q_table = {
+                dst: {neighbor: 0.0 for neighbor in self.neighbors}
+                for dst in self.network.csr.node_ids
+                if dst != self.id
+            }
+        else:
+            self.index = self.q_store.index[node_id]
+            self.slot = self.q_store.slots[self.index]
+
+    def receive_packet(self, pid):
+        self.queue.append(pid)
 
     def process(self):
         if not self.queue:
             return None
 
-        packet = self.queue.popleft()
+        pid = self.queue.popleft()
+        dst = self.network.packets.dst[pid]
 
-        if packet['dst'] == self.id:
-            packet['delivered_at'] = self.network.time
-            self.network.delivered_packets.append(packet)
+        if dst == self.id:
+            self.network.deliver(pid)
             return None
 
-        dst = packet['dst']
         next_hop = self.select_next_hop(dst)
 
         # Q-value update
         queue_delay = len(self.queue)
-        neighbor_estimate = self.network.nodes[next_hop].get_estimate(dst)
-        old_q = self.q_table[dst][next_hop]
-        updated_q = old_q + self.alpha * ((queue_delay + 1 + neighbor_estimate) - old_q)
-        self.q_table[dst][next_hop] = updated_q
+        neighbor = self.network.nodes[next_hop]
+        target = queue_delay + 1 + neighbor.get_estimate(dst)
+        if self.backpressure is not None and self.network.queue_policy.full(neighbor.queue):
+            target += self.backpressure
+        self.update_q(dst, next_hop, target)
+
+        return next_hop, pid
 
-        return next_hop, packet
+    def update_q(self, dst, next_hop, target):
+        """Move Q(dst, next_hop) towards target; returns True if it changed."""
+        if self.q_store is None:
+            old_q = self.q_table[dst][next_hop]
+            updated_q = old_q + self.alpha * (target - old_q)
+            self.q_table[dst][next_hop] = updated_q
+        else:
+            d, k = self.q_store.index[dst], self.slot[next_hop]
+            old_q = self.q_store.qv[self.index, d, k]
+            updated_q = old_q + self.alpha * (target - old_q)
+            self.q_store.update(self.index, d, k, updated_q)
+        return updated_q != old_q
+
+    def q_row(self, dst):
+        """Q-values towards dst as a list aligned with self.neighbors."""
+        if self.q_store is None:
+            return list(self.q_table[dst].values())
+        return self.q_store.row(self.index, self.q_store.index[dst]).tolist()
 
     def select_next_hop(self, dst):
         """Choose neighbor with the lowest estimated Q-value."""
-        q_values = self.q_table.get(dst, {})
+        if self.q_store is not None:
+            return self.neighbors[self.q_store.bestv[self.index, self.q_store.index[dst]]]
+        q_values = self.q_table[dst]
         return min(q_values, key=q_values.get)
 
     def get_estimate(self, dst):
         """Return estimated delivery time to dst from this node."""
         if dst == self.id:
             return 0.0
-        return min(self.q_table.get(dst, {}).values(), default=float('inf'))
+        if self.q_store is not None:
+            return self.q_store.minv[self.index, self.q_store.index[dst]]
+        return min(self.q_table[dst].values(), default=float('inf'))
+
+    # ------------------------------------------------------------------
+    # Topology changes (Network.add_link / remove_link)
+    # ------------------------------------------------------------------
+    def add_neighbor(self, neighbor):
+        """
+        Start forwarding over a new link.  Q towards each destination via
+        `neighbor` starts at one hop plus the neighbour's own estimate,
+        so the link is neither ignored nor flooded before it is learned.
+        """
+        self.neighbors.append(neighbor)
+        other = self.network.nodes[neighbor]
+        if self.q_store is not None:
+            store = self.q_store
+            values = 1.0 + store.min[store.index[neighbor]]
+            values[store.index[neighbor]] = 1.0
+            store.add_neighbor(self.index, neighbor, values)
+            return
+        tables = getattr(self.q_table, "tables", None)
+        for dst, row in dict.items(self.q_table):
+            if dst == neighbor:
+                row[neighbor] = 1.0
+                continue
+            # Read the neighbour's row without building or touching it
+            estimate = dict.get(other.q_table, dst)
+            if estimate is None:
+                estimate = tables.prior_row(dst, other.neighbors, other.id)
+            row[neighbor] = 1.0 + min(estimate.values(), default=float('inf'))
+
+    def remove_neighbor(self, neighbor):
+        """Stop forwarding over a failed link; its Q entries are dropped."""
+        self.neighbors.remove(neighbor)
+        if self.q_store is not None:
+            self.q_store.remove_neighbor(self.index, neighbor)
+            return
+        for row in dict.values(self.q_table):
+            del row[neighbor]
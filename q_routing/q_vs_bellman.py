@@ -1,11 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import random
 
-from Network import Network
 from q_routing.QNode import QNode
 from bellman_ford.BellmanFordNode import BellmanFordNode
 from layout import generate_irregular_grid
+from experiment import run_load_sweep
+from Network import Network
 
 # ----------------------------------------
 # Configuration
@@ -15,73 +15,48 @@ num_steps = 60_000
 discard_steps = 30_000
 
 seeds = [i for i in range(20)]
-
-def run_experiment(NodeClass, load):
-    all_avg_delays = []
-
-    for seed in seeds:
-        random.seed(seed)
-        graph, _ = generate_irregular_grid()
-        net = Network(graph, NodeClass)
-
-        cumulative_delivered = []
-
-        # Run main simulation
-        while net.time < num_steps:
-            net.inject_random_packets(load)
-            net.tick()
-
-            cumulative_delivered.extend(net.delivered_packets)
-            net.delivered_packets.clear()
-
-        delivered = [
-            p for p in cumulative_delivered
-            if p["created_at"] > discard_steps
-        ]
-
-        avg_delay = np.mean([
-                p["delivered_at"] - p["created_at"]
-                for p in delivered
-            ])
-        all_avg_delays.append(avg_delay)
-
-    return np.mean(all_avg_delays) if all_avg_delays else None
-
-
-# ----------------------------------------
-# Run Simulations
-# ----------------------------------------
-q_routing_results = []
-bellman_ford_results = []
-
-for load in load_levels:
-    print(f"\n▶️ Load {load:.2f}")
-
-    q_delay = run_experiment(QNode, load)
-    bf_delay = run_experiment(BellmanFordNode, load)
-
-    q_routing_results.append(q_delay)
-    bellman_ford_results.append(bf_delay)
-
-# ----------------------------------------
-# Plotting
-# ----------------------------------------
-global_min = int(min(min(q_routing_results), min(bellman_ford_results)))
-clip_max = 20
-
-q_plot = np.clip(q_routing_results, global_min, clip_max)
-bf_plot = np.clip(bellman_ford_results, global_min, clip_max)
-
-plt.figure(figsize=(10, 6))
-plt.plot(load_levels, q_plot, label="Q-Routing", linewidth=2)
-plt.plot(load_levels, bf_plot, linestyle='dotted', label="Bellman-Ford", linewidth=2)
-
-plt.xlabel("Network Load")
-plt.ylabel("Average Packet Delivery Time")
-plt.title("Average Delivery Time vs Load")
-plt.ylim(global_min, clip_max)
-plt.xticks(np.arange(0.5, load_levels[-1] + 0.01, 0.5))
-plt.grid(True, linestyle="--", alpha=0.5)
-plt.legend()
-plt.tight_layout()
-plt.show()
+# Shorter Q-Routing warm-up: start from shortest-path Q-values
+# ("shortest_path") or snapshots saved by an earlier sweep with
+# save_q, and/or stop warming up once Q-values settle (converge)
+warm_start = None  # e.g. "snapshots/q-{load:.2f}-{seed}.npz"
+converge = None    # e.g. ConvergenceDetector
+save_q = None      # e.g. "snapshots/q-{load:.2f}-{seed}.npz"
+# BatchNetwork runs the 20 seeds of each (class, load) cell as one
+# batched simulation (array-engine dynamics, see VectorNetwork.py)
+engine = Network   # e.g. BatchNetwork
+
+if __name__ == "__main__":
+    # ----------------------------------------
+    # Run Simulations (one process per (class, load, seed) cell)
+    # ----------------------------------------
+    results = run_load_sweep([QNode, BellmanFordNode], generate_irregular_grid,
+                             load_levels, seeds, num_steps, discard_steps,
+                             engine=engine, warm_start=warm_start, converge=converge, save_q=save_q)
+    q_routing_results = results[QNode]
+    bellman_ford_results = results[BellmanFordNode]
+
+    for load, q_delay, bf_delay in zip(load_levels, q_routing_results, bellman_ford_results):
+        print(f"▶️ Load {load:.2f}: Q-Routing {q_delay:.2f} | Bellman-Ford {bf_delay:.2f}")
+
+    # ----------------------------------------
+    # Plotting
+    # ----------------------------------------
+    global_min = int(min(min(q_routing_results), min(bellman_ford_results)))
+    clip_max = 20
+
+    q_plot = np.clip(q_routing_results, global_min, clip_max)
+    bf_plot = np.clip(bellman_ford_results, global_min, clip_max)
+
+    plt.figure(figsize=(10, 6))
+    plt.plot(load_levels, q_plot, label="Q-Routing", linewidth=2)
+    plt.plot(load_levels, bf_plot, linestyle='dotted', label="Bellman-Ford", linewidth=2)
+
+    plt.xlabel("Network Load")
+    plt.ylabel("Average Packet Delivery Time")
+    plt.title("Average Delivery Time vs Load")
+    plt.ylim(global_min, clip_max)
+    plt.xticks(np.arange(0.5, load_levels[-1] + 0.01, 0.5))
+    plt.grid(True, linestyle="--", alpha=0.5)
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,145 @@
+"""
+Warm starts for Q-learning nodes.
+
+A Q snapshot is one (nodes × destinations × max_degree) array in the
+`DenseQTable` layout: q[i, d, k] is node i's estimate towards d via its
+k-th neighbour, +inf in padding slots.  It can be taken from any engine
+(`q_snapshot`) — per-node dict tables, lazy tables or a `DenseQTable`
+store, including the array engines' — and loaded back into any of them
+(`warm_start`), so a run can start from the converged Q-values of an
+earlier run at the same load and topology, or from shortest-path
+distances (`shortest_path_q`), instead of from zero.
+
+`ConvergenceDetector` ends a warm-up once Q-values stop moving.
+"""
+from typing import Optional
+
+import numpy as np
+
+from CSRGraph import CSRGraph
+from bellman_ford.routing_table import graph_hash, shortest_paths
+
+
+# ----------------------------------------
+# Snapshots
+# ----------------------------------------
+def q_snapshot(net) -> np.ndarray:
+    """Current Q-values of every node of `net` in the DenseQTable layout."""
+    csr = net.csr
+    if getattr(net, "q_store", None) is not None:
+        return net.q_store.snapshot()
+    _, _, valid = csr.padded()
+    n = csr.num_nodes
+    q = np.where(valid[:, None, :], 0.0, np.inf)
+    q = np.ascontiguousarray(np.broadcast_to(q, (n, n, valid.shape[1])))
+    index = csr.index
+    for i, node_id in enumerate(csr.node_ids):
+        node = net.nodes[node_id]
+        table = node.q_table
+        deg = len(node.neighbors)
+        tables = getattr(table, "tables", None)
+        for dst in csr.node_ids:
+            if dst == node_id:
+                continue
+            # Read without touching LRU order; rows not yet built hold the prior
+            row = dict.get(table, dst)
+            if row is None:
+                row = tables.prior_row(dst, node.neighbors, node_id)
+            q[i, index[dst], :deg] = list(row.values())
+    return q
+
+
+def save_q_snapshot(net, path: str) -> None:
+    """Write `q_snapshot(net)` with the graph's hash to an .npz file."""
+    np.savez_compressed(path, q=q_snapshot(net), graph=np.array(graph_hash(net.csr)))
+
+
+def load_q_snapshot(path: str, graph=None) -> np.ndarray:
+    """Read a `save_q_snapshot` file; with `graph`, check it was saved for it."""
+    with np.load(path, allow_pickle=False) as data:
+        if graph is not None and str(data["graph"]) != graph_hash(graph):
+            raise ValueError(f"{path}: Q snapshot was saved for a different graph")
+        return data["q"]
+
+
+def shortest_path_q(graph) -> np.ndarray:
+    """
+    Q-values of an empty network: q[i, d, k] = w(i, k-th neighbour) +
+    shortest-path distance from that neighbour to d, with distances
+    from `bellman_ford.routing_table`.  On unit-weight graphs this is
+    the delivery time QNode's updates converge to at low load.
+    """
+    csr = CSRGraph.from_dict(graph)
+    _, dist, _ = shortest_paths(csr)
+    nbr, wts, valid = csr.padded()
+    # (i, k, d) -> (i, d, k)
+    q = wts[:, :, None] + dist[nbr]
+    q[~valid] = np.inf
+    return np.ascontiguousarray(q.transpose(0, 2, 1))
+
+
+# ----------------------------------------
+# Loading into nodes
+# ----------------------------------------
+def warm_start(net, q: np.ndarray) -> None:
+    """
+    Set every node's Q-values from the snapshot `q`.
+
+    Lazy tables (`LazyQTables`) take `q` as their prior: rows already
+    built are overwritten, later rows (and rows rebuilt after an LRU
+    eviction) start from it.
+    """
+    csr = net.csr
+    _, _, valid = csr.padded()
+    if q.shape != valid.shape[:1] + (csr.num_nodes,) + valid.shape[1:]:
+        raise ValueError(f"Q snapshot of shape {q.shape} does not fit this network")
+
+    if getattr(net, "q_store", None) is not None:
+        net.q_store.restore(q)
+        return
+
+    q_tables = getattr(net, "q_tables", None)
+    if q_tables is not None:
+        q_tables.initial = q
+    index = csr.index
+    for i, node_id in enumerate(csr.node_ids):
+        node = net.nodes[node_id]
+        deg = len(node.neighbors)
+        for dst, row in dict.items(node.q_table):
+            row.update(zip(node.neighbors, q[i, index[dst], :deg].tolist()))
+        if hasattr(node, "_weights"):
+            node._weights.clear()
+
+
+# ----------------------------------------
+# Convergence
+# ----------------------------------------
+class ConvergenceDetector:
+    """
+    Decides when Q-values have stopped moving.
+
+    `check(net)` is meant to be called every `interval` ticks.  It
+    compares the Q snapshot with the previous one: the change is the
+    mean |ΔQ| over finite entries relative to their mean |Q|.  Q-values
+    keep fluctuating with the traffic, so "converged" means the change
+    stayed below `tol` for `patience` checks in a row.
+    """
+
+    def __init__(self, interval: int = 1_000, tol: float = 0.01, patience: int = 3):
+        self.interval = interval
+        self.tol      = tol
+        self.patience = patience
+        self.change: Optional[float] = None
+        self._last: Optional[np.ndarray] = None
+        self._calm = 0
+
+    def check(self, net) -> bool:
+        q = q_snapshot(net)
+        if self._last is not None:
+            finite = np.isfinite(q) & np.isfinite(self._last)
+            scale = np.abs(q[finite]).mean() if finite.any() else 0.0
+            delta = np.abs(q[finite] - self._last[finite]).mean() if finite.any() else 0.0
+            self.change = float(delta / scale) if scale > 0 else float(delta > 0)
+            self._calm = self._calm + 1 if self.change < self.tol else 0
+        self._last = q
+        return self._calm >= self.patience
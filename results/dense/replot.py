@@ -1,19 +1,42 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from ResultsStore import ResultsStore
+from bellman_ford.routing_table import graph_hash
+from dense_layout import generate_dense_irregular_grid
+
 # ----------------------------------------
 # Load Data
 # ----------------------------------------
-q_data = np.load("results/dense/q_routing_results.npz")
-sqrwalt_data = np.load("results/dense/sqrwalt_results.npz")
+# Runs appended by the test scripts, averaged over seeds per time point;
+# configurations with no stored runs fall back to the legacy .npz dumps
+store = ResultsStore("results/store")
+topology = graph_hash(generate_dense_irregular_grid()[0])
+schedule = [[300_000, 5.5], [1_000_000, 6.75], [300_000, 5.5]]
+# As in q_routing/test.py and stochastic_q_routing/sqrwalt-test.py
+record_intervals = {"QNode": 10_000, "SQRWALT": 50_000}
 
-q_time = q_data["time"]
-q_avg = q_data["avg"]
-q_std = q_data["std"]
+def latest_runs(algorithm):
+    # Plain Network runs of this schedule only (no trace replay, unbounded
+    # queues), and only the newest run of each seed
+    return store.latest_runs(algorithm=algorithm, topology=topology, phases=schedule,
+                             engine="Network", record_interval=record_intervals[algorithm],
+                             trace=None, queue_policy=None)
 
-sqrwalt_time = sqrwalt_data["time"]  
-sqrwalt_avg = sqrwalt_data["avg"] 
-sqrwalt_std = sqrwalt_data["std"] 
+def load_results(algorithm, legacy_path):
+    time, avg, std = store.curve("mean", run=latest_runs(algorithm))
+    if len(time):
+        return time, avg, std
+    data = np.load(legacy_path)
+    return data["time"], data["avg"], data["std"]
+
+q_time, q_avg, q_std = load_results("QNode", "results/dense/q_routing_results.npz")
+sqrwalt_time, sqrwalt_avg, sqrwalt_std = load_results("SQRWALT", "results/dense/sqrwalt_results.npz")
 
 # ----------------------------------------
 # Plotting
@@ -74,5 +97,18 @@ def print_stats(name, time_array, avg_array):
         else:
             print(f"  {label:<15} → No data")
 
+def print_tail(name, algorithm):
+    tail = store.percentile_curve(run=latest_runs(algorithm))
+    if not len(tail["time"]):
+        return
+    print(f"\n📊 {name} tail delay (pooled over seeds)")
+    for label, start, end in phases:
+        mask = (tail["time"] > start + 100_000) & (tail["time"] <= end)
+        if mask.any():
+            print(f"  {label:<15} → p50: {np.mean(tail['p50'][mask]):.0f}, "
+                  f"p95: {np.mean(tail['p95'][mask]):.0f}, p99: {np.mean(tail['p99'][mask]):.0f}")
+
 print_stats("Q-Routing", q_time, q_avg)
-print_stats("SQRWALT", sqrwalt_time, sqrwalt_avg) 
\ No newline at end of file
+print_stats("SQRWALT", sqrwalt_time, sqrwalt_avg) 
+print_tail("Q-Routing", "QNode")
+print_tail("SQRWALT", "SQRWALT")
@@ -0,0 +1,76 @@
+from collections import deque
+
+import numpy as np
+
+
+class QueueTrend:
+    """
+    Mean and least-squares slope of the last `window` queue-length
+    samples, updated in O(1) per sample.
+
+    Keeps running sums Σq and Σt·q, where t is a sample's position in the
+    window (0 = oldest).  When the window is full and a sample falls out,
+    every remaining t drops by one, so Σt·q loses Σq (minus the dropped
+    sample) — no rescan needed.  Queue lengths are integers, so the sums
+    are exact and never drift.
+    """
+
+    def __init__(self, window=32):
+        self.window = window
+        self.history = deque(maxlen=window)
+        self.sum_q = 0
+        self.sum_tq = 0
+
+    def push(self, q):
+        n = len(self.history)
+        if n == self.window:
+            oldest = self.history[0]
+            self.sum_tq += (n - 1) * q - (self.sum_q - oldest)
+            self.sum_q += q - oldest
+        else:
+            self.sum_tq += n * q
+            self.sum_q += q
+        self.history.append(q)
+
+    def mean(self):
+        return self.sum_q / len(self.history)
+
+    def slope(self):
+        n = len(self.history)
+        if n < 2:
+            return 0.0
+        # Σ(t - t̄)(q - q̄) = Σt·q - t̄·Σq  and  Σ(t - t̄)² = n(n² - 1)/12
+        return (self.sum_tq - (n - 1) / 2 * self.sum_q) / (n * (n * n - 1) / 12)
+
+
+class QueueTrendArray:
+    """`QueueTrend` for every node at once: one sample vector per push."""
+
+    def __init__(self, num_nodes, window=32):
+        self.window = window
+        self.n = 0
+        self._ring = np.zeros((num_nodes, window), dtype=np.int64)
+        self._pos = 0
+        self.sum_q = np.zeros(num_nodes, dtype=np.int64)
+        self.sum_tq = np.zeros(num_nodes, dtype=np.int64)
+
+    def push(self, q):
+        if self.n == self.window:
+            oldest = self._ring[:, self._pos]
+            self.sum_tq += (self.n - 1) * q - (self.sum_q - oldest)
+            self.sum_q += q - oldest
+        else:
+            self.sum_tq += self.n * q
+            self.sum_q += q
+            self.n += 1
+        self._ring[:, self._pos] = q
+        self._pos = (self._pos + 1) % self.window
+
+    def mean(self):
+        return self.sum_q / self.n
+
+    def slope(self):
+        n = self.n
+        if n < 2:
+            return np.zeros(len(self.sum_q))
+        return (self.sum_tq - (n - 1) / 2 * self.sum_q) / (n * (n * n - 1) / 12)
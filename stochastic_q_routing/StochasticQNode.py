@@ -1,32 +1,46 @@
 import random
-import math
 from q_routing.QNode import QNode
+from stochastic_q_routing.boltzmann import cumulative_weights, sample
 
 class StochasticQNode(QNode):
-    def select_next_hop(self, dst):
-        """Stochastically choose neighbor based on Q-values — lower values are better."""
-        q_values = self.q_table.get(dst, {})
+    temperature = 0.001
 
-        if not q_values:
-            return random.choice(self.neighbors)
+    def __init__(self, node_id, neighbors, network):
+        super().__init__(node_id, neighbors, network)
+        # dst -> (temperature, cumulative Boltzmann weights), reused until
+        # the Q row or the temperature changes
+        self._weights = {}
+        table = getattr(self, "q_table", None)
+        if hasattr(table, "on_evict"):
+            # LRU Q tables: an evicted row restarts from the prior
+            table.on_evict = self._drop_weights
 
-        # Convert Q-values into probabilities
-        # Lower Q => higher probability, using softmax with negative Qs
-        temperature = 0.001
+    def _drop_weights(self, dst):
+        self._weights.pop(dst, None)
 
-        # Avoid overflow by shifting values before exponentiating
-        min_q = min(q_values.values())
-        shifted_qs = {n: -(q - min_q) for n, q in q_values.items()} 
+    def update_q(self, dst, next_hop, target):
+        changed = super().update_q(dst, next_hop, target)
+        if changed:
+            self._drop_weights(dst)
+        return changed
 
-        exp_values = {
-            neighbor: math.exp(shifted_q / temperature)
-            for neighbor, shifted_q in shifted_qs.items()
-        }
+    def add_neighbor(self, neighbor):
+        super().add_neighbor(neighbor)
+        self._weights.clear()
 
-        total = sum(exp_values.values())
-        probabilities = {n: v / total for n, v in exp_values.items()}
+    def remove_neighbor(self, neighbor):
+        super().remove_neighbor(neighbor)
+        self._weights.clear()
 
-        # Sample based on computed probabilities
-        neighbors = list(probabilities.keys())
-        weights = list(probabilities.values())
-        return random.choices(neighbors, weights=weights, k=1)[0]
+    def select_next_hop(self, dst):
+        """Stochastically choose neighbor based on Q-values — lower values are better."""
+        # Softmax over negative Qs (lower Q => higher probability), sampled
+        # with a single uniform draw against the cumulative weights
+        cached = self._weights.get(dst)
+        if cached is None or cached[0] != self.temperature:
+            q_row = self.q_row(dst)
+            if not q_row:
+                return random.choice(self.neighbors)
+            cached = (self.temperature, cumulative_weights(q_row, self.temperature))
+            self._weights[dst] = cached
+        return self.neighbors[sample(cached[1], random.random())]
@@ -0,0 +1,38 @@
+import math
+from bisect import bisect_right
+from itertools import accumulate
+
+import numpy as np
+
+
+def cumulative_weights(q_row, temperature):
+    """
+    Running sum of the Boltzmann weights exp(-(q - min_q) / T) over a Q
+    row (lower Q => more likely).  The weights are left unnormalised;
+    `sample` scales its uniform draw by the total instead.
+    """
+    min_q = min(q_row)
+    return list(accumulate(math.exp((min_q - q) / temperature) for q in q_row))
+
+
+def sample(cum, u):
+    """
+    Index drawn from cumulative weights `cum` with one uniform `u` in
+    [0, 1) — the same draw `random.choices` makes.
+    """
+    return bisect_right(cum, u * cum[-1], 0, len(cum) - 1)
+
+
+def sample_batch(q_rows, temperatures, u, deg):
+    """
+    Vectorised `sample(cumulative_weights(row, T), u)` for a whole tick.
+
+    q_rows       : (k, max_degree) Q rows, +inf in padding slots
+    temperatures : (k,) per-row temperature
+    u            : (k,) uniforms in [0, 1)
+    deg          : (k,) number of valid slots per row
+    """
+    min_q = np.minimum.reduce(q_rows, axis=1)
+    cum = np.cumsum(np.exp((min_q[:, None] - q_rows) / temperatures[:, None]), axis=1)
+    slot = np.add.reduce(cum <= (u * cum[:, -1])[:, None], axis=1)
+    return np.minimum(slot, deg - 1)
@@ -1,4 +1,5 @@
 from Network import Network
+from DeliveryStats import DeliveryStats
 from StochasticQNode import StochasticQNode
 from layout  import generate_irregular_grid
 import matplotlib.pyplot as plt
@@ -7,7 +8,8 @@ import matplotlib.pyplot as plt
 # Set‑up
 # ------------------------------------------------------------------
 graph, _ = generate_irregular_grid()
-net = Network(graph, StochasticQNode)
+net = Network(graph, StochasticQNode, keep_delivered=False,
+              metrics=DeliveryStats())
 
 # traffic pattern: (steps, load)
 phases = [
@@ -18,7 +20,6 @@ phases = [
 record_interval = 50_000
 
 time_points, avg_delivery_times = [], []
-cumulative_delivered = []
 
 # ------------------------------------------------------------------
 # Simulation
@@ -31,22 +32,15 @@ for idx, (phase_steps, load) in enumerate(phases, start=1):
         net.inject_random_packets(load)
         net.tick()
 
-        cumulative_delivered.extend(net.delivered_packets)
-        net.delivered_packets.clear()
-
         if net.time % record_interval == 0:
-            total = len(cumulative_delivered)
+            total = net.metrics.total
             active = sum(len(node.queue) for node in net.nodes.values())
 
             # Get delivery delay only for packets delivered in this interval
-            delivered_in_interval = [
-                p for p in cumulative_delivered
-                if net.time - record_interval < p["delivered_at"] <= net.time
-            ]
+            stats = net.metrics.interval()
 
-            if delivered_in_interval:
-                avg_time = sum(p["delivered_at"] - p["created_at"]
-                            for p in delivered_in_interval) / len(delivered_in_interval)
+            if stats["count"]:
+                avg_time = stats["mean"]
                 time_points.append(net.time)
                 avg_delivery_times.append(avg_time)
 
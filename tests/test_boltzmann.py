@@ -0,0 +1,50 @@
+"""Cached, single-draw Boltzmann sampling."""
+import math
+import random
+
+import numpy as np
+import pytest
+
+import topology
+from Network import Network
+from stochastic_q_routing.StochasticQNode import StochasticQNode
+from stochastic_q_routing.boltzmann import cumulative_weights, sample, sample_batch
+
+
+@pytest.mark.parametrize("temperature", [0.001, 0.5, 20.0])
+def test_sample_draws_like_random_choices(temperature):
+    rng = random.Random(4)
+    for _ in range(200):
+        q_row = [rng.uniform(0, 30) for _ in range(rng.randint(1, 6))]
+        weights = [math.exp((min(q_row) - q) / temperature) for q in q_row]
+        state = rng.getstate()
+        got = sample(cumulative_weights(q_row, temperature), rng.random())
+        rng.setstate(state)
+        assert got == rng.choices(range(len(q_row)), weights=weights)[0]
+
+
+def test_batch_sampling_matches_scalar_sampling():
+    rng = np.random.default_rng(5)
+    deg = rng.integers(1, 5, 500)
+    q = np.where(np.arange(4)[None, :] < deg[:, None], rng.uniform(0, 10, (500, 4)), np.inf)
+    temperature = rng.choice([0.05, 1.0, 8.0], 500)
+    u = rng.random(500)
+    want = [sample(cumulative_weights(q[j, :deg[j]].tolist(), temperature[j]), u[j])
+            for j in range(500)]
+    np.testing.assert_array_equal(sample_batch(q, temperature, u, deg), want)
+
+
+def test_cached_weights_follow_q_and_temperature():
+    net = Network(topology.grid(3), StochasticQNode)
+    node = net.nodes[4]
+    node.temperature = 1.0
+    node.select_next_hop(0)
+    assert 0 in node._weights
+    for neighbor in node.neighbors:
+        node.q_table[0][neighbor] = 5.0
+    node.update_q(0, node.neighbors[0], 100.0)     # the row changed
+    assert 0 not in node._weights
+
+    random.seed(0)
+    node.temperature = 1e-3                        # a cold node picks the best neighbour
+    assert {node.select_next_hop(0) for _ in range(20)} == set(node.neighbors[1:])
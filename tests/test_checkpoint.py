@@ -0,0 +1,83 @@
+"""Continuing from a checkpoint reproduces the uninterrupted run."""
+import random
+from functools import partial
+
+import pytest
+
+import topology
+from DeliveryStats import DeliveryStats
+from Network import Network
+from QueuePolicy import RED
+from bellman_ford.BellmanFordNode import BellmanFordNode
+from bellman_ford.routing_table import graph_hash
+from q_routing.DenseQTable import DenseQTable
+from q_routing.LazyQTable import LazyQTables
+from q_routing.QNode import QNode
+from stochastic_q_routing.SQRWALT import SQRWALT
+from stochastic_q_routing.StochasticQNode import StochasticQNode
+
+CASES = {
+    "QNode":           (QNode, {}),
+    "QNode-dense":     (QNode, {"q_store": DenseQTable}),
+    "QNode-lazy":      (QNode, {"q_tables": partial(LazyQTables, prior="hops")}),
+    "StochasticQNode": (StochasticQNode, {}),
+    "SQRWALT":         (SQRWALT, {}),
+    "BellmanFordNode": (BellmanFordNode, {}),
+    "QNode-RED":       (QNode, {"queue_policy": partial(RED, capacity=4, seed=1)}),
+}
+
+
+def _step(net, ticks, load=2.0):
+    for _ in range(ticks):
+        net.inject_random_packets(load)
+        net.tick()
+        if net.time % 10 == 0:
+            for node in net.nodes.values():
+                if hasattr(node, "tick_update"):
+                    node.tick_update()
+
+
+def _state(net):
+    return (net.time, net.metrics.count, net.metrics.mean, net.dropped, graph_hash(net.csr),
+            [list(node.neighbors) for node in net.nodes.values()],
+            [(p["src"], p["dst"], p["created_at"], p["delivered_at"])
+             for p in net.delivered_packets])
+
+
+@pytest.mark.parametrize("link_events", [False, True], ids=["static", "link-events"])
+@pytest.mark.parametrize("case", list(CASES))
+def test_round_trip(tmp_path, case, link_events):
+    node_cls, options = CASES[case]
+    graph = topology.grid(5)
+    original = graph_hash(graph)
+
+    def build():
+        return Network(graph, node_cls, metrics=DeliveryStats(), **options)
+
+    random.seed(3)
+    net = build()
+    _step(net, 300)
+    if link_events:
+        net.remove_link(0, 1)
+        _step(net, 200)
+        net.add_link(0, 1)
+        net.remove_link(6, 7)
+        net.set_weight(2, 3, 2.0)
+    _step(net, 100)
+    path = str(tmp_path / "checkpoint.npz")
+    net.save_checkpoint(path)
+    _step(net, 500)
+
+    restored = build()
+    restored.load_checkpoint(path)
+    _step(restored, 500)
+    assert _state(restored) == _state(net)
+    # The link events changed the networks' own copies only
+    assert graph_hash(graph) == original
+
+
+def test_rejects_other_graph(tmp_path):
+    path = str(tmp_path / "checkpoint.npz")
+    Network(topology.grid(5), QNode).save_checkpoint(path)
+    with pytest.raises(ValueError, match="different graph"):
+        Network(topology.grid(6), QNode).load_checkpoint(path)
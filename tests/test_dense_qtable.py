@@ -0,0 +1,57 @@
+"""Dense Q storage against the per-node dict tables."""
+import random
+
+import numpy as np
+
+import topology
+from Network import Network
+from dense_layout import generate_dense_irregular_grid
+from q_routing.DenseQTable import DenseQTable
+from q_routing.QNode import QNode
+from stochastic_q_routing.StochasticQNode import StochasticQNode
+
+
+def _run(q_store, node_cls=QNode, ticks=800):
+    random.seed(2)
+    net = Network(generate_dense_irregular_grid()[0], node_cls, q_store=q_store)
+    for _ in range(ticks):
+        net.inject_random_packets(4.0)
+        net.tick()
+    return net
+
+
+def test_dense_runs_match_dict_runs():
+    for node_cls in (QNode, StochasticQNode):
+        plain, dense = _run(None, node_cls), _run(DenseQTable, node_cls)
+        assert dense.delivered_packets == plain.delivered_packets
+        store = dense.q_store
+        for nid, node in plain.nodes.items():
+            i = store.index[nid]
+            for dst, row in node.q_table.items():
+                d = store.index[dst]
+                assert store.row(i, d).tolist() == [row[v] for v in node.neighbors]
+
+
+def test_cached_minimum_follows_updates():
+    store = DenseQTable(topology.grid(4))
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        i = int(rng.integers(16))
+        store.update(i, int(rng.integers(16)), int(rng.integers(store.deg[i])),
+                     float(rng.integers(0, 5)))
+    np.testing.assert_array_equal(store.best, store.q.argmin(axis=2))
+    np.testing.assert_array_equal(store.min, store.q.min(axis=2))
+
+    rows = rng.choice(16 * 16, 50, replace=False)
+    slots = np.zeros(50, dtype=np.int64)
+    store.update_many(rows, slots, rng.random(50))
+    np.testing.assert_array_equal(store.best, store.q.argmin(axis=2))
+    np.testing.assert_array_equal(store.min, store.q.min(axis=2))
+
+
+def test_padding_slots_are_never_chosen():
+    store = DenseQTable(topology.grid(3))
+    corner = store.index[0]
+    assert store.deg[corner] == 2 and np.isinf(store.q[corner, :, 2:]).all()
+    store.restore(store.snapshot() + 1.0)
+    assert (store.best[corner] < 2).all()
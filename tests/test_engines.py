@@ -0,0 +1,176 @@
+"""Engines that promise identical runs to another engine."""
+import random
+from functools import partial
+
+import numpy as np
+import pytest
+
+import VectorNetwork as vector
+import topology
+from BatchNetwork import BatchNetwork
+from CompiledNetwork import CompiledNetwork
+from DeliveryStats import DeliveryStats
+from Network import Network
+from Node import Node
+from PartitionedNetwork import PartitionedNetwork
+from VectorNetwork import VectorNetwork
+from bellman_ford.BellmanFordNode import BellmanFordNode
+from dense_layout import generate_dense_irregular_grid
+from experiment import run_phases, run_phases_batch
+from layout import generate_irregular_grid
+from q_routing.DenseQTable import DenseQTable
+from q_routing.QNode import QNode
+from stochastic_q_routing.SQRWALT import SQRWALT
+from stochastic_q_routing.StochasticQNode import StochasticQNode
+
+ARRAY_CLASSES = [Node, BellmanFordNode, QNode, StochasticQNode, SQRWALT]
+
+
+# ----------------------------------------
+# VectorNetwork.advance == inject / tick / tick_update loop
+# ----------------------------------------
+@pytest.mark.parametrize("node_cls", ARRAY_CLASSES)
+@pytest.mark.parametrize("load", [1.5, 6.75])
+def test_vector_advance_matches_tick_loop(node_cls, load):
+    graph = generate_dense_irregular_grid()[0]
+    stepped = VectorNetwork(graph, node_cls, seed=7)
+    for _ in range(2000):
+        stepped.inject_random_packets(load)
+        stepped.tick()
+        if stepped.time % 10 == 0:
+            stepped.tick_update()
+    advanced = VectorNetwork(graph, node_cls, seed=7, update_interval=10)
+    advanced.advance(777, load)
+    advanced.advance(2000 - 777, load)
+
+    assert advanced.time == stepped.time
+    assert advanced.delivered_count == stepped.delivered_count
+    np.testing.assert_array_equal(advanced.qlen, stepped.qlen)
+    for a, b in zip(advanced.collect_delivered(), stepped.collect_delivered()):
+        np.testing.assert_array_equal(a, b)
+    if stepped.q_store is not None:
+        np.testing.assert_array_equal(advanced.q_store.q, stepped.q_store.q)
+    if node_cls is SQRWALT:
+        np.testing.assert_array_equal(advanced.temperature, stepped.temperature)
+
+
+# ----------------------------------------
+# CompiledNetwork == Network (deterministic policies, same packets)
+# ----------------------------------------
+@pytest.mark.parametrize("node_cls", [BellmanFordNode, QNode])
+def test_compiled_matches_network(node_cls):
+    graph = generate_dense_irregular_grid()[0]
+    net = Network(graph, node_cls, q_store=DenseQTable if node_cls is QNode else None)
+    compiled = CompiledNetwork(graph, node_cls)
+    rng = np.random.default_rng(3)
+    for _ in range(1500):
+        for src, dst in rng.choice(36, size=(rng.poisson(3.0), 2)):
+            if src != dst:
+                net.inject_packet(int(src), int(dst))
+                compiled.inject_packet(int(src), int(dst))
+        net.tick()
+        compiled.tick()
+
+    created, delivered = compiled.collect_delivered()
+    assert sorted(zip(created.tolist(), delivered.tolist())) == sorted(
+        (p["created_at"], p["delivered_at"]) for p in net.delivered_packets)
+    assert compiled.get_active_packets() == net.get_active_packets()
+    if node_cls is QNode:
+        np.testing.assert_array_equal(compiled.q_store.q, net.q_store.q)
+
+
+@pytest.mark.parametrize("node_cls", ARRAY_CLASSES)
+def test_compiled_kernel_matches_plain_python(node_cls, monkeypatch):
+    graph = generate_dense_irregular_grid()[0]
+    runs = []
+    for compiled in (True, False):
+        if not compiled:
+            monkeypatch.setattr(vector, "kernel", lambda: None)
+        net = CompiledNetwork(graph, node_cls, seed=5, update_interval=10)
+        net.advance(400, 4.5)
+        runs.append(net)
+
+    a, b = runs
+    assert a.delivered_count == b.delivered_count
+    np.testing.assert_array_equal(a.qlen, b.qlen)
+    for x, y in zip(a.collect_delivered(), b.collect_delivered()):
+        np.testing.assert_array_equal(x, y)
+    if a.q_store is not None:
+        np.testing.assert_array_equal(a.q_store.q, b.q_store.q)
+    if node_cls is SQRWALT:
+        np.testing.assert_array_equal(a.temperature, b.temperature)
+
+
+# ----------------------------------------
+# BatchNetwork replica r == VectorNetwork(seed=seeds[r])
+# ----------------------------------------
+@pytest.mark.parametrize("node_cls", ARRAY_CLASSES)
+def test_batch_replicas_match_vector(node_cls):
+    graph = generate_dense_irregular_grid()[0]
+    seeds = [3, 4, 5]
+    batch = BatchNetwork(graph, node_cls, seeds, update_interval=10)
+    batch.advance(1200, 4.5)
+    replica, created, delivered = batch.collect_delivered()
+    for r, seed in enumerate(seeds):
+        net = VectorNetwork(graph, node_cls, seed=seed, update_interval=10)
+        net.advance(1200, 4.5)
+        assert batch.get_delivered_packets_count()[r] == net.delivered_count
+        np.testing.assert_array_equal(batch.queue_lengths[r], net.qlen)
+        mine = replica == r
+        c, d = net.collect_delivered()
+        assert sorted(zip(created[mine].tolist(), delivered[mine].tolist())) == sorted(
+            zip(c.tolist(), d.tolist()))
+        if net.q_store is not None:
+            np.testing.assert_array_equal(batch.q[r], net.q_store.q)
+        if node_cls is SQRWALT:
+            np.testing.assert_array_equal(batch.temperatures[r], net.temperature)
+
+
+def test_batched_phases_match_per_seed_runs():
+    phases = [(600, 2.0), (600, 6.0)]
+    batched = run_phases_batch(SQRWALT, generate_dense_irregular_grid, phases, [1, 2],
+                               record_interval=200, update_interval=10)
+    for seed, run in zip([1, 2], batched):
+        alone = run_phases(SQRWALT, generate_dense_irregular_grid, phases, seed,
+                           record_interval=200, update_interval=10, engine=VectorNetwork)
+        for a, b in zip(run, alone):
+            np.testing.assert_array_equal(a, b)
+
+
+# ----------------------------------------
+# PartitionedNetwork == Network
+# ----------------------------------------
+def _delivered(net):
+    return [(p["src"], p["dst"], p["created_at"], p["delivered_at"])
+            for p in net.delivered_packets]
+
+
+@pytest.mark.parametrize("node_cls", [BellmanFordNode, QNode])
+@pytest.mark.parametrize("graph", [topology.grid(8), generate_irregular_grid()[0]],
+                         ids=["grid", "irregular"])
+def test_partitioned_matches_network(node_cls, graph):
+    with PartitionedNetwork(graph, node_cls, workers=2, metrics=DeliveryStats()) as part:
+        # Same node order as the partitioned run
+        net = Network(part.csr, node_cls, metrics=DeliveryStats())
+        random.seed(7)
+        for _ in range(8):
+            part.advance(50, 3.0)
+        random.seed(7)
+        for _ in range(400):
+            net.inject_random_packets(3.0)
+            net.tick()
+
+        assert part.time == net.time
+        assert _delivered(part) == _delivered(net)
+        assert part.get_active_packets() == net.get_active_packets()
+        assert part.metrics.interval() == net.metrics.interval()
+
+
+def test_partitioned_phases_match_network():
+    grid = partial(topology.grid, 8)
+    phases = [(300, 2.0), (300, 5.0)]
+    alone = run_phases(QNode, grid, phases, seed=3, record_interval=100)
+    split = run_phases(QNode, grid, phases, seed=3, record_interval=100,
+                       engine=partial(PartitionedNetwork, workers=2))
+    for a, b in zip(alone, split):
+        np.testing.assert_array_equal(a, b)
@@ -0,0 +1,48 @@
+"""Seed and load sweeps: parallel cells reproduce serial ones."""
+from functools import partial
+
+import numpy as np
+
+import topology
+from QueuePolicy import TailDrop
+from ResultsStore import ResultsStore
+from bellman_ford.BellmanFordNode import BellmanFordNode
+from experiment import run_load_sweep, run_phases, run_seeds, run_steady_state
+from q_routing.QNode import QNode
+
+GRID = partial(topology.grid, 5)
+PHASES = [(400, 2.0), (400, 4.0)]
+
+
+def test_parallel_seeds_match_serial_runs():
+    serial = run_seeds(QNode, GRID, PHASES, range(3), record_interval=200, max_workers=1)
+    parallel = run_seeds(QNode, GRID, PHASES, range(3), record_interval=200, max_workers=2)
+    assert serial.keys() == parallel.keys() == {"time", "avg", "std", "p50", "p95", "p99"}
+    for key in serial:
+        np.testing.assert_array_equal(serial[key], parallel[key])
+
+    delays = [run_phases(QNode, GRID, PHASES, seed, record_interval=200)[1] for seed in range(3)]
+    np.testing.assert_array_equal(serial["avg"], np.mean(delays, axis=0))
+
+
+def test_run_seeds_forwards_every_option(tmp_path):
+    path = str(tmp_path / "store")
+    results = run_seeds(QNode, GRID, PHASES, [4, 5], record_interval=200, update_interval=10,
+                        max_workers=2, queue_policy=partial(TailDrop, capacity=2), store=path)
+    assert "loss" in results and results["loss"].max() > 0
+    runs = ResultsStore(path).runs()
+    assert sorted(run["seed"] for run in runs) == [4, 5]
+    assert all(run["queue_policy"] and run["update_interval"] == 10 for run in runs)
+
+
+def test_load_sweep_matches_single_cells():
+    loads = [1.0, 3.0]
+    kwargs = dict(num_steps=600, discard_steps=300)
+    serial = run_load_sweep([BellmanFordNode, QNode], GRID, loads, [0, 1], max_workers=1, **kwargs)
+    parallel = run_load_sweep([BellmanFordNode, QNode], GRID, loads, [0, 1], max_workers=2,
+                              **kwargs)
+    for cls in (BellmanFordNode, QNode):
+        np.testing.assert_array_equal(serial[cls], parallel[cls])
+        cells = [[run_steady_state(cls, GRID, load, seed, **kwargs) for seed in (0, 1)]
+                 for load in loads]
+        np.testing.assert_array_equal(serial[cls], np.mean(cells, axis=1))
@@ -0,0 +1,165 @@
+"""Streaming delivery statistics against statistics of the full delay list."""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from DelayHistogram import DelayHistogram
+from DeliveryStats import DeliveryStats
+from Network import Network
+from layout import generate_irregular_grid
+from q_routing.QNode import QNode
+
+
+def _delays(seed, count=2000):
+    rng = np.random.default_rng(seed)
+    created = rng.integers(0, 10_000, count)
+    return created, created + rng.geometric(0.05, count)
+
+
+def _nearest_rank(delays, q):
+    ordered = np.sort(delays)
+    return float(ordered[max(1, math.ceil(q / 100 * len(ordered))) - 1])
+
+
+def test_record_matches_batch_statistics():
+    created, delivered = _delays(1)
+    delays = delivered - created
+    stats = DeliveryStats()
+    for c, d in zip(created.tolist(), delivered.tolist()):
+        stats.record(0, 1, c, d)
+    window = stats.interval()
+
+    assert window["count"] == len(delays)
+    assert window["mean"] == pytest.approx(delays.mean())
+    assert window["var"] == pytest.approx(delays.var())
+    for q in (50, 95, 99):
+        assert window[f"p{q}"] == _nearest_rank(delays, q)
+    assert stats.total == len(delays)
+    assert stats.total_mean == pytest.approx(delays.mean())
+
+
+def test_record_many_matches_record():
+    created, delivered = _delays(2)
+    one, many = DeliveryStats(created_after=5000), DeliveryStats(created_after=5000)
+    for c, d in zip(created.tolist(), delivered.tolist()):
+        one.record(0, 1, c, d)
+    zeros = np.zeros(len(created), dtype=np.int64)
+    for part in np.array_split(np.arange(len(created)), 7):
+        many.record_many(zeros[part], zeros[part], created[part], delivered[part])
+
+    a, b = one.interval(), many.interval()
+    assert a["count"] == b["count"] == np.count_nonzero(created > 5000)
+    for key in a:
+        assert b[key] == pytest.approx(a[key])
+    assert many.total_mean == pytest.approx(one.total_mean)
+
+
+def test_interval_starts_a_new_window():
+    stats = DeliveryStats()
+    stats.record(0, 1, 0, 4)
+    stats.record(0, 1, 0, 6)
+    assert stats.interval()["mean"] == 5.0
+    stats.record(0, 1, 10, 11)
+    window = stats.interval()
+    assert (window["count"], window["mean"], window["p50"]) == (1, 1.0, 1.0)
+    assert (stats.total, stats.total_mean) == (3, pytest.approx(11 / 3))
+    empty = stats.interval()
+    assert empty["count"] == 0 and math.isnan(empty["mean"])
+
+
+def test_network_sink_sees_every_delivery():
+    random.seed(4)
+    graph, _ = generate_irregular_grid()
+    net = Network(graph, QNode, metrics=DeliveryStats())
+    for _ in range(1500):
+        net.inject_random_packets(2.0)
+        net.tick()
+
+    delays = np.array([p["delivered_at"] - p["created_at"] for p in net.delivered_packets])
+    window = net.metrics.interval()
+    assert window["count"] == len(delays) > 0
+    assert window["mean"] == pytest.approx(delays.mean())
+    # Exact below 2**sub_bits ticks, within a bucket above
+    assert _nearest_rank(delays, 95) * (1 - 2 ** -6) <= window["p95"] <= _nearest_rank(delays, 95)
+
+
+# ----------------------------------------
+# Log-linear histograms
+# ----------------------------------------
+def test_buckets_are_exact_then_log_linear():
+    hist = DelayHistogram(sub_bits=5, max_bits=30)
+    delays = np.unique(np.concatenate([np.arange(200), np.geomspace(200, 2**30 - 1, 500)
+                                       .astype(np.int64)]))
+    buckets = hist.buckets_of(delays)
+    assert buckets.tolist() == [hist.bucket_of(d) for d in delays.tolist()]
+    assert (np.diff(buckets) >= 0).all()
+    low = hist.bucket_value(buckets)
+    np.testing.assert_array_equal(low[delays < 32], delays[delays < 32])
+    assert (low <= delays).all()
+    assert ((delays - low) / np.maximum(delays, 1) < 2 ** (1 - 5)).all()
+    assert buckets[-1] == len(hist.counts) - 1
+
+
+def test_histogram_percentiles_are_within_bucket_precision():
+    delays = np.random.default_rng(3).lognormal(6, 2, 50_000).astype(np.int64)
+    hist = DelayHistogram()
+    hist.record_many(delays)
+    for q in (1, 50, 90, 99, 99.9, 100):
+        exact = _nearest_rank(delays, q)
+        assert exact * (1 - 2 ** -6) <= hist.percentile(q) <= exact
+
+
+def test_histogram_clamps_delays_beyond_max_bits():
+    hist = DelayHistogram(sub_bits=3, max_bits=8)
+    hist.record(10_000)
+    hist.record_many(np.array([300, 255]))
+    assert hist.counts[-1] == 3
+
+
+def test_histograms_merge_by_adding_counts():
+    rng = np.random.default_rng(4)
+    a, b, both = DelayHistogram(), DelayHistogram(), DelayHistogram()
+    x, y = rng.integers(0, 10**6, 1000), rng.integers(0, 10**3, 1000)
+    a.record_many(x)
+    b.record_many(y)
+    both.record_many(np.concatenate([x, y]))
+    a.merge(b)
+    np.testing.assert_array_equal(a.counts, both.counts)
+    stacked = DelayHistogram.from_counts(np.stack([b.counts, b.counts]))
+    assert stacked.total == 2 * b.total
+    with pytest.raises(ValueError):
+        a.merge(DelayHistogram(sub_bits=4))
+
+
+def test_total_percentiles_span_every_window():
+    created, delivered = _delays(5)
+    delays = delivered - created
+    stats = DeliveryStats()
+    for part in np.array_split(np.arange(len(delays)), 4):
+        zeros = np.zeros(len(part), dtype=np.int64)
+        stats.record_many(zeros, zeros, created[part], delivered[part])
+        window = stats.interval()
+        assert stats.last_hist.sum() == window["count"] == len(part)
+    stats.record(0, 0, 0, 3)
+    everything = np.append(delays, 3)
+    for q in (50, 95, 99):
+        assert stats.total_percentile(q) == _nearest_rank(everything, q)
+
+
+def test_per_pair_histograms():
+    rng = np.random.default_rng(6)
+    src, dst = rng.integers(0, 4, 3000), rng.integers(0, 4, 3000)
+    created = rng.integers(0, 1000, 3000)
+    delivered = created + rng.integers(1, 12, 3000)
+    one = DeliveryStats(per_pair=True)
+    many = DeliveryStats(per_pair=True)
+    for s, d, c, t in zip(src.tolist(), dst.tolist(), created.tolist(), delivered.tolist()):
+        one.record(s, d, c, t)
+    many.record_many(src, dst, created, delivered)
+    # Delays below 2**pair_sub_bits are exact
+    expected = {(s, d): _nearest_rank((delivered - created)[(src == s) & (dst == d)], 95)
+                for s in range(4) for d in range(4)}
+    assert one.pair_percentiles(95) == many.pair_percentiles(95) == expected
+    assert DeliveryStats().pair_percentiles(95) == {}
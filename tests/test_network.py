@@ -0,0 +1,81 @@
+"""Network.run: ticking with idle stretches skipped."""
+import numpy as np
+import pytest
+
+from Network import Network
+from VectorNetwork import VectorNetwork
+from bellman_ford.BellmanFordNode import BellmanFordNode
+from layout import generate_irregular_grid
+from q_routing.QNode import QNode
+from stochastic_q_routing.SQRWALT import SQRWALT
+from traces import TraceReplay, write_trace
+from traffic import OnOffArrivals
+
+# Short bursts separated by long silences: most ticks have nothing in flight
+PHASES = [(4_000, 0.3)]
+ARRIVALS = OnOffArrivals(0.3, mean_on=5, mean_off=400)
+
+
+@pytest.fixture
+def trace(tmp_path):
+    path = str(tmp_path / "trace.npy")
+    write_trace(path, PHASES, 36, seed=4, arrivals=ARRIVALS)
+    return path
+
+
+def _delivered(net):
+    return sorted((p["created_at"], p["delivered_at"]) for p in net.delivered_packets)
+
+
+class _CountingNetwork(Network):
+    ticks = 0
+
+    def tick(self):
+        self.ticks += 1
+        super().tick()
+
+
+@pytest.mark.parametrize("node_cls", [BellmanFordNode, QNode])
+def test_run_matches_tick_loop(trace, node_cls):
+    graph, _ = generate_irregular_grid()
+    looped = Network(graph, node_cls)
+    replay = TraceReplay(trace)
+    for _ in range(PHASES[0][0]):
+        looped.inject_traffic(replay)
+        looped.tick()
+
+    skipped = _CountingNetwork(graph, node_cls)
+    skipped.run(PHASES[0][0], TraceReplay(trace))
+
+    assert skipped.time == looped.time
+    assert _delivered(skipped) == _delivered(looped)
+    assert skipped.ticks < PHASES[0][0]
+
+
+def test_run_without_traffic_drains_then_jumps():
+    graph, _ = generate_irregular_grid()
+    net = _CountingNetwork(graph, QNode)
+    net.inject_random_packets(3.0)
+    net.run(10_000)
+    assert net.time == 10_000
+    assert net.get_active_packets() == 0
+    assert net.ticks < 1_000
+
+
+def test_vector_run_matches_tick_loop(trace):
+    graph, _ = generate_irregular_grid()
+    looped = VectorNetwork(graph, SQRWALT, seed=2, update_interval=250)
+    replay = TraceReplay(trace)
+    for _ in range(PHASES[0][0]):
+        looped.inject_traffic(replay)
+        looped.tick()
+        if looped.time % 250 == 0:
+            looped.tick_update()
+
+    skipped = VectorNetwork(graph, SQRWALT, seed=2, update_interval=250)
+    skipped.run(PHASES[0][0], TraceReplay(trace))
+
+    assert skipped.time == looped.time
+    for a, b in zip(looped.collect_delivered(), skipped.collect_delivered()):
+        np.testing.assert_array_equal(a, b)
+    np.testing.assert_array_equal(looped.temperature, skipped.temperature)
@@ -0,0 +1,99 @@
+"""The opt-in Network profiler."""
+import json
+import random
+
+import pytest
+
+from DeliveryStats import DeliveryStats
+from Network import Network
+from VectorNetwork import VectorNetwork
+from experiment import run_phases
+from layout import generate_irregular_grid
+from profiling import Profiler
+from stochastic_q_routing.SQRWALT import SQRWALT
+
+
+def _run(net, ticks=300, load=2.0):
+    for _ in range(ticks):
+        net.inject_random_packets(load)
+        net.tick()
+        if net.time % 10 == 0:
+            for node in net.nodes.values():
+                node.tick_update()
+
+
+def _build():
+    random.seed(4)
+    return Network(generate_irregular_grid()[0], SQRWALT, metrics=DeliveryStats())
+
+
+def test_profiled_run_is_the_same_run():
+    plain = _build()
+    _run(plain)
+    profiled = _build()
+    profiler = Profiler().attach(profiled)
+    _run(profiled)
+    profiler.detach()
+    assert profiled.delivered_packets == plain.delivered_packets
+    assert profiled.metrics.mean == plain.metrics.mean
+
+
+def test_detach_removes_every_wrapper():
+    net = _build()
+    before = [set(vars(obj)) for obj in [net, net.metrics, *net.nodes.values()]]
+    profiler = Profiler().attach(net)
+    assert "_process_active" in vars(net)
+    profiler.detach()
+    assert [set(vars(obj)) for obj in [net, net.metrics, *net.nodes.values()]] == before
+
+
+def test_stage_counts_and_totals():
+    net = _build()
+    profiler = Profiler().attach(net)
+    _run(net)
+    stats = profiler.summary()
+    stages = stats["stages"]
+    delivered = net.get_delivered_packets_count()
+    assert stats["ticks"] == 300
+    assert stages["inject"]["calls"] == 300
+    assert stages["forward"]["calls"] == 300
+    assert stages["deliver"]["calls"] == stages["metrics"]["calls"] == delivered
+    assert stages["select"]["calls"] == stages["q_update"]["calls"] == stats["hops"]
+    assert stages["tick_update"]["calls"] == 30 * len(net.nodes)
+    assert sum(stats["nodes"]["forwards"]) == stats["hops"] > 0
+    assert max(stats["nodes"]["max_queue"]) >= 1
+    assert stages["process"]["seconds"] >= stages["select"]["seconds"]
+
+
+def test_intervals_cover_the_run():
+    net = _build()
+    profiler = Profiler().attach(net)
+    seen = []
+    profiler.on_interval.append(seen.append)
+    for _ in range(3):
+        _run(net, ticks=100)
+        profiler.interval()
+    assert [s["ticks"] for s in seen] == [100, 100, 100]
+    assert [s["time"] for s in profiler.intervals] == [100, 200, 300]
+    assert sum(s["hops"] for s in seen) == profiler.summary()["hops"]
+
+
+def test_attach_twice_is_an_error():
+    profiler = Profiler().attach(_build())
+    with pytest.raises(RuntimeError):
+        profiler.attach(_build())
+
+
+def test_run_phases_writes_a_profile(tmp_path):
+    path = str(tmp_path / "profile-{seed}.json")
+    run_phases(SQRWALT, generate_irregular_grid, [(1_000, 2.0)], seed=1,
+               record_interval=250, update_interval=10, profile=path)
+    with open(path.format(seed=1)) as f:
+        summary = json.load(f)
+    assert summary["node_cls"] == "SQRWALT"
+    assert summary["ticks"] == 1_000
+    assert len(summary["intervals"]) == 4
+
+    with pytest.raises(ValueError):
+        run_phases(SQRWALT, generate_irregular_grid, [(1_000, 2.0)], seed=1,
+                   record_interval=250, engine=VectorNetwork, profile=path)
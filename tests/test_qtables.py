@@ -0,0 +1,96 @@
+"""Lazily allocated, LRU-bounded Q tables."""
+import random
+from functools import partial
+
+import numpy as np
+import pytest
+
+import topology
+from Network import Network
+from layout import generate_irregular_grid
+from q_routing.LazyQTable import LazyQTables
+from q_routing.QNode import QNode
+from stochastic_q_routing.StochasticQNode import StochasticQNode
+
+
+def _run(net, ticks=400, load=2.0):
+    for _ in range(ticks):
+        net.inject_random_packets(load)
+        net.tick()
+    return [(p["created_at"], p["delivered_at"]) for p in net.delivered_packets]
+
+
+def test_lru_table_evicts_least_recently_used_row():
+    tables = LazyQTables(topology.grid(3), max_rows=2)
+    table = tables.table(0, [1, 3])
+    evicted = []
+    table.on_evict = evicted.append
+
+    table[4][1] = 7.0
+    table[8][3] = 2.0
+    table[4]                          # touch 4, so 8 is now the coldest
+    table[5]
+    assert evicted == [8]
+    assert set(table) == {4, 5}
+    assert table[4] == {1: 7.0, 3: 0.0}
+    assert table[8] == {1: 0.0, 3: 0.0}           # back from the prior
+    assert evicted == [8, 5]
+
+
+def test_unbounded_table_builds_rows_on_first_use():
+    table = LazyQTables(topology.grid(3)).table(0, [1, 3])
+    assert len(table) == 0
+    assert table[8] == {1: 0.0, 3: 0.0}
+    assert list(table) == [8]
+
+
+def test_hops_prior_is_empty_network_delivery_time():
+    csr = topology.grid(4)
+    table = LazyQTables(csr, prior="hops").table(0, [1, 4])
+    # From node 1 to 15: 2 right + 3 down; from node 4: 3 right + 2 down
+    assert table[15] == {1: 6.0, 4: 6.0}
+    assert table[1] == {1: 1.0, 4: 3.0}
+
+
+def test_hops_cache_is_bounded():
+    tables = LazyQTables(topology.grid(5), prior="hops", cache_size=3)
+    for dst in range(6):
+        tables.hops_to(dst)
+    assert list(tables._hops) == [3, 4, 5]
+
+
+def test_pure_python_bfs_matches_scipy():
+    csr = topology.barabasi_albert(200, 2, seed=1)
+    tables = LazyQTables(csr, prior="hops")
+    src, dst = csr.edges()
+    order = np.argsort(dst, kind="stable")
+    indptr = np.zeros(csr.num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(dst, minlength=csr.num_nodes), out=indptr[1:])
+    for d in (0, 17, 199):
+        np.testing.assert_array_equal(
+            LazyQTables._bfs(indptr.tolist(), src[order].tolist(), d), tables.hops_to(d))
+
+
+def test_unknown_prior_is_rejected():
+    with pytest.raises(ValueError):
+        LazyQTables(topology.grid(3), prior="random")
+
+
+@pytest.mark.parametrize("node_cls", [QNode, StochasticQNode])
+def test_zero_prior_matches_eager_tables(node_cls):
+    graph, _ = generate_irregular_grid()
+    runs = []
+    for q_tables in (None, LazyQTables):
+        random.seed(0)
+        np.random.seed(0)
+        runs.append(_run(Network(graph, node_cls, q_tables=q_tables)))
+    assert runs[0] == runs[1]
+
+
+def test_evicted_rows_drop_cached_boltzmann_weights():
+    graph, _ = generate_irregular_grid()
+    net = Network(graph, StochasticQNode, q_tables=partial(LazyQTables, max_rows=4))
+    _run(net, ticks=200)
+    for node in net.nodes.values():
+        assert len(node.q_table) <= 4
+        assert set(node._weights) <= set(node.q_table)
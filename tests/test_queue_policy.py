@@ -0,0 +1,110 @@
+"""Bounded queues and their drop accounting."""
+import random
+from functools import partial
+
+import numpy as np
+import pytest
+
+import topology
+from DeliveryStats import DeliveryStats
+from Network import Network
+from QueuePolicy import RED, DropOldest, QueuePolicy, TailDrop
+from q_routing.QNode import QNode
+
+
+def _flood(policy, count=6):
+    """`count` (at most 8) packets for nodes 1, 2, ... injected at node 0."""
+    net = Network(topology.grid(3), QNode, metrics=DeliveryStats(), queue_policy=policy)
+    for dst in range(1, count + 1):
+        net.inject_packet(0, dst)
+    return net
+
+
+def _queued_dst(net, node=0):
+    return [int(net.packets.dst[pid]) for pid in net.nodes[node].queue]
+
+
+def test_tail_drop_keeps_the_first_arrivals():
+    net = _flood(partial(TailDrop, capacity=2))
+    assert _queued_dst(net) == [1, 2]
+    assert net.get_dropped_packets_count() == 4
+    assert net.queue_policy.drops.tolist() == [4] + [0] * 8
+    assert net.metrics.total_drops == 4
+    assert len(net.packets) == 2                  # dropped packets are freed
+
+
+def test_drop_oldest_keeps_the_last_arrivals():
+    net = _flood(partial(DropOldest, capacity=2))
+    assert _queued_dst(net) == [5, 6]
+    assert net.get_dropped_packets_count() == 4
+    assert net.metrics.total_drops == 4
+    assert len(net.packets) == 2
+
+
+def test_red_thresholds():
+    # weight 1: the average is the current queue length
+    never = partial(RED, capacity=8, min_th=2, max_th=5, max_p=0.0, weight=1.0)
+    net = _flood(never, count=8)
+    assert len(net.nodes[0].queue) == 5           # admitted until the average hits max_th
+    assert net.get_dropped_packets_count() == 3
+
+    always = partial(RED, capacity=8, min_th=2, max_th=5, max_p=1.0, weight=1.0)
+    net = _flood(always, count=8)
+    # Random drops between the thresholds, certain ones from max_th on
+    assert 3 <= len(net.nodes[0].queue) <= 5
+    assert len(net.nodes[0].queue) + net.get_dropped_packets_count() == 8
+
+
+def test_red_draws_are_private_and_seeded():
+    red = partial(RED, capacity=8, min_th=1, max_th=7, max_p=0.5, weight=0.5, seed=3)
+    random.seed(0)
+    a = _flood(red, count=8)
+    state = random.getstate()
+    random.seed(0)
+    b = _flood(red, count=8)
+    assert random.getstate() == state
+    assert _queued_dst(a) == _queued_dst(b)
+
+
+@pytest.mark.parametrize("policy", [TailDrop, DropOldest, RED])
+def test_every_packet_is_delivered_dropped_or_in_flight(policy):
+    random.seed(2)
+    net = Network(topology.grid(4), QNode, metrics=DeliveryStats(),
+                  queue_policy=partial(policy, capacity=3))
+    injected = 0
+    for _ in range(500):
+        for _ in range(4):
+            src, dst = random.sample(range(16), 2)
+            net.inject_packet(src, dst)
+            injected += 1
+        net.tick()
+    assert net.get_dropped_packets_count() > 0
+    assert net.metrics.total_drops == net.get_dropped_packets_count()
+    assert net.queue_policy.drops.sum() == net.get_dropped_packets_count()
+    assert (net.get_delivered_packets_count() + net.get_dropped_packets_count()
+            + net.get_active_packets()) == injected
+    assert len(net.packets) == net.get_active_packets()
+    assert max(len(node.queue) for node in net.nodes.values()) <= 3
+
+
+def test_backpressure_raises_q_towards_full_neighbours():
+    runs = []
+    for backpressure in (None, 50.0):
+        random.seed(5)
+        net = Network(topology.grid(4), QNode,
+                      queue_policy=partial(TailDrop, capacity=2, backpressure=backpressure))
+        for _ in range(300):
+            net.inject_random_packets(6.0)
+            net.tick()
+        runs.append(np.mean([q for node in net.nodes.values()
+                             for row in node.q_table.values() for q in row.values()]))
+    assert runs[1] > runs[0]
+
+
+def test_invalid_parameters():
+    with pytest.raises(TypeError):
+        QueuePolicy(topology.grid(2))                 # abstract
+    with pytest.raises(ValueError):
+        TailDrop(topology.grid(2), capacity=0)
+    with pytest.raises(ValueError):
+        RED(topology.grid(2), capacity=8, min_th=6, max_th=4)
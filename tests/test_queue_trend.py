@@ -0,0 +1,34 @@
+"""O(1) queue-length trend against a refit over the window."""
+import numpy as np
+
+from stochastic_q_routing.QueueTrend import QueueTrend, QueueTrendArray
+
+
+def _refit(samples):
+    if len(samples) < 2:
+        return np.mean(samples), 0.0
+    return np.mean(samples), np.polyfit(np.arange(len(samples)), samples, 1)[0]
+
+
+def test_running_sums_match_a_refit():
+    rng = np.random.default_rng(0)
+    samples = rng.integers(0, 50, 300).tolist()
+    trend = QueueTrend(window=32)
+    for n, q in enumerate(samples, 1):
+        trend.push(q)
+        mean, slope = _refit(samples[max(0, n - 32):n])
+        assert trend.mean() == mean
+        assert np.isclose(trend.slope(), slope, atol=1e-9)
+
+
+def test_array_trend_matches_per_node_trends():
+    rng = np.random.default_rng(1)
+    trends = [QueueTrend(window=8) for _ in range(5)]
+    array = QueueTrendArray(5, window=8)
+    for _ in range(40):
+        q = rng.integers(0, 20, 5)
+        array.push(q)
+        for trend, value in zip(trends, q.tolist()):
+            trend.push(value)
+        np.testing.assert_array_equal(array.mean(), [t.mean() for t in trends])
+        np.testing.assert_allclose(array.slope(), [t.slope() for t in trends])
@@ -0,0 +1,59 @@
+"""
+`Network` runs at a fixed seed must not change under refactors: these
+fingerprints were recorded on the original per-node simulator.
+BellmanFordNode's were recorded after its tables became per-graph
+shortest paths (before that, every layout was routed on the sparse
+grid's tables).
+"""
+import hashlib
+import random
+
+import pytest
+
+from Network import Network
+from Node import Node
+from bellman_ford.BellmanFordNode import BellmanFordNode
+from dense_layout import generate_dense_irregular_grid
+from layout import generate_irregular_grid
+from q_routing.QNode import QNode
+from stochastic_q_routing.SQRWALT import SQRWALT
+from stochastic_q_routing.StochasticQNode import StochasticQNode
+
+LAYOUTS = {
+    "sparse": (generate_irregular_grid, 2.0),
+    "dense":  (generate_dense_irregular_grid, 5.5),
+}
+
+# (node class, layout): (sha1 prefix of the delivered packets, deliveries)
+GOLDEN = {
+    (Node, "sparse"):            ("f4895803e23b04e9", 795),
+    (Node, "dense"):             ("5c354a5eb54e7898", 1129),
+    (BellmanFordNode, "sparse"): ("009aa2385814c0a2", 3950),
+    (BellmanFordNode, "dense"):  ("cec703d8d5c89421", 10007),
+    (QNode, "sparse"):           ("11fd090a6f698260", 2521),
+    (QNode, "dense"):            ("8441a00ab5c0468d", 3564),
+    (StochasticQNode, "sparse"): ("21288752abc9bb14", 2566),
+    (StochasticQNode, "dense"):  ("eba75f71aa12e72e", 3607),
+    (SQRWALT, "sparse"):         ("21972c9dc511f3c4", 1983),
+    (SQRWALT, "dense"):          ("ae5f66e611403046", 3015),
+}
+
+
+@pytest.mark.parametrize("node_cls, layout", list(GOLDEN),
+                         ids=[f"{cls.__name__}-{layout}" for cls, layout in GOLDEN])
+def test_network_matches_recorded_run(node_cls, layout):
+    factory, load = LAYOUTS[layout]
+    random.seed(1)
+    graph, _ = factory()
+    net = Network(graph, node_cls)
+    for _ in range(2000):
+        net.inject_random_packets(load)
+        net.tick()
+        if node_cls is SQRWALT and net.time % 10 == 0:
+            for node in net.nodes.values():
+                node.tick_update()
+
+    rows = [(p["src"], p["dst"], p["created_at"], p["delivered_at"])
+            for p in net.delivered_packets]
+    digest = hashlib.sha1(repr(rows).encode()).hexdigest()[:16]
+    assert (digest, len(rows)) == GOLDEN[node_cls, layout]
@@ -0,0 +1,132 @@
+"""The chunked columnar results store."""
+import numpy as np
+import pytest
+
+from DelayHistogram import DelayHistogram
+from ResultsStore import ResultsStore
+from experiment import run_phases
+from layout import generate_irregular_grid
+from q_routing.QNode import QNode
+
+
+@pytest.fixture(params=[True, False], ids=["npz", "npy"])
+def store(request, tmp_path):
+    return ResultsStore(str(tmp_path / "store"), compress=request.param, chunk_rows=4)
+
+
+def _append(store, seed, algorithm="QNode", rows=10, offset=0.0):
+    time = np.arange(1, rows + 1) * 100
+    return store.append({"time": time, "mean": time / 100 + seed + offset},
+                        algorithm=algorithm, seed=seed, phases=[(1_000, 2.5)])
+
+
+def test_append_and_load_round_trip(store):
+    run = _append(store, seed=3)
+    data = store.load()
+    np.testing.assert_array_equal(data["time"], np.arange(1, 11) * 100)
+    np.testing.assert_array_equal(data["mean"], np.arange(1, 11) + 3.0)
+    assert set(data["run"]) == {run}
+    assert set(data["seed"]) == {3}
+    assert set(data["phases"]) == {"[[1000, 2.5]]"}     # non-scalar tags as JSON
+    # 10 rows in chunks of 4
+    assert len([c for c in store._chunks() if c["run"] == run]) == 3
+
+
+def test_runs_lists_tags_and_rows(store):
+    _append(store, seed=0)
+    _append(store, seed=1, rows=5)
+    runs = store.runs()
+    assert [(r["seed"], r["rows"]) for r in runs] == [(0, 10), (1, 5)]
+    assert runs[0]["phases"] == [[1_000, 2.5]]
+
+
+def test_filters(store):
+    for seed in range(4):
+        _append(store, seed=seed, algorithm="QNode" if seed % 2 else "SQRWALT")
+    assert set(store.load(algorithm="QNode")["seed"]) == {1, 3}
+    assert set(store.load(seed={0, 3})["seed"]) == {0, 3}
+    assert set(store.load(seed=lambda s: s >= 2)["seed"]) == {2, 3}
+    assert set(store.load(phases=[(1_000, 2.5)])["seed"]) == {0, 1, 2, 3}  # tuples match lists
+    assert store.load(algorithm="Node") == {}
+
+
+def test_latest_runs_keeps_the_newest_run_per_seed(store):
+    _append(store, seed=0)
+    _append(store, seed=1)
+    rerun = _append(store, seed=0, offset=10.0)
+    _append(store, seed=0, algorithm="SQRWALT")
+    latest = store.latest_runs(algorithm="QNode")
+    assert len(latest) == 2 and rerun in latest
+    assert set(store.load(run=latest)["seed"]) == {0, 1}
+    time, avg, _ = store.curve("mean", run=latest)
+    np.testing.assert_allclose(avg, np.arange(1, 11) + 5.5)   # seeds 0 (+10) and 1
+    assert len(store.latest_runs(("seed", "algorithm"))) == 3
+
+
+def test_load_selects_columns_and_time_range(store):
+    _append(store, seed=0)
+    data = store.load(["mean"], time=(250, 600))
+    np.testing.assert_array_equal(data["mean"], [3.0, 4.0, 5.0, 6.0])
+    assert "time" not in data
+    assert set(data) == {"mean", "run", "algorithm", "seed", "phases"}
+
+
+def test_columns_must_have_equal_length(store):
+    with pytest.raises(ValueError):
+        store.append({"time": [1, 2, 3], "mean": [1.0, 2.0]}, seed=0)
+
+
+def test_group_by_averages_over_seeds(store):
+    for seed in range(3):
+        _append(store, seed=seed, algorithm="QNode")
+    _append(store, seed=0, algorithm="SQRWALT", offset=10.0)
+    g = store.group_by(("algorithm", "time"), ("mean",))
+    assert list(g["algorithm"][:2]) == ["QNode", "QNode"]
+    np.testing.assert_array_equal(g["time"][:10], np.arange(1, 11) * 100)
+    q = g["algorithm"] == "QNode"
+    np.testing.assert_allclose(g["mean_mean"][q], np.arange(1, 11) + 1.0)
+    np.testing.assert_allclose(g["mean_std"][q], np.sqrt(2 / 3))
+    assert (g["n"][q] == 3).all() and (g["n"][~q] == 1).all()
+
+    time, avg, std = store.curve("mean", algorithm="SQRWALT")
+    np.testing.assert_allclose(avg, np.arange(1, 11) + 10.0)
+    assert (std == 0).all()
+
+
+def test_group_by_of_nothing_is_empty(store):
+    g = store.group_by(("time",), ("mean",))
+    assert len(g["time"]) == len(g["mean_mean"]) == len(g["n"]) == 0
+
+
+def test_run_phases_appends_its_intervals(tmp_path):
+    path = str(tmp_path / "store")
+    time_points, delays, _, hists = run_phases(QNode, generate_irregular_grid, [(2_000, 2.0)],
+                                               seed=4, record_interval=500, store=path)
+    store = ResultsStore(path)
+    [run] = store.runs()
+    assert run["algorithm"] == "QNode" and run["seed"] == 4
+    assert run["engine"] == "Network" and run["record_interval"] == 500
+    assert run["phases"] == [[2_000, 2.0]] and run["trace"] is None
+    data = store.load(["time", "mean", "hist"])
+    np.testing.assert_array_equal(data["time"], time_points)
+    np.testing.assert_array_equal(data["mean"], delays)
+    np.testing.assert_array_equal(data["hist"], hists)
+
+
+def test_percentile_curve_pools_the_histograms(store):
+    rng = np.random.default_rng(0)
+    delays = [rng.integers(1, 500, (3, 200)) for _ in range(2)]
+    for seed, runs in enumerate(delays):
+        hists = []
+        for d in runs:
+            h = DelayHistogram()
+            h.record_many(d)
+            hists.append(h.counts)
+        store.append({"time": [100, 200, 300], "hist": np.array(hists)}, seed=seed)
+    curve = store.percentile_curve((50, 99))
+    np.testing.assert_array_equal(curve["time"], [100, 200, 300])
+    for k in range(3):
+        pooled = DelayHistogram()
+        pooled.record_many(np.concatenate([delays[0][k], delays[1][k]]))
+        assert curve["p50"][k] == pooled.percentile(50)
+        assert curve["p99"][k] == pooled.percentile(99)
@@ -0,0 +1,142 @@
+"""Routing tables against the reference Bellman-Ford, and their repair."""
+import math
+import random
+from functools import partial
+
+import numpy as np
+import pytest
+
+import topology
+from Network import Network
+from bellman_ford.BellmanFordNode import BellmanFordNode
+from bellman_ford.routing_table import (_compute, get_shortest_path, next_hops_for,
+                                        repair_shortest_paths, shortest_paths)
+from dense_layout import generate_dense_irregular_grid
+from experiment import run_phases
+from layout import generate_irregular_grid
+from q_routing.DenseQTable import DenseQTable
+from q_routing.QNode import QNode
+
+
+def _weighted(graph):
+    """Same topology with symmetric weights 1-3."""
+    weights = {}
+    return {u: [(v, weights.setdefault(frozenset((u, v)), float(1 + (u * v) % 3)))
+                for v, _ in neigh]
+            for u, neigh in graph.items()}
+
+
+@pytest.mark.parametrize("weighted", [False, True], ids=["unit", "weighted"])
+@pytest.mark.parametrize("factory", [generate_irregular_grid, generate_dense_irregular_grid],
+                         ids=["sparse", "dense"])
+def test_shortest_paths_match_bellman_ford(factory, weighted):
+    graph, _ = factory()
+    graph = _weighted(graph) if weighted else dict(graph)
+    node_ids, dist, next_hop = shortest_paths(graph)
+    index = {nid: i for i, nid in enumerate(node_ids)}
+
+    for i, src in enumerate(node_ids):
+        want, _ = get_shortest_path(graph, src)
+        np.testing.assert_array_equal(dist[i], [want[dst] for dst in node_ids])
+        weight = dict(graph[src])
+        for j, dst in enumerate(node_ids):
+            if i == j:
+                assert next_hop[i, j] == -1
+                continue
+            # A neighbour on a shortest path
+            hop = node_ids[next_hop[i, j]]
+            assert weight[hop] + dist[index[hop], j] == dist[i, j]
+
+
+# ----------------------------------------
+# Link events
+# ----------------------------------------
+def _events(csr, rng, count):
+    """Random link removals, additions and weight changes (undirected)."""
+    n = csr.num_nodes
+    for _ in range(count):
+        kind = rng.choice(("remove", "add", "weight"))
+        src, dst = csr.edges()
+        if kind == "add":
+            i, j = rng.sample(range(n), 2)
+            if csr.arc(i, j) < 0:
+                yield "add", i, j, float(rng.randint(1, 4))
+            continue
+        a = rng.randrange(len(src))
+        i, j = int(src[a]), int(dst[a])
+        yield kind, i, j, math.inf if kind == "remove" else float(rng.randint(1, 4))
+
+
+@pytest.mark.parametrize("weighted", [False, True], ids=["unit", "weighted"])
+@pytest.mark.parametrize("factory", [partial(topology.grid, 6),
+                                     partial(topology.barabasi_albert, 60, 2, seed=3)],
+                         ids=["grid", "ba"])
+def test_repair_matches_recompute(factory, weighted):
+    rng = random.Random(11)
+    csr = factory()
+    if weighted:
+        src, dst = csr.edges()
+        for i, j in zip(src.tolist(), dst.tolist()):
+            if i < j:
+                w = float(rng.randint(1, 4))
+                csr.set_arc_weight(i, j, w)
+                csr.set_arc_weight(j, i, w)
+    dist, next_hop = _compute(csr)
+
+    for kind, i, j, weight in _events(csr, rng, 40):
+        if kind == "add":
+            csr.add_arc(i, j, weight)
+            csr.add_arc(j, i, weight)
+            changes = [(i, j, math.inf, weight), (j, i, math.inf, weight)]
+        elif kind == "remove":
+            changes = [(i, j, csr.remove_arc(i, j), math.inf),
+                       (j, i, csr.remove_arc(j, i), math.inf)]
+        else:
+            changes = [(i, j, csr.set_arc_weight(i, j, weight), weight),
+                       (j, i, csr.set_arc_weight(j, i, weight), weight)]
+        repair_shortest_paths(csr, dist, next_hop, changes)
+
+        want_dist, want_next_hop = _compute(csr)
+        np.testing.assert_array_equal(dist, want_dist)
+        np.testing.assert_array_equal(next_hop, want_next_hop)
+
+
+@pytest.mark.parametrize("q_store", [None, DenseQTable], ids=["dict", "dense"])
+def test_link_events_change_every_view_of_the_topology(q_store):
+    graph = topology.grid(4).to_dict()
+    before = {u: list(neigh) for u, neigh in graph.items()}
+    bf = Network(graph, BellmanFordNode)
+    q = Network(graph, QNode, q_store=q_store)
+    for net in (bf, q):
+        net.remove_link(0, 1)
+        net.add_link(0, 5, 2.0)
+        net.set_weight(4, 8, 3.0)
+        assert net.graph == before                  # the caller's graph is not touched
+        assert net.nodes[0].neighbors == [4, 5]
+        assert net.csr.neighbor_ids(5)[-1] == 0
+
+    fresh = Network(bf.csr.to_dict(), BellmanFordNode)
+    assert next_hops_for(bf) == next_hops_for(fresh)
+    assert q.nodes[0].select_next_hop(15) in (4, 5)
+    with pytest.raises(ValueError):
+        q.remove_link(0, 3)                         # not a link
+
+
+def test_link_events_leave_a_csr_input_alone():
+    csr = topology.grid(4)
+    net = Network(csr, BellmanFordNode)
+    net.remove_link(0, 1)
+    assert net.graph is csr
+    assert csr.arc(0, 1) >= 0 and net.csr.arc(0, 1) < 0
+    assert next_hops_for(Network(csr, BellmanFordNode))[0][1] == 1
+
+
+def test_run_phases_applies_link_events():
+    phases = [(500, 2.0), (500, 2.0, [("remove_link", 0, 1), ("add_link", 0, 7)])]
+    time_points, delays, _, _ = run_phases(BellmanFordNode, partial(topology.grid, 6),
+                                           phases, seed=2, record_interval=250)
+    assert time_points.tolist() == [250, 500, 750, 1_000]
+    assert np.isfinite(delays).all()
+    with pytest.raises(ValueError, match="unknown link event"):
+        run_phases(QNode, partial(topology.grid, 6), [(10, 1.0, [("cut", 0, 1)])],
+                   seed=2, record_interval=5)
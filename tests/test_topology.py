@@ -0,0 +1,99 @@
+"""CSRGraph and the topology generators."""
+from functools import partial
+
+import numpy as np
+import pytest
+
+import topology
+from CSRGraph import CSRGraph
+from dense_layout import generate_dense_irregular_grid
+from experiment import run_steady_state
+from layout import generate_irregular_grid
+from q_routing.QNode import QNode
+
+GENERATORS = {
+    "grid": partial(topology.grid, 7, 5),
+    "torus": partial(topology.torus, 6),
+    "irregular_grid": partial(topology.irregular_grid, 10, seed=1),
+    "waxman": partial(topology.waxman, 300, alpha=0.2, beta=0.6, seed=2),
+    "barabasi_albert": partial(topology.barabasi_albert, 200, 3, seed=3),
+    "fat_tree": partial(topology.fat_tree, 4),
+}
+
+
+def _pairs(graph):
+    src, dst = graph.edges()
+    return set(zip(src.tolist(), dst.tolist()))
+
+
+@pytest.mark.parametrize("make", GENERATORS.values(), ids=GENERATORS.keys())
+def test_generators_are_simple_undirected_and_connected(make):
+    graph = make()
+    pairs = _pairs(graph)
+    assert len(pairs) == len(graph.indices)                  # no repeated links
+    assert all(u != v for u, v in pairs)                     # no self-loops
+    assert all((v, u) in pairs for u, v in pairs)            # both directions
+    assert (graph.components() == graph.components()[0]).all()
+
+
+def test_grid_matches_dense_layout():
+    assert topology.grid(6).to_dict() == dict(generate_dense_irregular_grid()[0])
+
+
+def test_torus_is_4_regular():
+    assert (topology.torus(5, 7).degree == 4).all()
+
+
+def test_irregular_grid_removes_the_requested_links():
+    full = len(topology.grid(10).indices) // 2
+    graph = topology.irregular_grid(10, remove=0.25, seed=1)
+    assert len(graph.indices) // 2 == full - round(0.25 * full)
+    assert _pairs(graph) <= _pairs(topology.grid(10))
+
+
+def test_waxman_links_stay_within_radius():
+    graph = topology.waxman(400, alpha=0.1, beta=0.8, seed=5, radius=0.2, connected=False)
+    xy = np.random.default_rng(5).random((400, 2))
+    src, dst = graph.edges()
+    assert len(src) > 0
+    assert (np.linalg.norm(xy[src] - xy[dst], axis=1) <= 0.2).all()
+
+
+def test_barabasi_albert_links_each_new_node_m_times():
+    graph = topology.barabasi_albert(100, 3, seed=0)
+    assert len(graph.indices) // 2 == 3 * (100 - 3)
+    assert graph.degree[3:].min() >= 3
+    with pytest.raises(ValueError):
+        topology.barabasi_albert(3, 3)
+
+
+def test_fat_tree_shape():
+    k = 4
+    graph = topology.fat_tree(k)
+    switches = 5 * k * k // 4
+    assert len(graph) == switches + k ** 3 // 4
+    assert (graph.degree[:switches] == k).all()
+    assert (graph.degree[switches:] == 1).all()
+    assert len(topology.fat_tree(k, hosts=False)) == switches
+    with pytest.raises(ValueError):
+        topology.fat_tree(3)
+
+
+def test_from_edge_list_keeps_ids_and_weights(tmp_path):
+    path = tmp_path / "edges.txt"
+    path.write_text("# u v w\n10 20 1.5\n20 30 2\n99 98 1\n")
+    graph = topology.from_edge_list(str(path))
+    assert graph.to_dict() == {10: [(20, 1.5)], 20: [(10, 1.5), (30, 2.0)], 30: [(20, 2.0)]}
+    assert len(topology.from_edge_list(str(path), connected=False)) == 5
+
+
+def test_dict_round_trip():
+    graph, _ = generate_irregular_grid()
+    graph = dict(graph)
+    assert CSRGraph.from_dict(graph).to_dict() == graph
+
+
+def test_experiment_takes_a_bare_graph():
+    mean = run_steady_state(QNode, partial(topology.grid, 4), load=1.0, seed=0,
+                            num_steps=500, discard_steps=100)
+    assert mean > 0
@@ -0,0 +1,150 @@
+"""Traffic sources, traces and their replay."""
+import json
+
+import numpy as np
+import pytest
+
+from Network import Network
+from Node import Node
+from VectorNetwork import VectorNetwork
+from layout import generate_irregular_grid
+from traces import TraceReplay, write_trace
+from traffic import (BernoulliArrivals, GravityPairs, HotspotPairs, OnOffArrivals,
+                     PoissonArrivals, Traffic, UniformPairs)
+
+TICKS = 200_000
+
+
+@pytest.mark.parametrize("arrivals", [BernoulliArrivals(2.3), PoissonArrivals(2.3),
+                                      OnOffArrivals(2.3, mean_on=50, mean_off=150)],
+                         ids=["bernoulli", "poisson", "on-off"])
+def test_arrivals_have_the_requested_mean(arrivals):
+    counts = arrivals.counts(np.random.default_rng(0), TICKS)
+    assert counts.mean() == pytest.approx(2.3, rel=0.03)
+
+
+def test_bernoulli_arrivals_are_floor_or_ceil():
+    counts = BernoulliArrivals(2.3).counts(np.random.default_rng(0), TICKS)
+    assert set(np.unique(counts)) == {2, 3}
+
+
+def test_on_off_arrivals_are_bursty():
+    rng = np.random.default_rng(0)
+    steady = PoissonArrivals(2.0).counts(rng, TICKS)
+    bursty = OnOffArrivals(2.0, mean_on=50, mean_off=150).counts(rng, TICKS)
+    assert (bursty == 0).mean() > 0.7
+    assert bursty.var() > 3 * steady.var()
+
+
+def test_uniform_pairs_never_pick_src_as_dst():
+    src, dst = UniformPairs(10).draw(np.random.default_rng(1), TICKS)
+    assert not np.any(src == dst)
+    pairs = np.bincount(src * 10 + dst, minlength=100).reshape(10, 10)
+    off_diagonal = pairs[~np.eye(10, dtype=bool)]
+    assert off_diagonal.min() > 0.9 * TICKS / 90
+    assert off_diagonal.max() < 1.1 * TICKS / 90
+
+
+def test_hotspot_pairs_send_the_requested_fraction_to_hotspots():
+    src, dst = HotspotPairs(20, hotspots=[3], fraction=0.5).draw(np.random.default_rng(2), TICKS)
+    assert not np.any(src == dst)
+    # Half the packets plus the uniform share of the rest (src 3 never counts)
+    expected = (19 / 20) * (0.5 + 0.5 / 19)
+    assert (dst == 3).mean() == pytest.approx(expected, rel=0.03)
+
+
+def test_gravity_pairs_follow_the_matrix():
+    weights = np.array([1.0, 2.0, 3.0, 4.0])
+    src, dst = GravityPairs(weights=weights).draw(np.random.default_rng(3), TICKS)
+    assert not np.any(src == dst)
+    matrix = np.outer(weights, weights)
+    np.fill_diagonal(matrix, 0.0)
+    observed = np.bincount(src * 4 + dst, minlength=16) / TICKS
+    np.testing.assert_allclose(observed, matrix.ravel() / matrix.sum(), atol=0.005)
+
+
+def test_at_serves_the_generated_schedule():
+    block = 512
+    ticks, src, dst = Traffic(PoissonArrivals(1.7), UniformPairs(12), seed=4,
+                              block=block).generate(0, block)
+    served = Traffic(PoissonArrivals(1.7), UniformPairs(12), seed=4, block=block)
+    for t in range(block):
+        s, d = served.at(t)
+        np.testing.assert_array_equal(s, src[ticks == t])
+        np.testing.assert_array_equal(d, dst[ticks == t])
+
+
+def test_network_injects_traffic_by_index():
+    graph, _ = generate_irregular_grid()
+    net = Network(graph, Node)
+
+    def source():
+        return Traffic(PoissonArrivals(3.0), UniformPairs(len(graph)), seed=5)
+
+    src, dst = source().at(0)
+    net.inject_traffic(source())
+
+    node_ids = list(graph)
+    queued = [(node_ids.index(p["src"]), node_ids.index(p["dst"]))
+              for node in net.nodes.values() for p in map(net.packets.view, node.queue)]
+    assert sorted(queued) == sorted(zip(src.tolist(), dst.tolist()))
+
+
+# ----------------------------------------
+# Traces
+# ----------------------------------------
+PHASES = [(300, 1.5), (200, 4.25), (300, 0.1)]
+
+
+def _schedule(path):
+    records = np.load(path)
+    return records["tick"], records["src"], records["dst"]
+
+
+def test_trace_matches_its_phases(tmp_path):
+    path = str(tmp_path / "trace.npy")
+    count = write_trace(path, PHASES, 36, seed=6, chunk=128)
+    ticks, src, dst = _schedule(path)
+    with open(f"{path}.json") as f:
+        meta = json.load(f)
+
+    assert len(ticks) == count == meta["records"]
+    assert np.all(np.diff(ticks) >= 0) and ticks[-1] < 800
+    assert not np.any(src == dst) and src.max() < 36 and dst.max() < 36
+    per_tick = np.bincount(ticks, minlength=800)
+    for (lo, hi), load in zip([(0, 300), (300, 500), (500, 800)], (1.5, 4.25, 0.1)):
+        assert set(np.unique(per_tick[lo:hi])) <= {int(load), int(load) + 1}
+
+
+@pytest.mark.parametrize("block", [5, 1 << 16])
+def test_replay_serves_every_record_once(tmp_path, block):
+    path = str(tmp_path / "trace.npy")
+    write_trace(path, PHASES, 36, seed=7)
+    ticks, src, dst = _schedule(path)
+    replay = TraceReplay(path, block=block)
+    for t in range(800):
+        s, d = replay.at(t)
+        np.testing.assert_array_equal(s, src[ticks == t])
+        np.testing.assert_array_equal(d, dst[ticks == t])
+
+
+def test_next_arrival_skips_idle_ticks(tmp_path):
+    path = str(tmp_path / "trace.npy")
+    write_trace(path, [(100, 0.05)], 36, seed=8)
+    ticks, _, _ = _schedule(path)
+    replay = TraceReplay(path)
+    for t in range(100):
+        later = ticks[ticks >= t]
+        assert replay.next_arrival(t) == (int(later[0]) if len(later) else None)
+
+
+def test_engines_replay_the_same_packets(tmp_path):
+    path = str(tmp_path / "trace.npy")
+    count = write_trace(path, PHASES, 36, seed=9)
+    graph, _ = generate_irregular_grid()
+    for net in (Network(graph, Node), VectorNetwork(graph, Node, seed=0)):
+        replay = TraceReplay(path)
+        for _ in range(800):
+            net.inject_traffic(replay)
+            net.tick()
+        assert net.get_delivered_packets_count() + net.get_active_packets() == count
@@ -0,0 +1,114 @@
+"""Q snapshots, warm starts and the convergence detector."""
+import random
+from functools import partial
+
+import numpy as np
+import pytest
+
+import topology
+from CompiledNetwork import CompiledNetwork
+from Network import Network
+from VectorNetwork import VectorNetwork
+from experiment import run_steady_state
+from q_routing.DenseQTable import DenseQTable
+from q_routing.LazyQTable import LazyQTables
+from q_routing.QNode import QNode
+from q_routing.warm_start import (ConvergenceDetector, load_q_snapshot, q_snapshot,
+                                  save_q_snapshot, shortest_path_q, warm_start)
+
+BACKENDS = {
+    "dict":     partial(Network, node_cls=QNode),
+    "dense":    partial(Network, node_cls=QNode, q_store=DenseQTable),
+    "lazy":     partial(Network, node_cls=QNode, q_tables=LazyQTables),
+    "lru":      partial(Network, node_cls=QNode, q_tables=partial(LazyQTables, max_rows=3)),
+    "vector":   partial(VectorNetwork, node_cls=QNode, seed=0),
+    "compiled": partial(CompiledNetwork, node_cls=QNode, seed=0),
+}
+
+
+def _trained(ticks=600):
+    random.seed(1)
+    net = Network(topology.irregular_grid(5, seed=2), QNode)
+    for _ in range(ticks):
+        net.inject_random_packets(2.0)
+        net.tick()
+    return net
+
+
+def test_shortest_path_q_is_empty_network_delivery_time():
+    q = shortest_path_q(topology.grid(3))
+    # Node 0's neighbours are 1 and 3; node 8 is 3 hops from either
+    assert q[0, 8].tolist() == [4.0, 4.0, np.inf, np.inf]
+    assert q[0, 1].tolist() == [1.0, 3.0, np.inf, np.inf]
+    assert q.shape == (9, 9, 4)
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_warm_start_round_trips_through_every_backend(backend):
+    source = _trained()
+    q = q_snapshot(source)
+    net = BACKENDS[backend](graph=source.csr)
+    warm_start(net, q)
+    loaded = q_snapshot(net)
+    # The diagonal (dst == node) is not a Q-value in dict tables
+    off = ~np.eye(len(q), dtype=bool)
+    np.testing.assert_array_equal(loaded[off], q[off])
+
+
+def test_lazy_tables_build_later_rows_from_the_snapshot():
+    source = _trained()
+    q = q_snapshot(source)
+    net = Network(source.csr, QNode, q_tables=LazyQTables)
+    warm_start(net, q)
+    node = net.nodes[0]
+    assert len(node.q_table) == 0
+    assert list(node.q_table[12].values()) == q[0, 12, :len(node.neighbors)].tolist()
+
+
+def test_warm_started_engine_routes_like_the_source():
+    source = _trained()
+    net = Network(source.csr, QNode)
+    warm_start(net, q_snapshot(source))
+    for dst in (3, 17, 24):
+        assert net.nodes[0].select_next_hop(dst) == source.nodes[0].select_next_hop(dst)
+
+
+def test_snapshot_files_remember_their_graph(tmp_path):
+    source = _trained()
+    path = str(tmp_path / "q.npz")
+    save_q_snapshot(source, path)
+    np.testing.assert_array_equal(load_q_snapshot(path, source.csr), q_snapshot(source))
+    with pytest.raises(ValueError, match="different graph"):
+        load_q_snapshot(path, topology.grid(5))
+
+
+def test_warm_start_rejects_a_snapshot_of_another_shape():
+    net = Network(topology.grid(4), QNode)
+    with pytest.raises(ValueError, match="does not fit"):
+        warm_start(net, shortest_path_q(topology.grid(5)))
+
+
+def test_convergence_detector_needs_patience_calm_checks():
+    net = VectorNetwork(topology.grid(4), QNode, seed=0)
+    warm_start(net, shortest_path_q(net.csr))
+    detector = ConvergenceDetector(tol=0.01, patience=2)
+    # Nothing moves without traffic: the first check only takes a reference
+    assert [detector.check(net) for _ in range(3)] == [False, False, True]
+    assert detector.change == 0.0
+
+    net.advance(300, 6.0)
+    assert not detector.check(net)
+    assert detector.change > 0.01
+
+
+def test_steady_state_warm_start_and_convergence(tmp_path):
+    grid = partial(topology.grid, 4)
+    save = str(tmp_path / "q-{load}-{seed}.npz")
+    cell = dict(node_cls=QNode, layout_factory=grid, load=1.0, seed=0,
+                num_steps=3_000, discard_steps=2_000)
+    cold = run_steady_state(**cell, save_q=save)
+    warm = run_steady_state(**cell, warm_start=save,
+                            converge=partial(ConvergenceDetector, interval=200))
+    shortest = run_steady_state(**cell, warm_start="shortest_path")
+    assert np.isfinite([cold, warm, shortest]).all()
+    assert load_q_snapshot(save.format(load=1.0, seed=0)).shape == (16, 16, 4)
@@ -0,0 +1,240 @@
+"""
+Synthetic and imported topologies, emitted directly as `CSRGraph`s.
+
+Every generator is vectorised (or linear in the number of edges) and
+never builds a networkx object, so 10³–10⁵ node networks take well
+under a second or two; call `.to_networkx()` on the result when a
+networkx graph is wanted, or `.to_dict()` for the dict-of-lists form.
+
+    grid(rows, cols)                 rows × cols mesh (like dense_layout)
+    torus(rows, cols)                mesh with wrap-around links
+    irregular_grid(rows, cols, ...)  mesh with random links removed,
+                                     kept connected (like layout)
+    waxman(n, alpha, beta)           random geometric (Waxman) graph
+    barabasi_albert(n, m)            preferential attachment
+    fat_tree(k)                      k-ary fat tree (data-centre fabric)
+    from_edge_list(path)             whitespace / csv edge list file
+"""
+import random
+from typing import Optional
+
+import numpy as np
+
+from CSRGraph import CSRGraph
+
+
+# ----------------------------------------
+# Meshes
+# ----------------------------------------
+def _mesh_edges(rows: int, cols: int, periodic: bool):
+    i = np.arange(rows * cols, dtype=np.int64)
+    r, c = np.divmod(i, cols)
+    right = (c < cols - 1) | periodic
+    down = (r < rows - 1) | periodic
+    # Per node: right link then down link, as dense_layout adds them
+    u = np.stack([i, i], axis=1)
+    v = np.stack([r * cols + (c + 1) % cols, ((r + 1) % rows) * cols + c], axis=1)
+    mask = np.stack([right, down], axis=1)
+    return u[mask], v[mask]
+
+
+def grid(rows: int, cols: Optional[int] = None) -> CSRGraph:
+    """rows × cols mesh; node r * cols + c sits at row r, column c."""
+    cols = rows if cols is None else cols
+    u, v = _mesh_edges(rows, cols, periodic=False)
+    return CSRGraph.from_edges(rows * cols, u, v)
+
+
+def torus(rows: int, cols: Optional[int] = None) -> CSRGraph:
+    """rows × cols mesh whose rows and columns wrap around."""
+    cols = rows if cols is None else cols
+    u, v = _mesh_edges(rows, cols, periodic=True)
+    return CSRGraph.from_edges(rows * cols, u, v)
+
+
+def _spanning_tree(num_nodes: int, u: np.ndarray, v: np.ndarray,
+                   rng: np.random.Generator) -> np.ndarray:
+    """Mask of the edges of a random spanning forest (Kruskal in random order)."""
+    parent = list(range(num_nodes))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    tree = np.zeros(len(u), dtype=bool)
+    order = rng.permutation(len(u))
+    for e, a, b in zip(order.tolist(), u[order].tolist(), v[order].tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[ra] = rb
+            tree[e] = True
+    return tree
+
+
+def irregular_grid(rows: int, cols: Optional[int] = None, remove: float = 0.25,
+                   seed: Optional[int] = None) -> CSRGraph:
+    """
+    rows × cols mesh with a fraction `remove` of its links deleted at
+    random.  Links of a random spanning tree are never deleted, so the
+    graph stays connected (`remove` is capped accordingly).
+    """
+    cols = rows if cols is None else cols
+    rng = np.random.default_rng(seed)
+    n = rows * cols
+    u, v = _mesh_edges(rows, cols, periodic=False)
+    tree = _spanning_tree(n, u, v, rng)
+    spare = np.flatnonzero(~tree)
+    drop = rng.choice(spare, size=min(len(spare), int(round(remove * len(u)))),
+                      replace=False)
+    keep = np.ones(len(u), dtype=bool)
+    keep[drop] = False
+    return CSRGraph.from_edges(n, u[keep], v[keep])
+
+
+# ----------------------------------------
+# Random graphs
+# ----------------------------------------
+def waxman(n: int, alpha: float = 0.4, beta: float = 0.1,
+           seed: Optional[int] = None, radius: Optional[float] = None,
+           connected: bool = True) -> CSRGraph:
+    """
+    Waxman graph on n points uniform in the unit square: u and v are
+    linked with probability beta * exp(-d(u, v) / (alpha * L)), L = √2.
+
+    Pairs further apart than `radius` are never linked; by default it
+    is where the probability has dropped to 1/1000 of beta.  Points are
+    bucketed into cells at least `radius` wide and only neighbouring
+    cells are compared, so the cost is O(n · points within `radius`) —
+    keep alpha small for large sparse graphs.  With `connected`, only
+    the largest component is returned.
+    """
+    rng = np.random.default_rng(seed)
+    L = np.sqrt(2.0)
+    if radius is None:
+        radius = alpha * L * np.log(1000.0)
+    radius = min(radius, L)
+    xy = rng.random((n, 2))
+    if n < 2 or radius <= 0:
+        return CSRGraph.from_edges(n, [], [])
+
+    # Cells of side 1/G >= radius, with a few points per cell on average
+    G = max(1, min(int(1.0 / radius), int(np.sqrt(n / 8))))
+    cell = np.minimum((xy * G).astype(np.int64), G - 1)
+    key = cell[:, 0] * G + cell[:, 1]
+    order = np.argsort(key, kind="stable")
+    bounds = np.searchsorted(key[order], np.arange(G * G + 1))
+
+    def members(cx, cy):
+        c = cx * G + cy
+        return order[bounds[c]:bounds[c + 1]]
+
+    us, vs = [], []
+    for cx in range(G):
+        for cy in range(G):
+            a = members(cx, cy)
+            if not len(a):
+                continue
+            for dx, dy in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+                if not (0 <= cx + dx < G and 0 <= cy + dy < G):
+                    continue
+                b = members(cx + dx, cy + dy)
+                step = max(1, 2 ** 22 // max(len(b), 1))
+                for lo in range(0, len(a), step):
+                    rows = a[lo:lo + step]
+                    d = np.sqrt(((xy[rows, None, :] - xy[None, b, :]) ** 2).sum(axis=2))
+                    hit = (d <= radius) & (rng.random(d.shape) < beta * np.exp(-d / (alpha * L)))
+                    if dx == 0 and dy == 0:
+                        # Same cell: each unordered pair once
+                        hit &= np.arange(len(b))[None, :] > np.arange(lo, lo + len(rows))[:, None]
+                    i, j = np.nonzero(hit)
+                    us.append(rows[i])
+                    vs.append(b[j])
+
+    graph = CSRGraph.from_edges(n, np.concatenate(us), np.concatenate(vs))
+    return graph.largest_component() if connected else graph
+
+
+def barabasi_albert(n: int, m: int = 2, seed: Optional[int] = None) -> CSRGraph:
+    """
+    Preferential attachment: each new node links to m existing nodes
+    chosen with probability proportional to their degree.  O(n · m).
+    """
+    if not 1 <= m < n:
+        raise ValueError(f"barabasi_albert needs 1 <= m < n, got m={m}, n={n}")
+    rng = random.Random(seed)
+    targets = list(range(m))
+    repeated = []
+    u, v = [], []
+    for source in range(m, n):
+        u.extend([source] * m)
+        v.extend(targets)
+        repeated.extend(targets)
+        repeated.extend([source] * m)
+        chosen = set()
+        while len(chosen) < m:
+            chosen.add(rng.choice(repeated))
+        targets = sorted(chosen)
+    return CSRGraph.from_edges(n, u, v)
+
+
+# ----------------------------------------
+# Structured fabrics
+# ----------------------------------------
+def fat_tree(k: int = 4, hosts: bool = True) -> CSRGraph:
+    """
+    k-ary fat tree: (k/2)² core switches, then k pods of k/2
+    aggregation and k/2 edge switches, then k/2 hosts per edge switch
+    (k³/4 hosts; omitted with hosts=False).  Nodes are numbered core,
+    then pod by pod (aggregation, edge), then hosts.
+    """
+    if k < 2 or k % 2:
+        raise ValueError(f"fat_tree needs an even k >= 2, got {k}")
+    h = k // 2
+    num_core = h * h
+    pod = np.arange(k)[:, None, None]
+    a = np.arange(h)[None, :, None]
+    c = np.arange(h)[None, None, :]
+    agg = num_core + pod * k + a
+    edge = num_core + pod * k + h + c
+
+    # aggregation a of every pod -> core switches a*h .. a*h + h - 1
+    core_u = np.broadcast_to(agg, (k, h, h)).ravel()
+    core_v = np.broadcast_to(a * h + c, (k, h, h)).ravel()
+    # full bipartite aggregation <-> edge inside each pod
+    pod_u = np.broadcast_to(agg, (k, h, h)).ravel()
+    pod_v = np.broadcast_to(edge, (k, h, h)).ravel()
+    u = [core_u, pod_u]
+    v = [core_v, pod_v]
+
+    n = num_core + k * k
+    if hosts:
+        edge_ids = (num_core + np.arange(k)[:, None] * k + h + np.arange(h)[None, :]).ravel()
+        host_ids = n + np.arange(k * h * h)
+        u.append(np.repeat(edge_ids, h))
+        v.append(host_ids)
+        n += k * h * h
+    return CSRGraph.from_edges(n, np.concatenate(u), np.concatenate(v))
+
+
+# ----------------------------------------
+# Imported graphs
+# ----------------------------------------
+def from_edge_list(path: str, delimiter: Optional[str] = None, comments: str = "#",
+                   directed: bool = False, connected: bool = True) -> CSRGraph:
+    """
+    Read "u v [weight]" lines (integer node ids; `delimiter` as in
+    numpy.loadtxt, e.g. "," for csv).  Node ids are kept as `node_ids`;
+    with `connected`, only the largest component is returned.
+    """
+    data = np.loadtxt(path, delimiter=delimiter, comments=comments, ndmin=2)
+    if data.shape[1] not in (2, 3):
+        raise ValueError(f"{path}: expected 2 or 3 columns, got {data.shape[1]}")
+    ends = data[:, :2].astype(np.int64)
+    weights = data[:, 2] if data.shape[1] == 3 else None
+    node_ids, dense = np.unique(ends, return_inverse=True)
+    dense = dense.reshape(ends.shape)
+    graph = CSRGraph.from_edges(len(node_ids), dense[:, 0], dense[:, 1], weights,
+                                node_ids.tolist(), symmetric=not directed)
+    return graph.largest_component() if connected else graph
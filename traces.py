@@ -0,0 +1,151 @@
+"""
+Pre-generated traffic traces.
+
+A trace is a `.npy` file holding one record per injected packet,
+(tick, src, dst) with dense node indices, sorted by tick, plus a small
+`.json` sidecar describing how it was generated.  Replaying a trace
+memory-maps the file and reads it sequentially, so every routing
+algorithm run against the same trace sees exactly the same packets,
+independent of how many random draws its routing policy makes.
+
+    python traces.py                 # traces for the test scripts' schedules
+    python traces.py --seeds 0 1 2 --out traces/
+"""
+import argparse
+import json
+import os
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from traffic import BernoulliArrivals, Traffic, UniformPairs
+
+TRACE_DTYPE = np.dtype([("tick", "<i8"), ("src", "<i4"), ("dst", "<i4")])
+
+# Load schedule of q_routing/test.py and stochastic_q_routing/sqrwalt-test.py
+TEST_PHASES = [
+    (300_000, 5.5),
+    (1_000_000, 6.75),
+    (300_000, 5.5),
+]
+
+
+def write_trace(path: str, phases: Sequence[Tuple[int, float]], num_nodes: int,
+                seed: int, arrivals=None, pairs=None, chunk: int = 1 << 16) -> int:
+    """
+    Draw the injections for a phase schedule and write them to `path`.
+
+    `arrivals` / `pairs` default to the `Network.inject_random_packets`
+    model (floor + Bernoulli arrivals, uniform distinct pairs); their
+    `load` is set from each phase.  Returns the number of records.
+    """
+    arrivals = arrivals if arrivals is not None else BernoulliArrivals(0.0)
+    pairs = pairs if pairs is not None else UniformPairs(num_nodes)
+    traffic = Traffic(arrivals, pairs, seed=seed)
+
+    raw = f"{path}.{os.getpid()}.tmp"
+    count, tick = 0, 0
+    with open(raw, "wb") as out:
+        for steps, load, *_ in phases:
+            traffic.arrivals.load = load
+            end = tick + steps
+            while tick < end:
+                n = min(chunk, end - tick)
+                ticks, src, dst = traffic.generate(tick, n)
+                records = np.empty(len(ticks), dtype=TRACE_DTYPE)
+                records["tick"], records["src"], records["dst"] = ticks, src, dst
+                out.write(records.tobytes())
+                count += len(records)
+                tick += n
+
+    # Prepend a .npy header now that the length is known
+    with open(path, "wb") as f, open(raw, "rb") as body:
+        np.lib.format.write_array_header_1_0(f, {
+            "descr": np.lib.format.dtype_to_descr(TRACE_DTYPE),
+            "fortran_order": False,
+            "shape": (count,),
+        })
+        while True:
+            block = body.read(1 << 24)
+            if not block:
+                break
+            f.write(block)
+    os.remove(raw)
+
+    with open(f"{path}.json", "w") as f:
+        json.dump({
+            "phases": [list(p) for p in phases],
+            "num_nodes": num_nodes,
+            "seed": seed,
+            "arrivals": type(arrivals).__name__,
+            "pairs": type(pairs).__name__,
+            "records": count,
+        }, f, indent=2)
+    return count
+
+
+class TraceReplay:
+    """
+    Replays a trace written by `write_trace`; a drop-in for
+    `traffic.Traffic` in `Network.inject_traffic` / `VectorNetwork.inject_traffic`.
+
+    `at(tick)` must be called with non-decreasing ticks.  Records are
+    read from the memory map `block` at a time.
+    """
+
+    def __init__(self, path: str, block: int = 1 << 16):
+        self.records = np.load(path, mmap_mode="r")
+        self.block = block
+        self._start = 0        # first tick covered by the loaded block
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._src = self._dst = np.zeros(0, dtype=np.int64)
+
+    def _load(self, tick: int) -> None:
+        ticks = self.records["tick"]
+        # Binary search on the map touches only a few pages
+        pos = int(np.searchsorted(ticks, tick))
+        stop = min(pos + self.block, len(ticks))
+        if stop < len(ticks):
+            # Keep whole ticks only, so a tick never straddles two blocks
+            last = ticks[stop - 1]
+            stop = int(np.searchsorted(ticks, last if last > tick else tick + 1))
+        chunk = np.array(self.records[pos:stop])
+        end = int(chunk["tick"][-1]) + 1 if len(chunk) else tick + 1
+        self._offsets = np.searchsorted(chunk["tick"], np.arange(tick, end + 1))
+        self._src = chunk["src"].astype(np.int64)
+        self._dst = chunk["dst"].astype(np.int64)
+        self._start = tick
+
+    def at(self, tick: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(src, dst) index arrays of the packets injected at `tick`."""
+        i = tick - self._start
+        if not 0 <= i < len(self._offsets) - 1:
+            self._load(tick)
+            i = 0
+        lo, hi = self._offsets[i], self._offsets[i + 1]
+        return self._src[lo:hi], self._dst[lo:hi]
+
+    def next_arrival(self, tick: int) -> Optional[int]:
+        """First tick >= `tick` with at least one injection (None if none left)."""
+        ticks = self.records["tick"]
+        i = int(np.searchsorted(ticks, tick))
+        return int(ticks[i]) if i < len(ticks) else None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="traces")
+    parser.add_argument("--seeds", type=int, nargs="+", default=list(range(10)))
+    parser.add_argument("--nodes", type=int, default=36)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    for seed in args.seeds:
+        path = os.path.join(args.out, f"test-phases-{seed}.npy")
+        count = write_trace(path, TEST_PHASES, args.nodes, seed)
+        print(f"{path}: {count:,} packets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Traffic generation.
+
+A `Traffic` source combines an arrival process (how many packets enter
+the network each tick) with an endpoint pattern (which (src, dst) pair
+each packet gets), and draws them with NumPy a whole block of ticks at
+a time.  Nodes are dense indices 0..N-1 in the graph's key order; the
+engines map them back to node ids.
+
+Arrival processes:  BernoulliArrivals (the original floor + Bernoulli
+                    scheme), PoissonArrivals, OnOffArrivals (bursty)
+Endpoint patterns:  UniformPairs, HotspotPairs, GravityPairs
+"""
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# ----------------------------------------
+# Arrival processes
+# ----------------------------------------
+class BernoulliArrivals:
+    """floor(load) packets per tick plus one more with probability frac(load)."""
+
+    def __init__(self, load: float):
+        self.load = load
+
+    def counts(self, rng: np.random.Generator, n_ticks: int) -> np.ndarray:
+        base = int(math.floor(self.load))
+        return base + (rng.random(n_ticks) < self.load - base)
+
+
+class PoissonArrivals:
+    """Poisson(load) packets per tick."""
+
+    def __init__(self, load: float):
+        self.load = load
+
+    def counts(self, rng: np.random.Generator, n_ticks: int) -> np.ndarray:
+        return rng.poisson(self.load, n_ticks)
+
+
+class OnOffArrivals:
+    """
+    Bursty on/off source: geometric on and off periods (means in ticks),
+    Poisson arrivals while on.  `load` is the long-run mean rate, so the
+    rate while on is load * (mean_on + mean_off) / mean_on.
+    """
+
+    def __init__(self, load: float, mean_on: float = 100, mean_off: float = 100):
+        self.load = load
+        self.mean_on = mean_on
+        self.mean_off = mean_off
+        self._on = True
+        self._left = 0
+
+    def counts(self, rng: np.random.Generator, n_ticks: int) -> np.ndarray:
+        on = np.empty(n_ticks, dtype=bool)
+        filled = 0
+        while filled < n_ticks:
+            if self._left == 0:
+                self._on = not self._on
+                mean = self.mean_on if self._on else self.mean_off
+                self._left = int(rng.geometric(1 / mean))
+            run = min(self._left, n_ticks - filled)
+            on[filled:filled + run] = self._on
+            self._left -= run
+            filled += run
+        rate = self.load * (self.mean_on + self.mean_off) / self.mean_on
+        return np.where(on, rng.poisson(rate, n_ticks), 0)
+
+
+# ----------------------------------------
+# Endpoint patterns
+# ----------------------------------------
+class UniformPairs:
+    """Uniform src, uniform dst != src — O(1) per packet."""
+
+    def __init__(self, num_nodes: int):
+        self.num_nodes = num_nodes
+
+    def draw(self, rng: np.random.Generator, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        src = rng.integers(self.num_nodes, size=k)
+        # Draw from the N-1 other nodes and skip over src
+        dst = rng.integers(self.num_nodes - 1, size=k)
+        dst += dst >= src
+        return src, dst
+
+
+class HotspotPairs(UniformPairs):
+    """Uniform pairs, except a `fraction` of packets go to one of `hotspots`."""
+
+    def __init__(self, num_nodes: int, hotspots: Sequence[int], fraction: float = 0.5):
+        super().__init__(num_nodes)
+        self.hotspots = np.asarray(hotspots, dtype=np.int64)
+        self.fraction = fraction
+
+    def draw(self, rng, k):
+        src, dst = super().draw(rng, k)
+        hot = self.hotspots[rng.integers(len(self.hotspots), size=k)]
+        use = (rng.random(k) < self.fraction) & (hot != src)
+        dst[use] = hot[use]
+        return src, dst
+
+
+class GravityPairs:
+    """
+    (src, dst) drawn in proportion to a traffic matrix.  Pass either the
+    full `matrix` (N × N) or per-node `weights`, which give the gravity
+    model matrix[i, j] = weights[i] * weights[j].  The diagonal is
+    ignored.
+    """
+
+    def __init__(self, matrix: Optional[np.ndarray] = None,
+                 weights: Optional[Sequence[float]] = None):
+        if matrix is None:
+            w = np.asarray(weights, dtype=float)
+            matrix = np.outer(w, w)
+        matrix = np.array(matrix, dtype=float)
+        np.fill_diagonal(matrix, 0.0)
+        self.num_nodes = len(matrix)
+        self._cum = np.cumsum(matrix.ravel())
+
+    def draw(self, rng, k):
+        flat = np.searchsorted(self._cum, rng.random(k) * self._cum[-1], side="right")
+        return np.divmod(np.minimum(flat, len(self._cum) - 1), self.num_nodes)
+
+
+# ----------------------------------------
+# Traffic source
+# ----------------------------------------
+class Traffic:
+    """
+    Packets per tick from `arrivals` with endpoints from `pairs`.
+
+    `at(tick)` must be called with non-decreasing ticks; injections are
+    drawn `block` ticks ahead in one batch and served from that buffer.
+    """
+
+    def __init__(self, arrivals, pairs, seed: Optional[int] = None, block: int = 4096):
+        self.arrivals = arrivals
+        self.pairs = pairs
+        self.rng = np.random.default_rng(seed)
+        self.block = block
+        self._start = 0
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._src = self._dst = np.zeros(0, dtype=np.int64)
+
+    def generate(self, start: int, n_ticks: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Draw (tick, src, dst) arrays for ticks [start, start + n_ticks), sorted by tick."""
+        counts = self.arrivals.counts(self.rng, n_ticks)
+        src, dst = self.pairs.draw(self.rng, int(counts.sum()))
+        ticks = start + np.repeat(np.arange(n_ticks, dtype=np.int64), counts)
+        return ticks, src, dst
+
+    def _refill(self, tick: int) -> None:
+        counts = self.arrivals.counts(self.rng, self.block)
+        self._src, self._dst = self.pairs.draw(self.rng, int(counts.sum()))
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        self._start = tick
+
+    def at(self, tick: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(src, dst) index arrays of the packets injected at `tick`."""
+        i = tick - self._start
+        if not 0 <= i < len(self._offsets) - 1:
+            self._refill(tick)
+            i = 0
+        lo, hi = self._offsets[i], self._offsets[i + 1]
+        return self._src[lo:hi], self._dst[lo:hi]
+
+    def next_arrival(self, tick: int) -> Optional[int]:
+        """
+        First tick >= `tick` with at least one injection, drawing further
+        blocks as needed (the stream is the same as calling `at` every
+        tick).  None if the arrival rate is zero.
+        """
+        if self.arrivals.load <= 0:
+            return None
+        while True:
+            i = tick - self._start
+            if not 0 <= i < len(self._offsets) - 1:
+                self._refill(tick)
+                i = 0
+            busy = np.flatnonzero(np.diff(self._offsets[i:]))
+            if len(busy):
+                return tick + int(busy[0])
+            tick = self._start + len(self._offsets) - 1
+
+    def set_load(self, load: float) -> None:
+        """Change the arrival rate from the next tick on (drops buffered draws)."""
+        self.arrivals.load = load
+        self._offsets = np.zeros(1, dtype=np.int64)